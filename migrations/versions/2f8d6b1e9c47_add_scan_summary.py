@@ -0,0 +1,49 @@
+"""add scan_history.summary for lightweight list projections
+
+Revision ID: 2f8d6b1e9c47
+Revises: e7a3c91d5b02
+Create Date: 2026-10-19 20:12:08.441630
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2f8d6b1e9c47'
+down_revision = 'e7a3c91d5b02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('scan_history', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('summary', sa.Text(), nullable=True))
+
+    # Backfill dari analysis_result yang sudah ada (sekali jalan)
+    bind = op.get_bind()
+    scan_history = sa.table('scan_history', sa.column('id', sa.Integer), sa.column('analysis_result', sa.Text),
+                            sa.column('summary', sa.Text))
+    rows = bind.execute(sa.select(scan_history.c.id, scan_history.c.analysis_result)
+                        .where(scan_history.c.analysis_result.isnot(None)))
+    updates = []
+    for scan_id, analysis_result in rows:
+        try:
+            analysis = json.loads(analysis_result)
+        except ValueError:
+            continue
+        if isinstance(analysis, dict) and analysis.get("summary"):
+            updates.append({"scan_id": scan_id, "summary": analysis["summary"]})
+    if updates:
+        bind.execute(
+            scan_history.update().where(scan_history.c.id == sa.bindparam('scan_id'))
+            .values(summary=sa.bindparam('summary')),
+            updates,
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('scan_history', schema=None) as batch_op:
+        batch_op.drop_column('summary')
@@ -0,0 +1,28 @@
+"""add rolling summary to chat_session
+
+Revision ID: 3b7e21c9d4f0
+Revises: c8522a48af9a
+Create Date: 2026-10-19 13:40:12.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b7e21c9d4f0'
+down_revision = 'c8522a48af9a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('chat_session', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('summary', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('summary_upto_id', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('chat_session', schema=None) as batch_op:
+        batch_op.drop_column('summary_upto_id')
+        batch_op.drop_column('summary')
@@ -0,0 +1,41 @@
+"""add asset.ports_scan_id and user.findings_version for exposure analytics
+
+Revision ID: 4c9e2a7d1f58
+Revises: 8b5f1c3a6e29
+Create Date: 2026-10-19 22:27:40.305117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c9e2a7d1f58'
+down_revision = '8b5f1c3a6e29'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('findings_version', sa.Integer(), nullable=False, server_default='0'))
+
+    with op.batch_alter_table('asset', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('ports_scan_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_asset_ports_scan_id', 'scan_history', ['ports_scan_id'], ['id'],
+                                    ondelete='SET NULL')
+
+    # Backfill: last_scan_id yang berupa scan nmap adalah scan yang terakhir men-set open_ports
+    op.execute(
+        "UPDATE asset SET ports_scan_id = last_scan_id "
+        "WHERE last_scan_id IN (SELECT id FROM scan_history WHERE tool = 'nmap')"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('asset', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_asset_ports_scan_id', type_='foreignkey')
+        batch_op.drop_column('ports_scan_id')
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('findings_version')
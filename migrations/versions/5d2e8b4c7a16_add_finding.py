@@ -0,0 +1,54 @@
+"""add normalized finding table
+
+Revision ID: 5d2e8b4c7a16
+Revises: 9a4c6e2f1b83
+Create Date: 2026-10-19 16:22:09.481377
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2e8b4c7a16'
+down_revision = '9a4c6e2f1b83'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('finding',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('scan_id', sa.Integer(), nullable=False),
+    sa.Column('host', sa.String(length=255), nullable=True),
+    sa.Column('port', sa.Integer(), nullable=True),
+    sa.Column('proto', sa.String(length=10), nullable=True),
+    sa.Column('service', sa.String(length=100), nullable=True),
+    sa.Column('product', sa.String(length=200), nullable=True),
+    sa.Column('version', sa.String(length=100), nullable=True),
+    sa.Column('path', sa.String(length=1000), nullable=True),
+    sa.Column('status', sa.Integer(), nullable=True),
+    sa.Column('cve', sa.String(length=30), nullable=True),
+    sa.Column('severity', sa.String(length=20), nullable=False),
+    sa.ForeignKeyConstraint(['scan_id'], ['scan_history.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('finding', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_finding_scan_id'), ['scan_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_finding_service'), ['service'], unique=False)
+        batch_op.create_index(batch_op.f('ix_finding_cve'), ['cve'], unique=False)
+        batch_op.create_index(batch_op.f('ix_finding_severity'), ['severity'], unique=False)
+        batch_op.create_index('ix_finding_product_version', ['product', 'version'], unique=False)
+        batch_op.create_index('ix_finding_host_port', ['host', 'port'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('finding', schema=None) as batch_op:
+        batch_op.drop_index('ix_finding_host_port')
+        batch_op.drop_index('ix_finding_product_version')
+        batch_op.drop_index(batch_op.f('ix_finding_severity'))
+        batch_op.drop_index(batch_op.f('ix_finding_cve'))
+        batch_op.drop_index(batch_op.f('ix_finding_service'))
+        batch_op.drop_index(batch_op.f('ix_finding_scan_id'))
+
+    op.drop_table('finding')
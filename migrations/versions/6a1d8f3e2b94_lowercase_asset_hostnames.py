@@ -0,0 +1,43 @@
+"""lowercase stored asset hostname aliases
+
+Revision ID: 6a1d8f3e2b94
+Revises: 4c9e2a7d1f58
+Create Date: 2026-10-19 22:58:13.772901
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a1d8f3e2b94'
+down_revision = '4c9e2a7d1f58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Filter ?hostname= mencocokkan alias lowercase; normalisasi data lama sekali jalan
+    bind = op.get_bind()
+    asset = sa.table('asset', sa.column('id', sa.Integer), sa.column('hostnames', sa.Text))
+    updates = []
+    for asset_id, hostnames in bind.execute(sa.select(asset.c.id, asset.c.hostnames).where(asset.c.hostnames.isnot(None))):
+        try:
+            aliases = json.loads(hostnames)
+        except ValueError:
+            continue
+        lowered = json.dumps(sorted({name.lower() for name in aliases}))
+        if lowered != hostnames:
+            updates.append({"asset_id": asset_id, "hostnames": lowered})
+    if updates:
+        bind.execute(
+            asset.update().where(asset.c.id == sa.bindparam('asset_id')).values(hostnames=sa.bindparam('hostnames')),
+            updates,
+        )
+
+
+def downgrade():
+    # Case asli tidak disimpan; lowercase tetap valid untuk skema lama
+    pass
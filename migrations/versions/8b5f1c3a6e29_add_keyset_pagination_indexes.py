@@ -0,0 +1,42 @@
+"""add composite indexes for keyset pagination
+
+Revision ID: 8b5f1c3a6e29
+Revises: 2f8d6b1e9c47
+Create Date: 2026-10-19 21:03:52.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b5f1c3a6e29'
+down_revision = '2f8d6b1e9c47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('scan_history', schema=None) as batch_op:
+        batch_op.create_index('ix_scan_history_user_created', ['user_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_scan_history_session_created', ['session_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('chat_message', schema=None) as batch_op:
+        batch_op.create_index('ix_chat_message_session_created', ['session_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('chat_session', schema=None) as batch_op:
+        batch_op.create_index('ix_chat_session_user_updated', ['user_id', 'updated_at'], unique=False)
+        batch_op.create_index('ix_chat_session_anon_updated', ['anon_id', 'updated_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('chat_session', schema=None) as batch_op:
+        batch_op.drop_index('ix_chat_session_anon_updated')
+        batch_op.drop_index('ix_chat_session_user_updated')
+
+    with op.batch_alter_table('chat_message', schema=None) as batch_op:
+        batch_op.drop_index('ix_chat_message_session_created')
+
+    with op.batch_alter_table('scan_history', schema=None) as batch_op:
+        batch_op.drop_index('ix_scan_history_session_created')
+        batch_op.drop_index('ix_scan_history_user_created')
@@ -0,0 +1,40 @@
+"""add finding_document for chat retrieval
+
+Revision ID: 9a4c6e2f1b83
+Revises: 3b7e21c9d4f0
+Create Date: 2026-10-19 14:05:47.120936
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4c6e2f1b83'
+down_revision = '3b7e21c9d4f0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('finding_document',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('session_id', sa.Integer(), nullable=False),
+    sa.Column('scan_id', sa.Integer(), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['scan_id'], ['scan_history.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['session_id'], ['chat_session.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('finding_document', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_finding_document_scan_id'), ['scan_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_finding_document_session_id'), ['session_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('finding_document', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_finding_document_session_id'))
+        batch_op.drop_index(batch_op.f('ix_finding_document_scan_id'))
+
+    op.drop_table('finding_document')
@@ -0,0 +1,26 @@
+"""add scan_history.speculation for cross-worker speculative planning
+
+Revision ID: b3e7d2a9c5f1
+Revises: 6a1d8f3e2b94
+Create Date: 2026-10-20 09:14:52.603318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3e7d2a9c5f1'
+down_revision = '6a1d8f3e2b94'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('scan_history', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('speculation', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('scan_history', schema=None) as batch_op:
+        batch_op.drop_column('speculation')
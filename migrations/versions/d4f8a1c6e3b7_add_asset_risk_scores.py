@@ -0,0 +1,29 @@
+"""add asset.risk_scores (per-tool score behind asset.risk_level)
+
+Asset yang sudah ada mulai dengan map kosong; skor tiap tool terisi saat tool
+itu men-scan host lagi.
+
+Revision ID: d4f8a1c6e3b7
+Revises: b3e7d2a9c5f1
+Create Date: 2026-10-20 11:32:07.418905
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4f8a1c6e3b7'
+down_revision = 'b3e7d2a9c5f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('asset', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('risk_scores', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('asset', schema=None) as batch_op:
+        batch_op.drop_column('risk_scores')
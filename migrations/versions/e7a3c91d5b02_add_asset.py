@@ -0,0 +1,56 @@
+"""add asset inventory with integer ip columns
+
+Revision ID: e7a3c91d5b02
+Revises: 5d2e8b4c7a16
+Create Date: 2026-10-19 18:41:26.913054
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a3c91d5b02'
+down_revision = '5d2e8b4c7a16'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('asset',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('address', sa.String(length=255), nullable=False),
+    sa.Column('ip_version', sa.Integer(), nullable=True),
+    sa.Column('ipv4', sa.BigInteger(), nullable=True),
+    sa.Column('ipv6_hi', sa.BigInteger(), nullable=True),
+    sa.Column('ipv6_lo', sa.BigInteger(), nullable=True),
+    sa.Column('hostnames', sa.Text(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('open_ports', sa.Text(), nullable=True),
+    sa.Column('risk_level', sa.String(length=20), nullable=True),
+    sa.Column('last_scan_id', sa.Integer(), nullable=True),
+    sa.Column('first_seen', sa.DateTime(), nullable=True),
+    sa.Column('last_seen', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['last_scan_id'], ['scan_history.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'address', name='uq_asset_user_address')
+    )
+    with op.batch_alter_table('asset', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_asset_user_id'), ['user_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_asset_risk_level'), ['risk_level'], unique=False)
+        batch_op.create_index(batch_op.f('ix_asset_last_seen'), ['last_seen'], unique=False)
+        batch_op.create_index('ix_asset_user_ipv4', ['user_id', 'ipv4'], unique=False)
+        batch_op.create_index('ix_asset_user_ipv6', ['user_id', 'ipv6_hi', 'ipv6_lo'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('asset', schema=None) as batch_op:
+        batch_op.drop_index('ix_asset_user_ipv6')
+        batch_op.drop_index('ix_asset_user_ipv4')
+        batch_op.drop_index(batch_op.f('ix_asset_last_seen'))
+        batch_op.drop_index(batch_op.f('ix_asset_risk_level'))
+        batch_op.drop_index(batch_op.f('ix_asset_user_id'))
+
+    op.drop_table('asset')
@@ -5,6 +5,7 @@ setup(
     version='0.1.0',
     packages=find_packages(where='src'),
     package_dir={'': 'src'},
+    py_modules=['cli'],
     install_requires=[
         'flask==2.3.3',
         'groq',
@@ -20,6 +21,11 @@ setup(
         'python-libnmap',
         'beautifulsoup4',
     ],
+    entry_points={
+        'console_scripts': [
+            'aivast=cli:main',
+        ],
+    },
 #    entry_points={
 #        'flask.commands': [
 #            'create-db=app:create_db_command',
@@ -0,0 +1,162 @@
+"""
+Fleet exposure analytics atas findings ternormalisasi.
+
+Baris finding service (host, port, service, waktu scan) di-encode sekali menjadi
+array integer: index host, index label (service atau port/proto) dan epoch scan.
+Dari situ dihitung dengan operasi array:
+  - exposure : jumlah host yang saat ini (scan port terbaru per host) expose tiap label
+  - trends   : jumlah host distinct per label per bucket waktu
+  - outliers : host dengan jumlah service terbuka jauh di atas rata-rata (z-score)
+               dan service langka yang hanya ada di sedikit host
+"""
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+BUCKET_SECONDS = {"day": 86400, "week": 7 * 86400, "month": 30 * 86400}
+DEFAULT_OUTLIER_Z = 2.0
+RARE_SERVICE_SHARE = 0.05
+
+
+def _epoch(value) -> int:
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp())
+    return int(value)
+
+
+class ExposureMatrix:
+    """
+    Encoding kolumnar host x label dari baris (host, port, proto, service, scanned_at).
+
+    `port_scans` berisi (host, scanned_at) scan terbaru yang melaporkan state port
+    tiap host. Scan itu bisa tanpa service terbuka sama sekali (tidak ada barisnya),
+    jadi waktunya tidak bisa diturunkan dari `rows`.
+    """
+
+    def __init__(self, rows: Iterable[Sequence], by: str = "service", port_scans: Iterable[Sequence] = ()):
+        self.by = by
+        self.hosts: List[str] = []
+        self.labels: List[str] = []
+        host_pos: Dict[str, int] = {}
+        label_pos: Dict[str, int] = {}
+        host_idx, label_idx, times = [], [], []
+
+        for host, port, proto, service, scanned_at in rows:
+            label = (service or "unknown") if by == "service" else f"{port}/{proto or 'tcp'}"
+            if host not in host_pos:
+                host_pos[host] = len(self.hosts)
+                self.hosts.append(host)
+            if label not in label_pos:
+                label_pos[label] = len(self.labels)
+                self.labels.append(label)
+            host_idx.append(host_pos[host])
+            label_idx.append(label_pos[label])
+            times.append(_epoch(scanned_at))
+
+        scan_idx, scan_times = [], []
+        for host, scanned_at in port_scans:
+            if host not in host_pos:
+                host_pos[host] = len(self.hosts)
+                self.hosts.append(host)
+            scan_idx.append(host_pos[host])
+            scan_times.append(_epoch(scanned_at))
+
+        self.host_idx = np.asarray(host_idx, dtype=np.int64)
+        self.label_idx = np.asarray(label_idx, dtype=np.int64)
+        self.times = np.asarray(times, dtype=np.int64)
+        self.scan_idx = np.asarray(scan_idx, dtype=np.int64)
+        self.scan_times = np.asarray(scan_times, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.host_idx)
+
+    # ------------------------------------------------------------------
+    # State terbaru per host
+    # ------------------------------------------------------------------
+    def current(self):
+        """
+        Matrix boolean host x label dari scan terbaru setiap host.
+        Host yang scan port terbarunya lebih baru dari semua barisnya tidak expose apa pun.
+        """
+        n_hosts, n_labels = len(self.hosts), len(self.labels)
+        latest = np.full(n_hosts, np.iinfo(np.int64).min, dtype=np.int64)
+        np.maximum.at(latest, self.scan_idx, self.scan_times)
+        np.maximum.at(latest, self.host_idx, self.times)
+        mask = self.times == latest[self.host_idx]
+        matrix = np.zeros((n_hosts, n_labels), dtype=bool)
+        matrix[self.host_idx[mask], self.label_idx[mask]] = True
+        return matrix
+
+    def exposure(self, limit: int = 20) -> List[Dict]:
+        """Label dengan host terbanyak (state terbaru)."""
+        counts = self.current().sum(axis=0).tolist()
+        total = len(self.hosts) or 1
+        ranked = sorted(range(len(self.labels)), key=lambda i: (-counts[i], self.labels[i]))[:limit]
+        return [
+            {self.by: self.labels[i], "hosts": int(counts[i]), "share": round(counts[i] / total, 4)}
+            for i in ranked if counts[i]
+        ]
+
+    # ------------------------------------------------------------------
+    # Trend per bucket waktu
+    # ------------------------------------------------------------------
+    def trends(self, bucket: str = "week", periods: int = 12, labels: Optional[List[str]] = None,
+               now: Optional[datetime] = None) -> Dict:
+        """Host distinct per label per bucket untuk `periods` bucket terakhir."""
+        size = BUCKET_SECONDS.get(bucket, BUCKET_SECONDS["week"])
+        end = _epoch(now or datetime.now(timezone.utc)) // size
+        start = end - periods + 1
+        position = {label: i for i, label in enumerate(self.labels)}
+        if not labels:
+            labels = [row[self.by] for row in self.exposure(limit=10)]
+        wanted = [position[label] for label in labels if label in position]
+        n_labels, n_hosts = len(self.labels), len(self.hosts)
+
+        if not len(self):
+            series = {}
+        else:
+            buckets = self.times // size - start
+            keep = (buckets >= 0) & (buckets < periods)
+            # Dedupe (bucket, host, label) -> satu host dihitung sekali per bucket
+            keys = np.unique((buckets[keep] * n_hosts + self.host_idx[keep]) * n_labels + self.label_idx[keep])
+            flat = (keys // (n_hosts * n_labels)) * n_labels + keys % n_labels
+            table = np.bincount(flat, minlength=periods * n_labels).reshape(periods, n_labels)
+            series = {self.labels[i]: table[:, i].tolist() for i in wanted}
+
+        bucket_starts = [
+            datetime.fromtimestamp((start + b) * size, tz=timezone.utc).date().isoformat() for b in range(periods)
+        ]
+        return {"bucket": bucket, "buckets": bucket_starts, "series": series}
+
+    # ------------------------------------------------------------------
+    # Outlier
+    # ------------------------------------------------------------------
+    def outliers(self, z: float = DEFAULT_OUTLIER_Z, limit: int = 50) -> Dict:
+        """Host dengan z-score jumlah label terbuka >= z, plus label langka per host."""
+        matrix = self.current()
+        n_hosts = len(self.hosts)
+        if n_hosts == 0:
+            return {"mean": 0.0, "std": 0.0, "hosts": [], "rare": []}
+
+        per_host = matrix.sum(axis=1).astype(float)
+        per_label = matrix.sum(axis=0)
+        mean, std = float(per_host.mean()), float(per_host.std())
+        scores = (per_host - mean) / std if std else np.zeros(n_hosts)
+        flagged = np.nonzero(scores >= z)[0].tolist()
+        per_host, scores = per_host.tolist(), scores.tolist()
+        rare_labels = set(np.nonzero((per_label > 0) & (per_label <= max(1, RARE_SERVICE_SHARE * n_hosts)))[0].tolist())
+        host_labels = [np.nonzero(row)[0].tolist() for row in matrix]
+
+        flagged.sort(key=lambda i: -scores[i])
+        hosts = [
+            {"host": self.hosts[i], "open": int(per_host[i]), "z": round(scores[i], 2)}
+            for i in flagged[:limit]
+        ]
+        rare = [
+            {"host": self.hosts[i], self.by: [self.labels[l] for l in host_labels[i] if l in rare_labels]}
+            for i in range(n_hosts) if any(l in rare_labels for l in host_labels[i])
+        ][:limit]
+        return {"mean": round(mean, 2), "std": round(std, 2), "hosts": hosts, "rare": rare}
@@ -2,6 +2,8 @@ from .nmap import NmapAnalyzer
 from .nikto import NiktoAnalyzer
 from .gobuster import GobusterAnalyzer
 from .sqlmap import SQLMapAnalyzer
+from .delta import analyze_delta
+from .. import findings
 
 _ANALYZERS = {
     "nmap": NmapAnalyzer(),
@@ -10,24 +12,14 @@ _ANALYZERS = {
     "sqlmap": SQLMapAnalyzer(),
 }
 
-def analyze_output(tool: str, execution_data: dict, target: str = None) -> dict:
-    """
-    Analyze output dari tool execution menggunakan AI.
-    
-    Args:
-        tool: Nama tool
-        execution_data: Dict dari run_command()
-        target: Target address (IP/Domain/URL)
-    
-    Returns:
-        dict: Analysis result dari LLM (sudah parsed JSON)
-    """
+def _resolve(tool: str, execution_data: dict):
+    """Returns (analyzer, None) or (None, error_dict)."""
     # Validasi tool
     tool = (tool or "").lower()
     analyzer = _ANALYZERS.get(tool)
     
     if not analyzer:
-        return {
+        return None, {
             "risk": "info",
             "summary": f"No analyzer for tool: {tool}",
             "error": "unknown_tool"
@@ -35,23 +27,80 @@ def analyze_output(tool: str, execution_data: dict, target: str = None) -> dict:
     
     # Validasi execution data
     if not execution_data or not execution_data.get("ok"):
-        return {
+        return None, {
             "risk": "unknown",
             "summary": "Execution failed or invalid",
             "error": "execution_failed",
             "execution_details": execution_data
         }
+    return analyzer, None
+
+
+def _analysis_input(analyzer, execution_data: dict, target: str = None, structured: dict = None) -> dict:
+    data = {
+        "tool": analyzer.tool_name,
+        "execution": execution_data,
+        "target": target
+    }
+    # Structured data yang sudah di-parse caller (mis. dari file output) tidak di-parse ulang
+    if structured is not None:
+        data["structured"] = structured
+    return data
+
+
+def analyze_output(tool: str, execution_data: dict, target: str = None, structured: dict = None,
+                   previous: dict = None, current_findings: list = None) -> dict:
+    """
+    Analyze output dari tool execution menggunakan AI.
+    
+    Args:
+        tool: Nama tool
+        execution_data: Dict dari run_command()
+        target: Target address (IP/Domain/URL)
+        structured: Hasil extract_structured_data* jika sudah tersedia (opsional)
+        previous: Scan completed sebelumnya untuk target yang sama
+                  ({"scan_id", "analysis", "findings"}); jika ada, hanya delta yang dikirim ke LLM
+        current_findings: Finding ternormalisasi scan ini untuk delta (wajib jika structured
+                          hanya memuat sampel host); default dinormalisasi dari structured
+    
+    Returns:
+        dict: Analysis result dari LLM (sudah parsed JSON)
+    """
+    analyzer, error = _resolve(tool, execution_data)
+    if error:
+        return error
     
     try:
-        result = analyzer.analyze({
-            "tool": tool,
-            "execution": execution_data,
-            "target": target
-        })
+        data = _analysis_input(analyzer, execution_data, target, structured)
+        if previous:
+            current = analyzer.parse(data)
+            if current.get("parsed"):
+                if current_findings is None:
+                    current_findings = findings.normalize_findings(tool, target, current)
+                result = analyze_delta(analyzer, data, previous, current_findings)
+                if result is not None:
+                    return result
+        result = analyzer.analyze(data)
         return result
     except Exception as e:
         return {
             "risk": "unknown",
             "summary": f"Analysis failed: {str(e)}",
             "error": "analysis_exception"
-        }
\ No newline at end of file
+        }
+
+
+async def analyze_output_async(tool: str, execution_data: dict, target: str = None, structured: dict = None) -> dict:
+    """asyncio variant of analyze_output (same validation and result shape)."""
+    analyzer, error = _resolve(tool, execution_data)
+    if error:
+        return error
+
+    try:
+        return await analyzer.analyze_async(_analysis_input(analyzer, execution_data, target, structured))
+    except Exception as e:
+        return {
+            "risk": "unknown",
+            "summary": f"Analysis failed: {str(e)}",
+            "error": "analysis_exception"
+        }
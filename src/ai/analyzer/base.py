@@ -1,5 +1,7 @@
-from ..llm.groq import call_groq
+from ..llm.groq import call_groq, call_groq_async
 from .parser import safe_parse_json
+from .prompt_builder import build_findings_block, fit_raw_text, compact_findings, DEFAULT_TOKEN_BUDGET
+from .structured_parser import extract_structured_data
 import logging # Import logging module
 
 logger = logging.getLogger(__name__) # Get a logger instance
@@ -7,15 +9,44 @@ logger.setLevel(logging.DEBUG) # Explicitly set logger level to DEBUG
 
 class BaseAnalyzer:
     tool_name: str = ""
+    model: str = "llama-3.1-8b-instant"
+    token_budget: int = DEFAULT_TOKEN_BUDGET
 
     def build_prompt(self, data: dict) -> str:
         raise NotImplementedError
 
-    def truncate_text(self, text: str, max_chars: int = 40000) -> str:
-        """Truncates text to prevent LLM context overflow."""
-        if not text: return ""
-        if len(text) <= max_chars: return text
-        return text[:max_chars] + "\n\n[... OUTPUT TRUNCATED DUE TO LENGTH ...]"
+    def parse(self, data: dict) -> dict:
+        """Structured data for this execution, parsed once and cached on `data`."""
+        if "structured" not in data:
+            execution = data.get("execution", {})
+            data["structured"] = extract_structured_data(
+                self.tool_name, execution.get("stdout", ""), execution.get("stderr", "")
+            )
+        return data["structured"]
+
+    def severity(self, data: dict) -> int:
+        """Highest severity signal among the compacted findings (0 if unparsed)."""
+        _, entries = compact_findings(self.tool_name, self.parse(data))
+        return max((score for score, _ in entries), default=0)
+
+    def known_vulnerabilities(self, data: dict) -> list:
+        """Evidence deterministik (mis. offline CVE index) yang dilampirkan ke hasil analisis."""
+        return []
+
+    def _attach_evidence(self, result: dict, data: dict) -> dict:
+        vulns = self.known_vulnerabilities(data)
+        if vulns:
+            result["known_vulnerabilities"] = vulns
+        return result
+
+    def render_output(self, structured: dict, raw_text: str) -> str:
+        """
+        Renders tool output for the prompt within `token_budget`.
+        Structured findings are compacted and ranked; raw text is the fallback.
+        """
+        if structured.get("parsed"):
+            return build_findings_block(self.tool_name, structured, budget=self.token_budget, model=self.model)
+        return fit_raw_text(raw_text, budget=self.token_budget, model=self.model)
 
     def _ensure_schema(self, data: dict, target: str = "Unknown") -> dict:
         """Ensures the analysis dict matches the expected frontend schema."""
@@ -44,6 +75,14 @@ class BaseAnalyzer:
                         
         return data
 
+    def _finish(self, raw_response, target: str) -> dict:
+        if isinstance(raw_response, str):
+            parsed = safe_parse_json(raw_response)
+            # Ensure we have the full schema
+            return self._ensure_schema(parsed, target=target)
+        else:
+            return self._ensure_schema({"error": "Unexpected LLM response type"}, target=target)
+
     def analyze(self, data: dict) -> dict:
         """
         Analyze execution data menggunakan LLM.
@@ -52,15 +91,22 @@ class BaseAnalyzer:
         target = data.get("target", "Unknown")
         
         try:
-            raw_response = call_groq(prompt)
-            
-            if isinstance(raw_response, str):
-                parsed = safe_parse_json(raw_response)
-                # Ensure we have the full schema
-                return self._ensure_schema(parsed, target=target)
-            else:
-                return self._ensure_schema({"error": "Unexpected LLM response type"}, target=target)
+            raw_response = call_groq(prompt, route=f"analyzer:{self.tool_name}", severity=self.severity(data))
+            return self._attach_evidence(self._finish(raw_response, target), data)
                 
         except Exception as e:
             logger.error(f"LLM call or parsing failed: {str(e)}", exc_info=True)
-            return self._ensure_schema({"error": f"LLM failure: {str(e)}"}, target=target)
\ No newline at end of file
+            return self._ensure_schema({"error": f"LLM failure: {str(e)}"}, target=target)
+
+    async def analyze_async(self, data: dict) -> dict:
+        """asyncio variant of analyze() for bulk orchestration."""
+        prompt = self.build_prompt(data)
+        target = data.get("target", "Unknown")
+
+        try:
+            raw_response = await call_groq_async(prompt, route=f"analyzer:{self.tool_name}", severity=self.severity(data))
+            return self._attach_evidence(self._finish(raw_response, target), data)
+
+        except Exception as e:
+            logger.error(f"LLM call or parsing failed: {str(e)}", exc_info=True)
+            return self._ensure_schema({"error": f"LLM failure: {str(e)}"}, target=target)
@@ -0,0 +1,119 @@
+"""
+Delta-only re-analysis untuk target yang sudah pernah di-scan.
+
+Findings scan baru dibandingkan dengan scan completed sebelumnya (tool dan
+target sama). LLM hanya menerima delta + ringkasan analisis sebelumnya dan
+mengembalikan analisis gabungan. Tanpa perubahan, analisis sebelumnya dipakai
+ulang tanpa LLM call; kalau delta terlalu besar, caller jatuh ke analisis penuh.
+"""
+import copy
+import json
+import logging
+import os
+from typing import Dict, List, Optional
+
+from .. import findings
+from ..llm.groq import call_groq
+from .prompt_builder import fit_raw_text, severity_signal
+
+logger = logging.getLogger(__name__)
+
+# Rasio perubahan (jumlah item delta / jumlah finding) di atas ini -> analisis penuh
+DELTA_MAX_CHANGE_RATIO = float(os.getenv("ANALYZER_DELTA_MAX_CHANGE_RATIO", 0.5))
+DELTA_TOKEN_BUDGET = int(os.getenv("ANALYZER_DELTA_TOKEN_BUDGET", 1200))
+
+_PRIOR_FIELDS = ("summary", "analysis", "issue", "impact", "recommendations")
+
+
+def change_ratio(diff: Dict, previous: List[Dict], current: List[Dict]) -> float:
+    changes = sum(diff["summary"].values())
+    total = max(len(previous), len(current), 1)
+    return changes / total
+
+
+def _delta_lines(diff: Dict) -> str:
+    """Satu baris JSON per item delta, supaya fit_raw_text bisa membuang yang paling tidak penting."""
+    lines = []
+    for group in ("vulnerabilities", "ports", "paths"):
+        for change, items in diff[group].items():
+            for item in items:
+                lines.append(json.dumps({"change": f"{group}.{change}", **item}, separators=(",", ":")))
+    return "\n".join(lines)
+
+
+def build_delta_prompt(tool: str, target: str, previous_analysis: Dict, diff: Dict, budget: int = None) -> str:
+    prior = {key: previous_analysis.get(key) for key in _PRIOR_FIELDS if previous_analysis.get(key)}
+    delta_block = fit_raw_text(_delta_lines(diff), budget or DELTA_TOKEN_BUDGET)
+    return f"""
+You are a Senior Cybersecurity Analyst. The target was scanned before with {tool}; you are given the previous
+analysis and ONLY what changed since then. Update the analysis accordingly.
+
+Target: {target}
+Previous analysis:
+{json.dumps(prior, separators=(",", ":"))}
+
+Changes since previous scan ({json.dumps(diff["summary"], separators=(",", ":"))}):
+{delta_block}
+
+TASK:
+Return the merged, up-to-date analysis as JSON with this schema:
+{{
+  "metadata": {{"target": "{target}", "confidence": "Low|Medium|High"}},
+  "analysis": "Updated technical analysis; state explicitly what changed and what remains from the previous scan.",
+  "issue": {{"type": "...", "severity": "info|low|medium|high|critical", "endpoint": "...", "parameter": "...", "owasp": "..."}},
+  "evidence": {{"payload": "N/A or specific probe", "response_behavior": "Observation confirming the change"}},
+  "impact": "...",
+  "recommendations": ["..."],
+  "next_actions": ["..."],
+  "summary": "One-sentence executive summary including the most important change."
+}}
+
+RULES:
+- Return ONLY valid JSON.
+- Findings not listed as changed are unchanged; keep them from the previous analysis.
+- Closed ports, removed paths and resolved CVEs should no longer be reported as current issues.
+- **Tool Awareness**: You ONLY have access to these internal tools: `nmap`, `gobuster`, `nikto`, `sqlmap`.
+"""
+
+
+def _delta_info(previous_scan_id: Optional[int], diff: Dict, mode: str) -> Dict:
+    return {"mode": mode, "previous_scan_id": previous_scan_id, "changes": diff["summary"]}
+
+
+def analyze_delta(analyzer, data: Dict, previous: Dict, current_findings: List[Dict]) -> Optional[Dict]:
+    """
+    Analisis gabungan berbasis delta, atau None jika analisis penuh lebih tepat
+    (tidak ada analisis sebelumnya yang valid, atau perubahan terlalu besar).
+
+    previous: {"scan_id", "analysis": dict, "findings": [finding dict]}
+    """
+    previous_analysis = previous.get("analysis")
+    if not isinstance(previous_analysis, dict) or previous_analysis.get("error"):
+        return None
+
+    previous_findings = previous.get("findings") or []
+    diff = findings.diff_findings(previous_findings, current_findings)
+    target = data.get("target", "Unknown")
+
+    if not diff["changed"]:
+        # Tidak ada perubahan struktural: pakai ulang analisis sebelumnya tanpa LLM call
+        result = copy.deepcopy(previous_analysis)
+        result["delta"] = _delta_info(previous.get("scan_id"), diff, "unchanged")
+        return analyzer._attach_evidence(result, data)
+
+    if change_ratio(diff, previous_findings, current_findings) > DELTA_MAX_CHANGE_RATIO:
+        return None
+
+    prompt = build_delta_prompt(analyzer.tool_name, target, previous_analysis, diff)
+    severity = max((severity_signal(line) for line in _delta_lines(diff).splitlines()), default=0)
+    try:
+        raw_response = call_groq(prompt, route=f"analyzer:{analyzer.tool_name}:delta", severity=severity)
+    except Exception as e:
+        logger.error(f"Delta analysis failed, falling back to full analysis: {str(e)}")
+        return None
+
+    result = analyzer._finish(raw_response, target)
+    if result.get("error"):
+        return None
+    result["delta"] = _delta_info(previous.get("scan_id"), diff, "delta")
+    return analyzer._attach_evidence(result, data)
@@ -1,6 +1,4 @@
 from .base import BaseAnalyzer
-from .structured_parser import extract_structured_data
-import json
 
 class GobusterAnalyzer(BaseAnalyzer):
     tool_name = "gobuster"
@@ -8,15 +6,11 @@ class GobusterAnalyzer(BaseAnalyzer):
     def build_prompt(self, data: dict) -> str:
         execution = data.get("execution", {})
         stdout = execution.get("stdout", "")
-        stderr = execution.get("stderr", "")
         target = data.get("target", "Unknown")
         
         # Extract structured data
-        structured = extract_structured_data("gobuster", stdout, stderr)
-        if structured.get("parsed"):
-            gobuster_data = json.dumps(structured.get('findings', []), indent=2)
-        else:
-            gobuster_data = self.truncate_text(stdout)
+        structured = self.parse(data)
+        gobuster_data = self.render_output(structured, stdout)
 
         return f"""
 You are a penetration testing expert. Analyze the Gobuster directory/file brute-forcing results.
@@ -1,7 +1,5 @@
 from typing import Dict, List
 from .base import BaseAnalyzer
-from .structured_parser import extract_structured_data
-import json
 
 class NiktoAnalyzer(BaseAnalyzer):
     tool_name = "nikto"
@@ -13,12 +11,9 @@ class NiktoAnalyzer(BaseAnalyzer):
         target = data.get("target", "Unknown")
         
         # Coba extract structured data
-        structured = extract_structured_data("nikto", stdout, stderr)
+        structured = self.parse(data)
         
-        if structured.get("parsed"):
-            nikto_data = json.dumps(structured, indent=2)
-        else:
-            nikto_data = self.truncate_text(f"Stdout: {stdout}\n\nStderr: {stderr}")
+        nikto_data = self.render_output(structured, f"Stdout: {stdout}\n\nStderr: {stderr}")
 
         return f"""
 You are a Web Security Expert. Analyze the Nikto scan results with a critical and thorough eye.
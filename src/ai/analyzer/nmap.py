@@ -1,23 +1,35 @@
-from .base import BaseAnalyzer
-from .structured_parser import extract_structured_data
 import json
+from .base import BaseAnalyzer
+from ..vulndb import service_vulnerabilities
 
 
 class NmapAnalyzer(BaseAnalyzer):
     tool_name = "nmap"
 
+    def known_vulnerabilities(self, data: dict) -> list:
+        """CVE dari offline index untuk setiap product/version yang ditemukan (dihitung sekali per data)."""
+        if "known_vulnerabilities" not in data:
+            data["known_vulnerabilities"] = service_vulnerabilities(self.parse(data))
+        return data["known_vulnerabilities"]
+
     def build_prompt(self, data: dict) -> str:
         execution = data.get("execution", {})
         stdout = execution.get("stdout", "")
         target = data.get("target", "Unknown")
         
         # Coba extract structured data
-        structured = extract_structured_data("nmap", stdout)
+        structured = self.parse(data)
         
-        if structured.get("parsed"):
-            nmap_data = json.dumps(structured, indent=2)
-        else:
-            nmap_data = self.truncate_text(stdout)
+        nmap_data = self.render_output(structured, stdout)
+
+        vulns = self.known_vulnerabilities(data)
+        known_block = ""
+        if vulns:
+            known_block = "\nKnown CVEs (offline NVD index, matched by product/version):\n" + "\n".join(
+                json.dumps({"product": v["product"], "version": v["version"], "cves": [c["cve"] for c in v["cves"]]},
+                           separators=(",", ":"))
+                for v in vulns
+            ) + "\n"
         
         return f"""
 You are a Senior Cybersecurity Analyst. Analyze the Nmap scan results with clinical precision and deep technical insight.
@@ -25,7 +37,7 @@ You are a Senior Cybersecurity Analyst. Analyze the Nmap scan results with clini
 Target: {target}
 Nmap Output:
 {nmap_data}
-
+{known_block}
 TASK:
 Generate a high-quality, professional security analysis in JSON format.
 Your analysis must be CRITICAL, DETAILED, and ACTIONABLE.
@@ -60,5 +72,6 @@ RULES:
 - **Strategic Chaining**: If web services are found, suggest `gobuster` or `nikto` in 'next_actions'.
 - Be technical and professional.
 - Avoid generic advice; be specific to the versions or services found.
+- Only cite CVEs listed under "Known CVEs"; do not guess CVE IDs from version numbers.
 - If multiple issues exist, focus on the most critical one in the 'issue' block, but mention others in 'analysis'.
 """
\ No newline at end of file
@@ -0,0 +1,276 @@
+"""
+Token-budgeted prompt builder untuk analyzer.
+
+Structured findings dikompakkan dulu (nikto item berulang digabung, port
+dikelompokkan per service, closed/filtered dibuang), lalu diurutkan
+berdasarkan severity signal dan diisi sampai token budget habis.
+"""
+import json
+import os
+import re
+from typing import Dict, List, Tuple
+
+from ..llm.tokens import count_tokens
+
+DEFAULT_TOKEN_BUDGET = int(os.getenv("ANALYZER_TOKEN_BUDGET", 3000))
+
+# Keyword -> weight. Dipakai untuk meranking baris/entry yang paling penting.
+SEVERITY_KEYWORDS = {
+    "cve-": 8,
+    "remote code": 8,
+    "rce": 8,
+    "sql injection": 8,
+    "is vulnerable": 8,
+    "command injection": 8,
+    "backdoor": 8,
+    "traversal": 6,
+    "xss": 6,
+    "cross-site": 6,
+    "inject": 6,
+    "password": 6,
+    "credential": 6,
+    "anonymous": 6,
+    "default": 5,
+    "admin": 5,
+    "backup": 5,
+    ".git": 5,
+    ".env": 5,
+    "config": 4,
+    "outdated": 4,
+    "vulnerab": 4,
+    "phpinfo": 4,
+    "upload": 4,
+    "directory indexing": 3,
+    "debug": 3,
+    "allowed http methods": 2,
+    "header": 1,
+    "cookie": 1,
+}
+
+# Service yang secara default menambah attack surface.
+RISKY_SERVICES = {
+    "telnet": 6, "ftp": 5, "microsoft-ds": 5, "netbios-ssn": 4, "ms-wbt-server": 5,
+    "vnc": 5, "mysql": 4, "postgresql": 4, "ms-sql-s": 4, "mongodb": 5, "redis": 5,
+    "snmp": 4, "rpcbind": 3, "smtp": 2, "http": 2, "https": 2, "http-proxy": 3,
+    "ssh": 1,
+}
+
+_NIKTO_PATH_PREFIX = re.compile(r"^/\S*:\s*")
+_NUMBERS = re.compile(r"\d+")
+_OMITTED_MARKER = "[... {count} lower-priority entries omitted to fit token budget ...]"
+
+
+def severity_signal(text: str) -> int:
+    """Skor heuristik seberapa 'penting' sebuah potongan teks."""
+    lowered = (text or "").lower()
+    return sum(weight for keyword, weight in SEVERITY_KEYWORDS.items() if keyword in lowered)
+
+
+# ==========================================================
+# COMPACTION PER TOOL
+# ==========================================================
+def compact_nmap(structured: Dict) -> Tuple[Dict, List[Tuple[int, Dict]]]:
+    """Kelompokkan port terbuka per service dan buang closed/filtered."""
+    hosts = structured.get("hosts", [])
+    groups = {}
+    dropped = 0
+
+    for host in hosts:
+        addr = next((a.get("addr") for a in host.get("addresses", []) if a.get("addrtype") != "mac"), None)
+        for port in host.get("ports", []):
+            if port.get("state") != "open":
+                dropped += 1
+                continue
+            service = port.get("service") or {}
+            key = (
+                service.get("name", ""),
+                service.get("product", ""),
+                service.get("version", ""),
+                service.get("extrainfo", ""),
+            )
+            groups.setdefault(key, []).append(f"{addr}:{port.get('port')}/{port.get('protocol')}")
+
+    entries = []
+    for (name, product, version, extrainfo), endpoints in groups.items():
+        entry = {"service": name or "unknown", "endpoints": endpoints}
+        if product:
+            entry["product"] = product
+        if version:
+            entry["version"] = version
+        if extrainfo:
+            entry["extrainfo"] = extrainfo
+        score = RISKY_SERVICES.get(name, 0) + severity_signal(f"{product} {extrainfo}")
+        # Versi spesifik = bisa dicocokkan dengan CVE, lebih berguna untuk analis.
+        if version:
+            score += 2
+        entries.append((score, entry))
+
+    header = {
+        "hosts_total": len(hosts),
+        "hosts_up": sum(1 for h in hosts if h.get("status") == "up"),
+        "open_service_groups": len(entries),
+        "closed_or_filtered_dropped": dropped,
+    }
+    # Sweep besar hanya membawa sampel host; angka total diambil dari agregat parser
+    summary = structured.get("summary")
+    if structured.get("sampled") and summary:
+        header.update({
+            "hosts_total": summary["hosts_total"],
+            "hosts_up": summary["hosts_up"],
+            "open_ports_total": summary["open_ports"],
+            "closed_or_filtered_dropped": summary["ports_total"] - summary["open_ports"],
+            "hosts_in_sample": len(hosts),
+        })
+    return header, entries
+
+
+def compact_nikto(structured: Dict) -> Tuple[Dict, List[Tuple[int, Dict]]]:
+    """Gabungkan item nikto yang berulang (deskripsi sama, URI berbeda)."""
+    groups = {}
+    for item in structured.get("items", []):
+        description = (item.get("description") or "").strip()
+        key = _NUMBERS.sub("#", _NIKTO_PATH_PREFIX.sub("", description)).lower()
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {"description": description, "count": 0, "uris": []}
+            if item.get("osvdbid") and item.get("osvdbid") != "0":
+                group["osvdbid"] = item.get("osvdbid")
+        group["count"] += 1
+        uri = item.get("uri")
+        if uri and uri not in group["uris"] and len(group["uris"]) < 5:
+            group["uris"].append(uri)
+
+    entries = []
+    for group in groups.values():
+        if group["count"] == 1:
+            del group["count"]
+        if not group["uris"]:
+            del group["uris"]
+        entries.append((severity_signal(group["description"] + " " + " ".join(group.get("uris", []))), group))
+
+    header = {
+        "target": structured.get("target", {}),
+        "items_total": len(structured.get("items", [])),
+        "unique_findings": len(entries),
+        "statistics": structured.get("statistics", {}),
+    }
+    return header, entries
+
+
+def compact_gobuster(structured: Dict) -> Tuple[Dict, List[Tuple[int, Dict]]]:
+    """Ranking path gobuster berdasarkan status code dan sensitivitas path."""
+    status_weight = {200: 3, 204: 3, 401: 2, 403: 2, 500: 2}
+    entries = []
+    for finding in structured.get("findings", []):
+        status = finding.get("status")
+        score = status_weight.get(status, 1) + severity_signal(finding.get("path", ""))
+        entries.append((score, finding))
+
+    header = {"paths_total": len(entries)}
+    return header, entries
+
+
+def compact_sqlmap(structured: Dict) -> Tuple[Dict, List[Tuple[int, Dict]]]:
+    entries = [(severity_signal(p) + 5, {"payload": p}) for p in structured.get("payloads", [])]
+    header = {"vulnerable": structured.get("vulnerable", False)}
+    return header, entries
+
+
+_COMPACTORS = {
+    "nmap": compact_nmap,
+    "nikto": compact_nikto,
+    "gobuster": compact_gobuster,
+    "sqlmap": compact_sqlmap,
+}
+
+
+def compact_findings(tool: str, structured: Dict) -> Tuple[Dict, List[Tuple[int, Dict]]]:
+    """Header ringkasan + daftar (severity_score, entry) untuk tool yang didukung."""
+    compactor = _COMPACTORS.get(tool)
+    if compactor is None or not structured.get("parsed"):
+        return {}, []
+    return compactor(structured)
+
+
+# ==========================================================
+# BUDGET FILLING
+# ==========================================================
+def _fill_budget(header_text: str, ranked: List[Tuple[int, str]], budget: int, model: str) -> str:
+    """Masukkan baris dengan skor tertinggi dulu sampai budget habis."""
+    lines = [header_text]
+    used = count_tokens(header_text, model)
+    # Sisakan ruang untuk marker "omitted" supaya tidak melewati budget.
+    reserve = count_tokens(_OMITTED_MARKER.format(count=999999), model)
+    omitted = 0
+
+    for index, (_, line) in enumerate(ranked):
+        cost = count_tokens(line, model) + 1
+        remaining_after = len(ranked) - index - 1
+        limit = budget - (reserve if remaining_after else 0)
+        if used + cost > limit:
+            omitted = len(ranked) - index
+            break
+        lines.append(line)
+        used += cost
+
+    if omitted:
+        lines.append(_OMITTED_MARKER.format(count=omitted))
+    return "\n".join(lines)
+
+
+def build_findings_block(tool: str, structured: Dict, budget: int = None, model: str = None) -> str:
+    """
+    Render structured data menjadi blok prompt yang kompak dan muat di budget.
+
+    Entry diurutkan berdasarkan severity signal (stabil terhadap urutan asli),
+    satu entry per baris dalam JSON kompak.
+    """
+    budget = budget or DEFAULT_TOKEN_BUDGET
+    compactor = _COMPACTORS.get(tool)
+    if compactor is None:
+        return fit_raw_text(json.dumps(structured, separators=(",", ":")), budget, model)
+
+    header, entries = compactor(structured)
+    if structured.get("partial"):
+        header["partial"] = True
+    ranked = sorted(
+        ((score, json.dumps(entry, separators=(",", ":"))) for score, entry in entries),
+        key=lambda pair: -pair[0],
+    )
+    return _fill_budget(json.dumps(header, separators=(",", ":")), ranked, budget, model)
+
+
+def fit_raw_text(text: str, budget: int = None, model: str = None) -> str:
+    """
+    Fallback untuk output yang tidak bisa di-parse.
+
+    Kalau teks melebihi budget, pertahankan baris dengan severity signal tertinggi
+    (urutan asli tetap dijaga) alih-alih memotong di karakter ke-N.
+    """
+    budget = budget or DEFAULT_TOKEN_BUDGET
+    if not text:
+        return ""
+    if count_tokens(text, model) <= budget:
+        return text
+
+    lines = [line for line in text.splitlines() if line.strip()]
+    reserve = count_tokens(_OMITTED_MARKER.format(count=999999), model)
+    order = sorted(range(len(lines)), key=lambda i: (-severity_signal(lines[i]), i))
+
+    keep = set()
+    used = 0
+    for i in order:
+        cost = count_tokens(lines[i], model) + 1
+        if used + cost > budget - reserve:
+            continue
+        keep.add(i)
+        used += cost
+
+    if not keep:
+        # Satu baris raksasa (mis. XML tanpa newline): potong proporsional.
+        max_chars = int(len(text) * (budget - reserve) / count_tokens(text, model))
+        return text[:max_chars] + "\n" + _OMITTED_MARKER.format(count=1)
+
+    kept = [lines[i] for i in sorted(keep)]
+    kept.append(_OMITTED_MARKER.format(count=len(lines) - len(kept)))
+    return "\n".join(kept)
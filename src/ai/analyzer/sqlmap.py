@@ -1,6 +1,4 @@
 from .base import BaseAnalyzer
-from .structured_parser import extract_structured_data
-import json
 
 class SQLMapAnalyzer(BaseAnalyzer):
     tool_name = "sqlmap"
@@ -8,15 +6,11 @@ class SQLMapAnalyzer(BaseAnalyzer):
     def build_prompt(self, data: dict) -> str:
         execution = data.get("execution", {})
         stdout = execution.get("stdout", "")
-        stderr = execution.get("stderr", "")
         target = data.get("target", "Unknown")
         
         # Extract structured data
-        structured = extract_structured_data("sqlmap", stdout, stderr)
-        if structured.get("parsed"):
-            sqlmap_data = f"Vulnerable: {structured.get('vulnerable')}\nPayloads: {json.dumps(structured.get('payloads', []), indent=2)}"
-        else:
-            sqlmap_data = self.truncate_text(stdout)
+        structured = self.parse(data)
+        sqlmap_data = self.render_output(structured, stdout)
 
         return f"""
 You are a Database Security Expert. Analyze the SQLMap automated injection test results with extreme detail and critical thinking.
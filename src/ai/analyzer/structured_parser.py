@@ -1,88 +1,256 @@
+import io
+import os
+import re
 import xml.etree.ElementTree as ET
-from typing import Dict, List, Optional
+from typing import IO, Callable, Dict, Iterable, Iterator, List, Optional, Union
 
 
-def parse_nmap_xml(xml_output: str) -> Dict:
+XML_DECL = b"<?xml"
+XML_SNIFF_BYTES = 64 * 1024
+
+NIKTO_ITEM_FIELDS = ("description", "uri", "namelink", "iplink")
+GOBUSTER_FOUND_RE = re.compile(r"Found: (.*?) \(Status: (\d+)\)")
+SQLMAP_VULNERABLE_RE = re.compile(r"is vulnerable|confirmed", re.IGNORECASE)
+SQLMAP_PAYLOAD_RE = re.compile(r"Payload: (.*)")
+SQLMAP_MAX_PAYLOADS = 5
+# Host (dengan port terbuka) yang disimpan sebagai sampel prompt saat host di-stream ke callback
+NMAP_SAMPLE_HOSTS = int(os.getenv("NMAP_SAMPLE_HOSTS", 200))
+
+
+def _nmap_host(host: ET.Element) -> Dict:
+    """Satu elemen <host> -> dict host (struktur sama dengan versi lama)."""
+    status = host.find('status')
+    host_info = {
+        "status": status.get('state') if status is not None else "unknown",
+        "addresses": [
+            {"addr": address.get('addr'), "addrtype": address.get('addrtype')}
+            for address in host.iterfind('address')
+        ],
+        "hostnames": [name.get('name') for name in host.iterfind('hostnames/hostname') if name.get('name')],
+        "ports": [],
+    }
+
+    for port in host.iterfind('ports/port'):
+        state = port.find('state')
+        port_info = {
+            "port": port.get('portid'),
+            "protocol": port.get('protocol'),
+            "state": state.get('state') if state is not None else "unknown",
+            "service": {}
+        }
+        service_elem = port.find('service')
+        if service_elem is not None:
+            port_info["service"] = {
+                "name": service_elem.get('name', ''),
+                "product": service_elem.get('product', ''),
+                "version": service_elem.get('version', ''),
+                "extrainfo": service_elem.get('extrainfo', '')
+            }
+        host_info["ports"].append(port_info)
+
+    return host_info
+
+
+def _open_xml_source(source: Union[str, os.PathLike, IO[bytes]]) -> Optional[IO[bytes]]:
     """
-    Parse nmap XML output menjadi struktur data yang lebih terstruktur.
-    
+    Buka file (path atau binary file object) dan posisikan di awal deklarasi XML,
+    sehingga teks sebelum `<?xml` (warning, banner) dilewati chunk per chunk
+    tanpa membaca seluruh file ke memory.
+    """
+    f = open(source, 'rb') if isinstance(source, (str, os.PathLike)) else source
+    offset = f.tell()
+    carry = b""
+    while True:
+        chunk = f.read(XML_SNIFF_BYTES)
+        if not chunk:
+            break
+        window = carry + chunk
+        start = window.find(XML_DECL)
+        if start >= 0:
+            f.seek(offset - len(carry) + start)
+            return f
+        # Simpan ekor chunk untuk deklarasi yang terpotong di batas chunk
+        carry = window[-(len(XML_DECL) - 1):]
+        offset += len(chunk)
+    if f is not source:
+        f.close()
+    return None
+
+
+def iter_nmap_hosts(source: Union[str, os.PathLike, IO[bytes]]) -> Iterator[Dict]:
+    """
+    Streaming parser nmap XML: yield host satu per satu dengan ET.iterparse.
+
+    Elemen host dibersihkan setelah diproses, jadi memory tetap konstan terhadap
+    jumlah host (cocok untuk sweep /16). `source` boleh path file stdout atau
+    binary file object. Raise ET.ParseError jika dokumen rusak.
+    """
+    f = _open_xml_source(source)
+    if f is None:
+        return
+    try:
+        root = None
+        for event, elem in ET.iterparse(f, events=('start', 'end')):
+            if event == 'start':
+                if root is None:
+                    root = elem
+                continue
+            if elem.tag == 'host':
+                yield _nmap_host(elem)
+                # Lepas host yang sudah diproses dari tree
+                elem.clear()
+                root.clear()
+    finally:
+        if f is not source:
+            f.close()
+
+
+def parse_nmap_stream(source: Union[str, os.PathLike, IO[bytes]], keep_hosts: bool = True,
+                      on_host: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    Parse nmap XML dari file/stream dan bangun agregat secara incremental.
+
+    Jika `on_host` diberikan, setiap host diteruskan ke callback begitu selesai
+    di-parse dan "hosts" hanya berisi sampel terbatas (NMAP_SAMPLE_HOSTS host
+    pertama yang punya port terbuka), sehingga memory tidak tumbuh dengan jumlah host.
+
     Returns:
         Dict dengan struktur:
         {
-            "hosts": [...],
-            "ports": [...],
-            "services": [...]
+            "hosts": [...],          # kosong jika keep_hosts=False, sampel jika on_host diberikan
+            "summary": {"hosts_total", "hosts_up", "ports_total", "open_ports", "services": {name: count}},
+            "parsed": True,
+            "partial": True,         # hanya jika XML terpotong; host lengkap sebelum titik potong tetap dipakai
+            "sampled": True          # hanya jika "hosts" tidak memuat semua host
         }
     """
+    hosts = []
+    summary = {"hosts_total": 0, "hosts_up": 0, "ports_total": 0, "open_ports": 0, "services": {}}
     try:
-        root = ET.fromstring(xml_output)
-        
-        hosts = []
-        ports = []
-        services = []
-        
-        for host in root.findall('host'):
-            host_info = {
-                "status": host.find('status').get('state') if host.find('status') is not None else "unknown",
-                "addresses": []
-            }
-            
-            host_ports = [] # Initialize host-specific ports list
-            host_services = [] # Initialize host-specific services list
-            
-            # Get addresses
-            for address in host.findall('address'):
-                host_info["addresses"].append({
-                    "addr": address.get('addr'),
-                    "addrtype": address.get('addrtype')
-                })
-            
-            # Get ports
-            ports_elem = host.find('ports')
-            if ports_elem is not None:
-                for port in ports_elem.findall('port'):
-                    port_info = {
-                        "port": port.get('portid'),
-                        "protocol": port.get('protocol'),
-                        "state": port.find('state').get('state') if port.find('state') is not None else "unknown",
-                        "service": {}
+        for host in iter_nmap_hosts(source):
+            summary["hosts_total"] += 1
+            if host["status"] == "up":
+                summary["hosts_up"] += 1
+            for port in host["ports"]:
+                summary["ports_total"] += 1
+                if port["state"] == "open":
+                    summary["open_ports"] += 1
+                name = port["service"].get("name")
+                if name:
+                    summary["services"][name] = summary["services"].get(name, 0) + 1
+            if on_host is not None:
+                on_host(host)
+                if len(hosts) >= NMAP_SAMPLE_HOSTS or not any(p["state"] == "open" for p in host["ports"]):
+                    continue
+            if keep_hosts:
+                hosts.append(host)
+        return _nmap_result(hosts, summary)
+    except ET.ParseError as e:
+        # Output terpotong (scan di-kill oleh TIMEOUTS): simpan semua host yang lengkap.
+        if summary["hosts_total"]:
+            return {**_nmap_result(hosts, summary), "partial": True, "error": f"XML truncated: {str(e)}"}
+        return {"parsed": False, "error": f"XML parse error: {str(e)}"}
+    except Exception as e:
+        return {"parsed": False, "error": f"Parse error: {str(e)}"}
+
+
+def _nmap_result(hosts: List[Dict], summary: Dict) -> Dict:
+    result = {"hosts": hosts, "summary": summary, "parsed": True}
+    if len(hosts) < summary["hosts_total"]:
+        result["sampled"] = True
+    return result
+
+
+def parse_nmap_file(path: Union[str, os.PathLike]) -> Dict:
+    """Parse nmap XML langsung dari file stdout yang di-spool (tanpa load ke memory)."""
+    return parse_nmap_stream(path)
+
+
+def parse_nmap_xml(xml_output: str) -> Dict:
+    """
+    Parse nmap XML output (string) menjadi struktur data yang lebih terstruktur.
+    Wrapper di atas parse_nmap_stream; untuk output besar gunakan parse_nmap_file.
+    """
+    return parse_nmap_stream(io.BytesIO(xml_output.encode('utf-8')))
+
+
+def _nikto_item(item: ET.Element) -> Dict:
+    """Satu elemen <item> -> dict; child element dibaca sekali (single pass)."""
+    info = {
+        "id": item.get('id', ''),
+        "osvdbid": item.get('osvdbid', ''),
+        "osvdblink": item.get('osvdblink', ''),
+    }
+    for field in NIKTO_ITEM_FIELDS:
+        info[field] = ''
+    for child in item:
+        if child.tag in NIKTO_ITEM_FIELDS and not info[child.tag]:
+            info[child.tag] = child.text
+    return info
+
+
+def parse_nikto_stream(source: Union[str, os.PathLike, IO[bytes]]) -> Dict:
+    """
+    Parse nikto XML dari file/stream dengan ET.iterparse.
+
+    Item yang sudah diproses dilepas dari parent-nya. Jika XML terpotong (nikto
+    di-kill oleh TIMEOUTS), semua <item> lengkap tetap dikembalikan dengan
+    "partial": True.
+    """
+    result = {
+        "target": {},
+        "items": [],
+        "statistics": {},
+        "parsed": True
+    }
+    f = _open_xml_source(source)
+    if f is None:
+        return {"parsed": False, "error": "No XML content"}
+
+    stack = []
+    try:
+        for event, elem in ET.iterparse(f, events=('start', 'end')):
+            if event == 'start':
+                stack.append(elem)
+                # Atribut tersedia saat start, jadi target tetap tercatat walau dokumen terpotong
+                if elem.tag == 'scandetails' and not result["target"]:
+                    result["target"] = {
+                        "targetip": elem.get('targetip', ''),
+                        "targethostname": elem.get('targethostname', ''),
+                        "targetport": elem.get('targetport', ''),
+                        "targetbanner": elem.get('targetbanner', '')
                     }
-                    
-                    # Get service info
-                    service_elem = port.find('service')
-                    if service_elem is not None:
-                        port_info["service"] = {
-                            "name": service_elem.get('name', ''),
-                            "product": service_elem.get('product', ''),
-                            "version": service_elem.get('version', ''),
-                            "extrainfo": service_elem.get('extrainfo', '')
-                        }
-                        host_services.append(port_info["service"]) # Add to host-specific services
-                    
-                    host_ports.append(port_info) # Add to host-specific ports
-            
-            host_info["ports"] = host_ports # Assign host-specific ports
-            hosts.append(host_info)
-            # Accumulate all services for a global list, if needed, otherwise remove the global 'services' list entirely
-            services.extend(host_services)
-            ports.extend(host_ports)
-        
-        return {
-            "hosts": hosts,
-            "ports": ports, # Global list of all ports
-            "services": services, # Global list of all services
-            "parsed": True
-        }
+                continue
+
+            stack.pop()
+            if elem.tag == 'item':
+                result["items"].append(_nikto_item(elem))
+                if stack:
+                    stack[-1].remove(elem)
+            elif elem.tag == 'statistics':
+                result["statistics"] = {
+                    "elapsed": elem.get('elapsed', ''),
+                    "itemsfound": elem.get('itemsfound', ''),
+                    "itemstested": elem.get('itemstested', '')
+                }
+        return result
     except ET.ParseError as e:
+        if result["items"] or result["target"]:
+            result["partial"] = True
+            result["error"] = f"XML truncated: {str(e)}"
+            return result
         return {"parsed": False, "error": f"XML parse error: {str(e)}"}
     except Exception as e:
         return {"parsed": False, "error": f"Parse error: {str(e)}"}
+    finally:
+        if f is not source:
+            f.close()
 
 
 def parse_nikto_xml(xml_output: str) -> Dict:
     """
     Parse nikto XML output menjadi struktur data yang lebih terstruktur.
-    
+
     Returns:
         Dict dengan struktur:
         {
@@ -91,70 +259,24 @@ def parse_nikto_xml(xml_output: str) -> Dict:
             "statistics": {...}
         }
     """
-    try:
-        root = ET.fromstring(xml_output)
-        
-        result = {
-            "target": {},
-            "items": [],
-            "statistics": {},
-            "parsed": True
-        }
-        
-        # Parse target info
-        scan_details = root.find('scandetails')
-        if scan_details is not None:
-            result["target"] = {
-                "targetip": scan_details.get('targetip', ''),
-                "targethostname": scan_details.get('targethostname', ''),
-                "targetport": scan_details.get('targetport', ''),
-                "targetbanner": scan_details.get('targetbanner', '')
-            }
-        
-        # Parse items (vulnerabilities/issues)
-        for item in root.findall('.//item'):
-            item_info = {
-                "id": item.get('id', ''),
-                "osvdbid": item.get('osvdbid', ''),
-                "osvdblink": item.get('osvdblink', ''),
-                "description": item.find('description').text if item.find('description') is not None else '',
-                "uri": item.find('uri').text if item.find('uri') is not None else '',
-                "namelink": item.find('namelink').text if item.find('namelink') is not None else '',
-                "iplink": item.find('iplink').text if item.find('iplink') is not None else ''
-            }
-            result["items"].append(item_info)
-        
-        # Parse statistics
-        stats = root.find('statistics')
-        if stats is not None:
-            result["statistics"] = {
-                "elapsed": stats.get('elapsed', ''),
-                "itemsfound": stats.get('itemsfound', ''),
-                "itemstested": stats.get('itemstested', '')
-            }
-        
-        return result
-    except Exception as e:
-        return {"parsed": False, "error": f"Parse error: {str(e)}"}
+    return parse_nikto_stream(io.BytesIO(xml_output.encode('utf-8')))
 
 
-def parse_gobuster_output(stdout: str) -> Dict:
+def parse_gobuster_lines(lines: Iterable[str]) -> Dict:
     """
-    Parse gobuster CLI output to extract found directories.
+    Parse gobuster CLI output baris per baris (file object, stdin, list).
     Example line: Found: /admin (Status: 200)
     """
-    import re
     findings = []
-    pattern = re.compile(r"Found: (.*?) \(Status: (\d+)\)")
-    
-    for line in stdout.splitlines():
-        match = pattern.search(line)
+    search = GOBUSTER_FOUND_RE.search
+    for line in lines:
+        match = search(line)
         if match:
             findings.append({
                 "path": match.group(1),
                 "status": int(match.group(2))
             })
-            
+
     return {
         "findings": findings,
         "parsed": len(findings) > 0,
@@ -162,26 +284,41 @@ def parse_gobuster_output(stdout: str) -> Dict:
     }
 
 
-def parse_sqlmap_output(stdout: str) -> Dict:
+def parse_gobuster_output(stdout: str) -> Dict:
+    """Parse gobuster CLI output (string) to extract found directories."""
+    return parse_gobuster_lines(io.StringIO(stdout))
+
+
+def parse_sqlmap_lines(lines: Iterable[str]) -> Dict:
     """
-    Parse sqlmap output to detect if a target is vulnerable.
+    Parse sqlmap output baris per baris dalam satu pass: flag vulnerable dan
+    maksimal SQLMAP_MAX_PAYLOADS payload pertama.
     """
-    import re
     vulnerable = False
-    if "is vulnerable" in stdout.lower() or "confirmed" in stdout.lower():
-        vulnerable = True
-        
-    # Extract some basic details if possible
-    payloads = re.findall(r"Payload: (.*)", stdout)
-    
+    payloads = []
+    for line in lines:
+        if not vulnerable and SQLMAP_VULNERABLE_RE.search(line):
+            vulnerable = True
+        if len(payloads) < SQLMAP_MAX_PAYLOADS:
+            match = SQLMAP_PAYLOAD_RE.search(line)
+            if match:
+                payloads.append(match.group(1).rstrip("\r\n"))
+        elif vulnerable:
+            break  # tidak ada lagi yang perlu dicari
+
     return {
         "vulnerable": vulnerable,
-        "payloads": payloads[:5], # Just first 5
+        "payloads": payloads,
         "parsed": True,
         "format": "text-extracted"
     }
 
 
+def parse_sqlmap_output(stdout: str) -> Dict:
+    """Parse sqlmap output (string) to detect if a target is vulnerable."""
+    return parse_sqlmap_lines(io.StringIO(stdout))
+
+
 def _get_xml_content(stdout: str, stderr: str) -> Optional[str]:
     """Extracts XML content from stdout or stderr, handling surrounding text."""
     for text in [stdout, stderr]:
@@ -222,4 +359,43 @@ def extract_structured_data(tool: str, stdout: str, stderr: str = "") -> Dict:
     elif tool == "sqlmap":
         return parse_sqlmap_output(stdout)
     
-    return {"parsed": False, "error": "Unknown tool or no structured data available"}
\ No newline at end of file
+    return {"parsed": False, "error": "Unknown tool or no structured data available"}
+
+
+_XML_STREAM_PARSERS = {
+    "nmap": parse_nmap_stream,
+    "nikto": parse_nikto_stream,
+}
+
+_LINE_PARSERS = {
+    "gobuster": parse_gobuster_lines,
+    "sqlmap": parse_sqlmap_lines,
+}
+
+
+def extract_structured_data_from_files(tool: str, stdout_path: str, stderr_path: str = None,
+                                       on_host: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    Sama dengan extract_structured_data, tapi membaca langsung dari file output
+    yang di-spool (stdout_path/stderr_path dari run_command_async) secara streaming,
+    sehingga output ratusan MB tidak perlu dimuat ke memory.
+
+    on_host: untuk nmap, callback per host (lihat parse_nmap_stream); hasil hanya
+    memuat agregat dan sampel host.
+    """
+    paths = [p for p in (stdout_path, stderr_path) if p and os.path.exists(p)]
+
+    if tool in _XML_STREAM_PARSERS:
+        for path in paths:
+            with open(path, 'rb') as f:
+                source = _open_xml_source(f)
+                if source is not None:
+                    if tool == "nmap":
+                        return parse_nmap_stream(source, on_host=on_host)
+                    return _XML_STREAM_PARSERS[tool](source)
+
+    elif tool in _LINE_PARSERS and stdout_path in paths:
+        with open(stdout_path, 'r', encoding='utf-8', errors='replace') as f:
+            return _LINE_PARSERS[tool](f)
+
+    return {"parsed": False, "error": "Unknown tool or no structured data available"}
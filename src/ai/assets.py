@@ -0,0 +1,206 @@
+"""
+Inventory asset per user dari hasil scan yang selesai.
+
+State terakhir tiap host (alias hostname, status, port terbuka, risk) di-update
+incremental sekali per scan, bersama bulk insert findings (lihat ai/findings.py).
+Risk asset = skor tertinggi di antara finding scan terbaru tiap tool untuk host
+itu (sama dengan score_targets), disimpan per tool di Asset.risk_scores.
+IP disimpan sebagai kolom integer sehingga filter CIDR cukup range scan di index.
+"""
+import ipaddress
+import json
+from datetime import datetime, timezone
+
+from sqlalchemy.exc import IntegrityError
+
+from .findings import target_host_port
+from .risk import risk_level, score_findings
+
+# IPv6 disimpan sebagai dua BigInteger bertanda; offset menjaga urutan unsigned
+_V6_OFFSET = 1 << 63
+_LOW_64 = (1 << 64) - 1
+# Batas parameter IN (...) per query
+_LOOKUP_CHUNK = 500
+# Percobaan ulang membuat asset baru jika scan lain membuat address yang sama lebih dulu
+_CREATE_ATTEMPTS = 3
+
+
+def ip_columns(address: str) -> dict:
+    """Kolom integer IP untuk address; semua None jika address bukan IP (hostname)."""
+    columns = {"ip_version": None, "ipv4": None, "ipv6_hi": None, "ipv6_lo": None}
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return columns
+    columns["ip_version"] = ip.version
+    if ip.version == 4:
+        columns["ipv4"] = int(ip)
+    else:
+        value = int(ip)
+        columns["ipv6_hi"] = (value >> 64) - _V6_OFFSET
+        columns["ipv6_lo"] = (value & _LOW_64) - _V6_OFFSET
+    return columns
+
+
+def cidr_filter(network):
+    """Filter SQLAlchemy untuk semua asset di dalam network (range scan di index integer)."""
+    from models import db, Asset
+
+    first, last = int(network.network_address), int(network.broadcast_address)
+    if network.version == 4:
+        return Asset.ipv4.between(first, last)
+
+    first_hi, last_hi = (first >> 64) - _V6_OFFSET, (last >> 64) - _V6_OFFSET
+    if network.prefixlen <= 64:
+        return Asset.ipv6_hi.between(first_hi, last_hi)
+    return db.and_(
+        Asset.ipv6_hi == first_hi,
+        Asset.ipv6_lo.between((first & _LOW_64) - _V6_OFFSET, (last & _LOW_64) - _V6_OFFSET)
+    )
+
+
+def _canonical(address: str) -> str:
+    try:
+        return str(ipaddress.ip_address(address))
+    except ValueError:
+        return (address or "").lower()
+
+
+def nmap_host_state(host: dict):
+    """
+    Satu host nmap -> state ringkas {address, hostnames, status, open_ports}, atau None tanpa address.
+    Cukup kecil untuk dikumpulkan per host saat output di-stream (parse_nmap_stream(on_host=...)).
+    """
+    address = next((a.get("addr") for a in host.get("addresses", []) if a.get("addrtype") != "mac"), None)
+    if not address:
+        return None
+    return {
+        "address": address,
+        "hostnames": [name.lower() for name in host.get("hostnames", [])],
+        "status": host.get("status"),
+        "open_ports": [
+            {"port": int(p["port"]), "proto": p.get("protocol"), "service": (p.get("service") or {}).get("name"),
+             "product": (p.get("service") or {}).get("product") or None, "version": (p.get("service") or {}).get("version") or None}
+            for p in host.get("ports", []) if p.get("state") == "open" and str(p.get("port", "")).isdigit()
+        ],
+    }
+
+
+def _host_states(scan, structured: dict, findings: list, host_states=None) -> dict:
+    """address -> state terbaru dari satu scan: hostnames, status, open_ports (None = tidak diubah), findings."""
+    states = {}
+    aliases = {}
+
+    def state(address):
+        return states.setdefault(_canonical(address), {"hostnames": set(), "status": "up", "open_ports": None, "findings": []})
+
+    if scan.tool == "nmap":
+        if host_states is None:
+            host_states = filter(None, map(nmap_host_state, structured.get("hosts", [])))
+        for host in host_states:
+            current = state(host["address"])
+            current["status"] = host["status"]
+            current["hostnames"].update(host["hostnames"])
+            aliases.update({name: _canonical(host["address"]) for name in host["hostnames"]})
+            current["open_ports"] = host["open_ports"]
+    elif scan.tool == "nikto":
+        info = structured.get("target") or {}
+        address = info.get("targetip") or info.get("targethostname")
+        if address:
+            current = state(address)
+            if info.get("targethostname") and info.get("targethostname") != address:
+                current["hostnames"].add(info["targethostname"].lower())
+                aliases[info["targethostname"].lower()] = _canonical(address)
+    else:
+        host, _ = target_host_port(scan.target)
+        if host:
+            state(host)
+
+    for row in findings:
+        host = row.get("host")
+        if not host:
+            continue
+        # Finding bisa memakai hostname (nikto); arahkan ke asset IP-nya
+        key = _canonical(host)
+        key = aliases.get(key, key)
+        states.setdefault(key, {"hostnames": set(), "status": "up", "open_ports": None, "findings": []})["findings"].append(row)
+    return states
+
+
+def _load_assets(user_id, addresses) -> dict:
+    from models import Asset
+
+    existing = {}
+    for i in range(0, len(addresses), _LOOKUP_CHUNK):
+        chunk = addresses[i:i + _LOOKUP_CHUNK]
+        for asset in Asset.query.filter(Asset.user_id == user_id, Asset.address.in_(chunk)):
+            existing[asset.address] = asset
+    return existing
+
+
+def _create_assets(user_id, addresses, now) -> dict:
+    """
+    Buat asset untuk address yang belum ada. Dua scan pertama untuk host yang sama
+    bisa selesai bersamaan (worker berbeda) dan sama-sama insert; yang kalah di
+    uq_asset_user_address me-rollback savepoint-nya saja lalu memakai baris pemenang.
+    """
+    from models import db, Asset
+
+    assets = {}
+    for _ in range(_CREATE_ATTEMPTS):
+        missing = [address for address in addresses if address not in assets]
+        if not missing:
+            return assets
+        created = {address: Asset(user_id=user_id, address=address, first_seen=now, **ip_columns(address))
+                   for address in missing}
+        try:
+            with db.session.begin_nested():
+                db.session.add_all(created.values())
+            assets.update(created)
+        except IntegrityError:
+            assets.update(_load_assets(user_id, missing))
+    if len(assets) < len(addresses):
+        raise RuntimeError(f"Could not create {len(addresses) - len(assets)} assets for user {user_id}")
+    return assets
+
+
+def record_scan_assets(scan, structured: dict, findings: list, host_states=None) -> int:
+    """
+    Update incremental inventory asset dari satu scan yang selesai (tanpa commit).
+    Hanya untuk scan milik user login; asset guest tidak disimpan. Butuh app context.
+
+    host_states: state nmap_host_state() untuk semua host jika `structured` hanya
+    memuat sampel host (output di-stream); default diturunkan dari structured["hosts"].
+    """
+    from models import db, Asset
+
+    if not scan.user_id or not structured.get("parsed"):
+        return 0
+    states = _host_states(scan, structured, findings, host_states)
+    if not states:
+        return 0
+
+    addresses = list(states)
+    existing = _load_assets(scan.user_id, addresses)
+    now = datetime.now(timezone.utc)
+    existing.update(_create_assets(scan.user_id, [a for a in addresses if a not in existing], now))
+
+    for address, current in states.items():
+        asset = existing[address]
+
+        # Alias selalu lowercase supaya filter ?hostname= cukup satu bentuk
+        aliases = {name.lower() for name in json.loads(asset.hostnames)} if asset.hostnames else set()
+        aliases.update(current["hostnames"])
+        asset.hostnames = json.dumps(sorted(aliases))
+        asset.status = current["status"]
+        if current["open_ports"] is not None:
+            asset.open_ports = json.dumps(current["open_ports"])
+            asset.ports_scan_id = scan.id
+        # Scan ini = finding terbaru dari tool-nya untuk host ini (kosong = tidak ada temuan lagi)
+        scores = json.loads(asset.risk_scores) if asset.risk_scores else {}
+        scores[scan.tool], _ = score_findings(current["findings"])
+        asset.risk_scores = json.dumps(scores, sort_keys=True)
+        asset.risk_level = risk_level(max(scores.values()))
+        asset.last_scan_id = scan.id
+        asset.last_seen = now
+    return len(states)
@@ -1,6 +1,10 @@
 from groq import Groq
 import os
 from dotenv import load_dotenv
+from .llm.governor import governor
+from .llm.tokens import count_tokens, count_message_tokens
+from .llm.router import router
+import time
 
 load_dotenv()
 
@@ -8,11 +12,9 @@ client = Groq(
     api_key=os.environ.get("GROQ_API_KEY"),
 )
 
-def ai_chat_response(user_input, session_history=None):
-    """
-    Generates a response from the AI using a cybersecurity persona.
-    """
-    system_prompt = """You are AIVAST, an elite Lead Cybersecurity Consultant and Penetration Testing Assistant. 
+CHAT_MODEL = "llama-3.3-70b-versatile"
+
+SYSTEM_PROMPT = """You are AIVAST, an elite Lead Cybersecurity Consultant and Penetration Testing Assistant. 
 
 Your mission is to guide users through the entire security assessment lifecycle using ONLY the following internal tools provided by AIVAST:
 1. **Nmap**: Network Reconnaissance & Port Scanning.
@@ -38,10 +40,19 @@ Example Flow:
 User: "can you check this site: test.com"
 AI: "Target identified. I will begin by performing a deep reconnaissance using nmap to discover open ports and services. [AUTO_SCAN: target=test.com, mode=deep, tool=auto]"
 """
-    
+
+
+def _build_messages(user_input, session_history=None, findings=None):
     messages = [
-        {"role": "system", "content": system_prompt}
+        {"role": "system", "content": SYSTEM_PROMPT}
     ]
+
+    # Grounding: top-k findings retrieved from this session's scans
+    if findings:
+        messages.append({
+            "role": "system",
+            "content": "Relevant findings from this session's completed scans:\n" + "\n".join(f"- {f}" for f in findings)
+        })
     
     # Ideally, append session_history here
     if session_history:
@@ -51,14 +62,68 @@ AI: "Target identified. I will begin by performing a deep reconnaissance using n
              messages.append({"role": msg.get('role', 'user'), "content": content})
         
     messages.append({"role": "user", "content": user_input})
-    
+    return messages
+
+
+def ai_chat_response(user_input, session_history=None, findings=None):
+    """
+    Generates a response from the AI using a cybersecurity persona.
+    """
+    messages = _build_messages(user_input, session_history, findings)
+
     try:
+        prompt_tokens = count_message_tokens(messages, CHAT_MODEL)
+        model, _ = router.choose("chat", prompt_tokens, prefer=CHAT_MODEL)
+        principal = governor.acquire(model, prompt_tokens)
+        started = time.monotonic()
         chat_completion = client.chat.completions.create(
             messages=messages,
-            model="llama-3.3-70b-versatile",
+            model=model,
             temperature=0.5, # Lower for more consistent instruction following
             max_tokens=2048,
         )
-        return chat_completion.choices[0].message.content
+        content = chat_completion.choices[0].message.content
+        usage = getattr(chat_completion, "usage", None)
+        completion_tokens = getattr(usage, "completion_tokens", None) or count_tokens(content, model)
+        governor.record(model, completion_tokens, principal)
+        router.record("chat", model, time.monotonic() - started, prompt_tokens, completion_tokens)
+        return content
     except Exception as e:
         return f"Error communicating with AI: {str(e)}"
+
+
+def ai_chat_response_stream(user_input, session_history=None, findings=None):
+    """
+    Streaming variant of ai_chat_response.
+    Yields content deltas as the provider emits them. Closing the generator
+    (e.g. the client disconnected) closes the upstream HTTP stream too.
+    """
+    messages = _build_messages(user_input, session_history, findings)
+
+    prompt_tokens = count_message_tokens(messages, CHAT_MODEL)
+    model, _ = router.choose("chat-stream", prompt_tokens, prefer=CHAT_MODEL)
+    principal = governor.acquire(model, prompt_tokens)
+    started = time.monotonic()
+    first_token_latency = None
+    stream = client.chat.completions.create(
+        messages=messages,
+        model=model,
+        temperature=0.5,
+        max_tokens=2048,
+        stream=True,
+    )
+    completion_tokens = 0
+    try:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if first_token_latency is None:
+                    first_token_latency = time.monotonic() - started
+                completion_tokens += count_tokens(delta, model)
+                yield delta
+    finally:
+        stream.close()
+        governor.record(model, completion_tokens, principal)
+        router.record("chat-stream", model, first_token_latency or (time.monotonic() - started), prompt_tokens, completion_tokens)
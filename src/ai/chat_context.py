@@ -0,0 +1,83 @@
+"""
+Rolling context window untuk chat session.
+
+N turn terakhir dikirim verbatim; turn yang lebih lama dilipat ke dalam
+summary yang disimpan di ChatSession, sehingga summary hanya dihitung ulang
+ketika ada turn baru yang keluar dari window. Pelipatan berjalan di background
+setelah balasan tersimpan (submit_summary), jadi tidak menahan respons chat.
+"""
+import os
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from .llm.groq import call_groq
+from .llm.governor import current_principal, use_principal
+from .llm.tokens import count_tokens, count_message_tokens
+
+logger = logging.getLogger(__name__)
+
+CHAT_WINDOW_TURNS = int(os.getenv("CHAT_WINDOW_TURNS", 4))
+CHAT_CONTEXT_TOKEN_BUDGET = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", 3000))
+SUMMARY_MAX_WORDS = 250
+
+
+def split_window(messages: List[Dict], summary: Optional[str] = None,
+                 window_turns: int = None, budget: int = None, model: str = None) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Pisahkan pesan yang belum di-summary menjadi (to_fold, window).
+
+    `window` berisi paling banyak `window_turns` pasangan user/assistant terakhir
+    dan, bersama summary, muat di `budget` token. Sisanya masuk `to_fold`.
+    Pesan terakhir selalu dipertahankan meskipun melebihi budget.
+    """
+    window_turns = window_turns or CHAT_WINDOW_TURNS
+    budget = budget or CHAT_CONTEXT_TOKEN_BUDGET
+
+    cut = max(0, len(messages) - window_turns * 2)
+    summary_cost = count_tokens(summary, model)
+    while cut < len(messages) - 1 and summary_cost + count_message_tokens(messages[cut:], model) > budget:
+        cut += 1
+    return messages[:cut], messages[cut:]
+
+
+def summarize_turns(previous_summary: Optional[str], turns: List[Dict]) -> str:
+    """Update summary secara incremental dengan turn yang keluar dari window."""
+    transcript = "\n".join(f"{t.get('role', 'user').upper()}: {t.get('content', '')}" for t in turns)
+    prompt = f"""You maintain the running memory of a penetration-testing chat between a user and the AIVAST assistant.
+
+CURRENT SUMMARY:
+{previous_summary or "(empty)"}
+
+NEW TURNS TO FOLD IN:
+{transcript}
+
+TASK:
+Rewrite the summary so it also covers the new turns. Keep targets, tools run, key findings
+(ports, services, versions, vulnerabilities), decisions and open questions. Drop small talk.
+Use at most {SUMMARY_MAX_WORDS} words. Return ONLY the summary text.
+"""
+    return call_groq(prompt, route="chat-summary").strip()
+
+
+_summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="chat-summary")
+
+
+def submit_summary(previous_summary: Optional[str], turns: List[Dict]) -> Future:
+    """Jalankan summarize_turns di background thread (budget LLM tetap milik principal pemanggil)."""
+    principal = current_principal()
+
+    def _summarize():
+        with use_principal(principal):
+            return summarize_turns(previous_summary, turns)
+
+    return _summary_executor.submit(_summarize)
+
+
+def build_history(summary: Optional[str], window: List[Dict]) -> List[Dict]:
+    """History yang dikirim ke ai_chat_response: summary (jika ada) + window verbatim."""
+    history = []
+    if summary:
+        history.append({"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"})
+    history.extend({"role": m["role"], "content": m["content"]} for m in window)
+    return history
@@ -0,0 +1,240 @@
+"""
+Normalisasi structured output tool menjadi baris `Finding`.
+
+Dipanggil sekali saat scan selesai; hasilnya di-bulk-insert ke tabel finding
+sehingga query seperti "host mana yang expose OpenSSH 7.x" cukup memakai index,
+tanpa re-parse execution_result. Baris service nmap tanpa CVE di banner diberi
+CVE dengan CVSS tertinggi dari index offline (ai.vulndb) untuk product/version-nya.
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from .analyzer.prompt_builder import RISKY_SERVICES, severity_signal
+from .vulndb import vuln_index
+
+CVE_RE = re.compile(r"CVE-\d{4}-\d{4,}", re.IGNORECASE)
+
+# Skor severity_signal -> label severity (urutan sama dengan pipeline.SEVERITY_ORDER)
+SEVERITY_THRESHOLDS = [(12, "critical"), (8, "high"), (5, "medium"), (1, "low")]
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Kolom tabel finding; setiap baris diisi lengkap supaya bisa di-executemany sekaligus
+FINDING_FIELDS = ("host", "port", "proto", "service", "product", "version", "path", "status", "cve", "severity")
+
+
+def severity_label(score: int) -> str:
+    for threshold, label in SEVERITY_THRESHOLDS:
+        if score >= threshold:
+            return label
+    return "info"
+
+
+def _first_cve(*texts: Optional[str]) -> Optional[str]:
+    for text in texts:
+        match = CVE_RE.search(text or "")
+        if match:
+            return match.group(0).upper()
+    return None
+
+
+def _indexed_cve(product: Optional[str], version: Optional[str]) -> Optional[str]:
+    """CVE dengan CVSS tertinggi untuk product/version dari index offline; None jika tidak ada."""
+    if not product or not version:
+        return None
+    matches = vuln_index.lookup(product, version)
+    return matches[0]["cve"] if matches else None
+
+
+def target_host_port(target: str) -> Tuple[Optional[str], Optional[int]]:
+    """Host dan port dari target URL/hostname."""
+    if not target:
+        return None, None
+    parsed = urlparse(target if "://" in target else f"//{target}")
+    try:
+        port = parsed.port
+    except ValueError:
+        port = None
+    return parsed.hostname or target, port or _DEFAULT_PORTS.get(parsed.scheme)
+
+
+def _to_int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _nmap_host_findings(target: str, host: Dict) -> List[Dict]:
+    rows = []
+    addr = next((a.get("addr") for a in host.get("addresses", []) if a.get("addrtype") != "mac"), None)
+    for port in host.get("ports", []):
+        if port.get("state") != "open":
+            continue
+        service = port.get("service") or {}
+        name = service.get("name") or None
+        score = RISKY_SERVICES.get(name, 0) + severity_signal(f"{service.get('product', '')} {service.get('extrainfo', '')}")
+        product, version = service.get("product") or None, service.get("version") or None
+        rows.append({
+            "host": addr or target,
+            "port": _to_int(port.get("port")),
+            "proto": port.get("protocol"),
+            "service": name,
+            "product": product,
+            "version": version,
+            "cve": _first_cve(service.get("extrainfo")) or _indexed_cve(product, version),
+            "severity": severity_label(score),
+        })
+    return rows
+
+
+def _nmap_findings(target: str, structured: Dict) -> List[Dict]:
+    return [row for host in structured.get("hosts", []) for row in _nmap_host_findings(target, host)]
+
+
+def _nikto_findings(target: str, structured: Dict) -> List[Dict]:
+    info = structured.get("target") or {}
+    host = info.get("targethostname") or info.get("targetip") or target_host_port(target)[0]
+    port = _to_int(info.get("targetport")) or target_host_port(target)[1]
+    banner = info.get("targetbanner") or ""
+    product, _, version = banner.partition("/")
+    version = version.split(" ", 1)[0]
+    rows = []
+    for item in structured.get("items", []):
+        description = item.get("description") or ""
+        rows.append({
+            "host": host,
+            "port": port,
+            "proto": "tcp",
+            "service": "http",
+            "product": product or None,
+            "version": version or None,
+            "path": item.get("uri") or None,
+            "cve": _first_cve(description, item.get("namelink")),
+            "severity": severity_label(severity_signal(f"{description} {item.get('uri') or ''}")),
+        })
+    return rows
+
+
+def _gobuster_findings(target: str, structured: Dict) -> List[Dict]:
+    host, port = target_host_port(target)
+    return [
+        {
+            "host": host,
+            "port": port,
+            "proto": "tcp",
+            "service": "http",
+            "path": finding.get("path"),
+            "status": finding.get("status"),
+            "severity": severity_label(severity_signal(finding.get("path", ""))),
+        }
+        for finding in structured.get("findings", [])
+    ]
+
+
+def _sqlmap_findings(target: str, structured: Dict) -> List[Dict]:
+    if not structured.get("vulnerable"):
+        return []
+    host, port = target_host_port(target)
+    path = (urlparse(target).path or "/") if "://" in (target or "") else None
+    return [{
+        "host": host,
+        "port": port,
+        "proto": "tcp",
+        "service": "http",
+        "path": path,
+        "severity": "critical" if structured.get("payloads") else "high",
+    }]
+
+
+_NORMALIZERS = {
+    "nmap": _nmap_findings,
+    "nikto": _nikto_findings,
+    "gobuster": _gobuster_findings,
+    "sqlmap": _sqlmap_findings,
+}
+
+
+def normalize_findings(tool: str, target: str, structured: Dict) -> List[Dict]:
+    """
+    Structured data (extract_structured_data*) -> list of dict siap bulk insert
+    ke tabel finding (tanpa scan_id). Kosong jika tool tidak dikenal atau output tidak ter-parse.
+    """
+    normalizer = _NORMALIZERS.get(tool)
+    if normalizer is None or not structured or not structured.get("parsed"):
+        return []
+    return [{field: row.get(field) for field in FINDING_FIELDS} for row in normalizer(target, structured)]
+
+
+def normalize_nmap_host(target: str, host: Dict) -> List[Dict]:
+    """Satu host dari parse_nmap_stream(on_host=...) -> baris finding (sama dengan normalize_findings)."""
+    return [{field: row.get(field) for field in FINDING_FIELDS} for row in _nmap_host_findings(target, host)]
+
+
+# ==========================================================
+# DIFF
+# ==========================================================
+def _endpoint_key(row: Dict) -> Tuple:
+    return (row.get("host"), row.get("port"), row.get("proto"))
+
+
+def _endpoint(row: Dict, *fields: str) -> Dict:
+    return {field: row.get(field) for field in ("host", "port", "proto") + fields}
+
+
+def diff_findings(old: List[Dict], new: List[Dict]) -> Dict:
+    """
+    Bandingkan finding ternormalisasi dua scan dengan operasi set:
+    port/service (baris tanpa path), path web, dan CVE.
+    """
+    old_services = {_endpoint_key(r): r for r in old if r.get("port") is not None and not r.get("path")}
+    new_services = {_endpoint_key(r): r for r in new if r.get("port") is not None and not r.get("path")}
+    old_paths = {_endpoint_key(r) + (r["path"],): r for r in old if r.get("path")}
+    new_paths = {_endpoint_key(r) + (r["path"],): r for r in new if r.get("path")}
+    old_cves = {_endpoint_key(r) + (r["cve"],): r for r in old if r.get("cve")}
+    new_cves = {_endpoint_key(r) + (r["cve"],): r for r in new if r.get("cve")}
+
+    service_fields = ("service", "product", "version")
+    changed_services = []
+    for key in old_services.keys() & new_services.keys():
+        before = tuple(old_services[key].get(f) for f in service_fields)
+        after = tuple(new_services[key].get(f) for f in service_fields)
+        if before != after:
+            changed_services.append({
+                **_endpoint(new_services[key]),
+                "from": dict(zip(service_fields, before)),
+                "to": dict(zip(service_fields, after)),
+            })
+
+    changed_paths = [
+        {**_endpoint(new_paths[key], "path"), "from_status": old_paths[key].get("status"), "to_status": new_paths[key].get("status")}
+        for key in old_paths.keys() & new_paths.keys()
+        if old_paths[key].get("status") != new_paths[key].get("status")
+    ]
+
+    def rows(index, keys, *fields):
+        return [_endpoint(index[key], *fields) for key in sorted(keys, key=str)]
+
+    result = {
+        "ports": {
+            "opened": rows(new_services, new_services.keys() - old_services.keys(), *service_fields),
+            "closed": rows(old_services, old_services.keys() - new_services.keys(), *service_fields),
+            "changed": sorted(changed_services, key=str),
+        },
+        "paths": {
+            "added": rows(new_paths, new_paths.keys() - old_paths.keys(), "path", "status"),
+            "removed": rows(old_paths, old_paths.keys() - new_paths.keys(), "path", "status"),
+            "changed": sorted(changed_paths, key=str),
+        },
+        "vulnerabilities": {
+            "new": rows(new_cves, new_cves.keys() - old_cves.keys(), "cve", "severity"),
+            "resolved": rows(old_cves, old_cves.keys() - new_cves.keys(), "cve", "severity"),
+        },
+    }
+    result["summary"] = {
+        f"{group}_{change}": len(items)
+        for group, changes in result.items() for change, items in changes.items()
+    }
+    result["changed"] = any(result["summary"].values())
+    return result
@@ -0,0 +1,197 @@
+"""
+Client-side rate/token governor untuk semua panggilan LLM.
+
+Setiap panggilan dihitung (request + token) per principal (user_id/anon_id)
+dan secara global per model, memakai library `limits` yang sama dengan
+Flask-Limiter. Dengan RATELIMIT_STORAGE_URI=redis://... semua gunicorn worker
+berbagi budget yang sama; default memory:// hanya per proses.
+
+Jika budget principal habis, panggilan langsung ditolak. Jika limit global
+provider (RPM/TPM) penuh, panggilan dari request web juga langsung ditolak
+(thread request tidak boleh tidur); CLI/batch/thread background antri sampai max_wait.
+Panggilan yang ditolak mengembalikan limit yang sudah sempat di-hit (refund).
+"""
+import os
+import time
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from limits import parse
+from limits.storage import MemoryStorage, RedisStorage, storage_from_string
+from limits.strategies import MovingWindowRateLimiter
+
+logger = logging.getLogger(__name__)
+
+STORAGE_URI = os.getenv("RATELIMIT_STORAGE_URI", "memory://")
+MAX_QUEUE_WAIT = float(os.getenv("LLM_MAX_QUEUE_WAIT", 20))
+
+# Limit provider per model (Groq on-demand tier). Bisa dioverride lewat env.
+PROVIDER_LIMITS = {
+    "llama-3.1-8b-instant": {
+        "rpm": os.getenv("LLM_8B_RPM", "30/minute"),
+        "tpm": os.getenv("LLM_8B_TPM", "6000/minute"),
+    },
+    "llama-3.3-70b-versatile": {
+        "rpm": os.getenv("LLM_70B_RPM", "30/minute"),
+        "tpm": os.getenv("LLM_70B_TPM", "12000/minute"),
+    },
+}
+PRINCIPAL_RPM = os.getenv("LLM_PRINCIPAL_RPM", "20/minute")
+PRINCIPAL_TOKENS = os.getenv("LLM_PRINCIPAL_TOKENS", "100000/hour")
+
+_principal: ContextVar[Optional[str]] = ContextVar("llm_principal", default=None)
+
+
+class LLMBudgetExceeded(RuntimeError):
+    """Panggilan LLM ditolak governor (bukan 429 dari provider)."""
+
+    def __init__(self, scope: str, retry_after: float):
+        self.scope = scope
+        self.retry_after = max(0.0, retry_after)
+        super().__init__(f"LLM {scope} budget exceeded, retry after {int(self.retry_after) + 1}s")
+
+
+@contextmanager
+def use_principal(principal: str):
+    """Set principal untuk panggilan LLM di luar request Flask (CLI, batch, thread)."""
+    token = _principal.set(principal)
+    try:
+        yield
+    finally:
+        _principal.reset(token)
+
+
+def current_principal() -> str:
+    principal = _principal.get()
+    if principal:
+        return principal
+    try:
+        from flask import has_request_context, session
+        from flask_login import current_user
+        if has_request_context():
+            if current_user and current_user.is_authenticated:
+                return f"user:{current_user.id}"
+            if "anon_id" in session:
+                return f"anon:{session['anon_id']}"
+    except Exception:
+        pass
+    return "system"
+
+
+def _in_web_request() -> bool:
+    try:
+        from flask import has_request_context
+        return has_request_context()
+    except ImportError:
+        return False
+
+
+class TokenGovernor:
+    def __init__(self, storage_uri: str = None):
+        self.storage = storage_from_string(storage_uri or STORAGE_URI)
+        self.limiter = MovingWindowRateLimiter(self.storage)
+
+    def _limits(self, model: str, principal: str):
+        provider = PROVIDER_LIMITS.get(model, {})
+        # Principal dulu: jika hit global kalah race, hanya budget pemanggil sendiri yang terpakai
+        checks = [
+            ("principal", parse(PRINCIPAL_RPM), ("llm-rpm", principal), 1),
+            ("principal", parse(PRINCIPAL_TOKENS), ("llm-tokens", principal), None),
+        ]
+        if provider.get("rpm"):
+            checks.append(("global", parse(provider["rpm"]), ("llm-rpm", model), 1))
+        if provider.get("tpm"):
+            checks.append(("global", parse(provider["tpm"]), ("llm-tpm", model), None))
+        return checks
+
+    def acquire(self, model: str, prompt_tokens: int, principal: str = None, max_wait: float = None) -> str:
+        """
+        Reservasi 1 request + prompt_tokens. hit() per limit adalah check atomik
+        (test() hanya pre-check supaya permintaan yang jelas penuh tidak memakai budget),
+        jadi dua worker tidak bisa sama-sama lolos untuk slot terakhir.
+        raise LLMBudgetExceeded jika budget principal habis, jika limit global penuh
+        di request web (max_wait default 0), atau jika antrian lebih lama dari max_wait.
+        Returns principal yang dipakai (untuk record()).
+        """
+        principal = principal or current_principal()
+        if max_wait is None:
+            max_wait = 0 if _in_web_request() else MAX_QUEUE_WAIT
+        deadline = time.time() + max_wait
+        checks = [(scope, item, identifiers, cost or max(1, prompt_tokens))
+                  for scope, item, identifiers, cost in self._limits(model, principal)]
+        for scope, item, _, cost in checks:
+            if cost > item.amount:
+                # Tidak akan pernah muat; tolak daripada menunggu selamanya.
+                raise LLMBudgetExceeded(scope, 0)
+
+        reserved = set()
+        while True:
+            blocked = None
+            for i, (scope, item, identifiers, cost) in enumerate(checks):
+                if i not in reserved and not self.limiter.test(item, *identifiers, cost=cost):
+                    blocked = self._blocked(blocked, scope, item, identifiers)
+
+            if blocked is None:
+                for i, (scope, item, identifiers, cost) in enumerate(checks):
+                    if i in reserved:
+                        continue
+                    if not self.limiter.hit(item, *identifiers, cost=cost):
+                        # Kalah race setelah test(); limit yang sudah di-hit tetap dipegang selama
+                        # antri (tidak di-hit ulang saat retry) dan di-refund jika akhirnya ditolak
+                        blocked = self._blocked(None, scope, item, identifiers)
+                        break
+                    reserved.add(i)
+                else:
+                    return principal
+
+            scope, reset = blocked
+            wait = max(0.05, reset - time.time())
+            if scope == "principal" or time.time() + wait > deadline:
+                for i in reserved:
+                    _, item, identifiers, cost = checks[i]
+                    self._refund(item, identifiers, cost)
+                logger.warning(f"LLM call shed: {scope} budget for {principal} on {model}, retry after {wait:.1f}s")
+                raise LLMBudgetExceeded(scope, wait)
+            logger.info(f"LLM call queued {wait:.1f}s: provider limit for {model}")
+            time.sleep(wait)
+
+    def _refund(self, item, identifiers, cost):
+        """
+        Lepas `cost` entry terbaru dari moving window. Entry tidak punya pemilik,
+        jadi yang dibuang bisa milik pemanggil lain dengan timestamp sedikit lebih
+        baru; jumlah di window tetap tepat.
+        """
+        key = item.key_for(*identifiers)
+        if isinstance(self.storage, MemoryStorage):
+            with self.storage.locks[key]:
+                del self.storage.events.get(key, [])[:cost]
+        elif isinstance(self.storage, RedisStorage):
+            # acquire_moving_window.lua LPUSH entry baru ke kepala list
+            self.storage.get_connection().ltrim(self.storage.prefixed_key(key), cost, -1)
+        else:
+            logger.warning(f"LLM budget refund not supported for {type(self.storage).__name__}; "
+                           f"{cost} units stay reserved until the window expires")
+
+    def _blocked(self, blocked, scope, item, identifiers):
+        """Limit penuh yang menentukan: principal (langsung ditolak) menang, lalu reset paling lama."""
+        candidate = (scope, self.limiter.get_window_stats(item, *identifiers).reset_time)
+        if blocked is None:
+            return candidate
+        return max(blocked, candidate, key=lambda b: (b[0] == "principal", b[1]))
+
+    def record(self, model: str, completion_tokens: int, principal: str):
+        """Charge completion tokens setelah respons diterima."""
+        if completion_tokens <= 0:
+            return
+        for scope, item, identifiers, cost in self._limits(model, principal):
+            if cost is None:
+                # Isi sisa window; panggilan berikutnya yang akan menunggu/ditolak.
+                remaining = self.limiter.get_window_stats(item, *identifiers).remaining
+                charge = min(completion_tokens, remaining)
+                if charge > 0:
+                    self.limiter.hit(item, *identifiers, cost=charge)
+
+
+governor = TokenGovernor()
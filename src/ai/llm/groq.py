@@ -1,23 +1,69 @@
+import asyncio
 import os
-from groq import Groq
+import time
+import logging
+from groq import Groq, AsyncGroq
 from dotenv import load_dotenv
 from pathlib import Path
+from .governor import governor, current_principal
+from .tokens import count_tokens
+from .router import router
 
 BASE_DIR = Path(__file__).resolve().parents[3]
 load_dotenv(BASE_DIR / ".env")
 
+logger = logging.getLogger(__name__)
 
-def call_groq(prompt: str) -> str:
+
+def _prepare_call(prompt: str, route: str, severity: int, model: str):
     api_key = os.getenv("GROQ_API_KEY")
     if not api_key:
         raise RuntimeError("GROQ_API_KEY is not set")
 
+    prompt_tokens = count_tokens(prompt)
+    if not model:
+        model, reason = router.choose(route, prompt_tokens, severity=severity)
+        logger.debug(f"Router picked {model} for {route}: {reason}")
+    return api_key, model, prompt_tokens
+
+
+def _finish_call(response, route: str, model: str, prompt_tokens: int, principal: str, latency: float) -> str:
+    content = response.choices[0].message.content
+    usage = getattr(response, "usage", None)
+    completion_tokens = getattr(usage, "completion_tokens", None) or count_tokens(content, model)
+    governor.record(model, completion_tokens, principal)
+    router.record(route, model, latency, getattr(usage, "prompt_tokens", None) or prompt_tokens, completion_tokens)
+    return content
+
+
+def call_groq(prompt: str, route: str = "default", severity: int = 0, model: str = None) -> str:
+    """
+    Single-prompt completion. If `model` is not given, the router picks one
+    from the prompt size, `severity` signal and the latency SLO.
+    """
+    api_key, model, prompt_tokens = _prepare_call(prompt, route, severity, model)
     client = Groq(api_key=api_key)
 
+    principal = governor.acquire(model, prompt_tokens)
+    started = time.monotonic()
     response = client.chat.completions.create(
-        model="llama-3.1-8b-instant",
+        model=model,
         messages=[{"role": "user", "content": prompt}],
         temperature=0
     )
+    return _finish_call(response, route, model, prompt_tokens, principal, time.monotonic() - started)
 
-    return response.choices[0].message.content
\ No newline at end of file
+
+async def call_groq_async(prompt: str, route: str = "default", severity: int = 0, model: str = None) -> str:
+    """asyncio variant of call_groq; governor waits run off the event loop."""
+    api_key, model, prompt_tokens = _prepare_call(prompt, route, severity, model)
+    client = AsyncGroq(api_key=api_key)
+
+    principal = await asyncio.to_thread(governor.acquire, model, prompt_tokens, current_principal())
+    started = time.monotonic()
+    response = await client.chat.completions.create(
+        model=model,
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0
+    )
+    return _finish_call(response, route, model, prompt_tokens, principal, time.monotonic() - started)
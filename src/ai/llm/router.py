@@ -0,0 +1,104 @@
+"""
+Adaptive model routing.
+
+Model dipilih per panggilan berdasarkan ukuran prompt, severity signal dari
+findings, dan latency SLO: prompt kecil & bersih ke model kecil, prompt besar
+atau high-severity ke model besar. Jika p95 latency model besar melewati SLO,
+route otomatis di-downgrade ke model kecil sampai latency kembali normal.
+Latency dan estimasi biaya dicatat per route.
+"""
+import os
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+SMALL_MODEL = "llama-3.1-8b-instant"
+LARGE_MODEL = "llama-3.3-70b-versatile"
+
+LARGE_PROMPT_TOKENS = int(os.getenv("ROUTER_LARGE_PROMPT_TOKENS", 2500))
+HIGH_SEVERITY_SCORE = int(os.getenv("ROUTER_HIGH_SEVERITY_SCORE", 8))
+LATENCY_SLO_SECONDS = float(os.getenv("LLM_LATENCY_SLO_SECONDS", 8))
+# Route dengan output panjang punya SLO sendiri; chat-stream diukur sebagai time-to-first-token.
+ROUTE_SLO_SECONDS = {
+    "chat": float(os.getenv("CHAT_LATENCY_SLO_SECONDS", 20)),
+    "chat-stream": float(os.getenv("CHAT_TTFT_SLO_SECONDS", 3)),
+}
+LATENCY_SAMPLES = 50
+# Sampel lebih tua dari ini diabaikan, supaya route yang di-downgrade
+# otomatis mencoba model besar lagi setelah beberapa menit.
+LATENCY_WINDOW_SECONDS = 300
+MIN_SAMPLES_FOR_SLO = 5
+
+# USD per 1M tokens (input, output), harga publik Groq.
+PRICING = {
+    SMALL_MODEL: (0.05, 0.08),
+    LARGE_MODEL: (0.59, 0.79),
+}
+
+
+class ModelRouter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = defaultdict(lambda: deque(maxlen=LATENCY_SAMPLES))
+        self._routes = defaultdict(lambda: {"calls": 0, "latency_total": 0.0, "cost_usd": 0.0, "models": defaultdict(int)})
+
+    def p95(self, route: str, model: str) -> float:
+        cutoff = time.time() - LATENCY_WINDOW_SECONDS
+        with self._lock:
+            samples = sorted(latency for at, latency in self._latencies[(route, model)] if at >= cutoff)
+        if len(samples) < MIN_SAMPLES_FOR_SLO:
+            return 0.0
+        return samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))]
+
+    def choose(self, route: str, prompt_tokens: int, severity: int = 0, prefer: str = None) -> Tuple[str, str]:
+        """Returns (model, reason)."""
+        if prefer == LARGE_MODEL:
+            model, reason = LARGE_MODEL, "route default"
+        elif prompt_tokens >= LARGE_PROMPT_TOKENS:
+            model, reason = LARGE_MODEL, f"prompt {prompt_tokens} tokens >= {LARGE_PROMPT_TOKENS}"
+        elif severity >= HIGH_SEVERITY_SCORE:
+            model, reason = LARGE_MODEL, f"severity {severity} >= {HIGH_SEVERITY_SCORE}"
+        else:
+            return SMALL_MODEL, "small, low-severity prompt"
+
+        slo = ROUTE_SLO_SECONDS.get(route, LATENCY_SLO_SECONDS)
+        p95 = self.p95(route, LARGE_MODEL)
+        if p95 > slo:
+            return SMALL_MODEL, f"downgraded: {LARGE_MODEL} p95 {p95:.1f}s > SLO {slo:.1f}s"
+        return model, reason
+
+    def record(self, route: str, model: str, latency: float, prompt_tokens: int, completion_tokens: int):
+        price_in, price_out = PRICING.get(model, (0.0, 0.0))
+        cost = (prompt_tokens * price_in + completion_tokens * price_out) / 1_000_000
+        with self._lock:
+            self._latencies[(route, model)].append((time.time(), latency))
+            stats = self._routes[route]
+            stats["calls"] += 1
+            stats["latency_total"] += latency
+            stats["cost_usd"] += cost
+            stats["models"][model] += 1
+        logger.info(f"LLM route={route} model={model} latency={latency:.2f}s "
+                    f"tokens={prompt_tokens}+{completion_tokens} cost=${cost:.6f}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            routes = {
+                route: {
+                    "calls": s["calls"],
+                    "avg_latency": s["latency_total"] / s["calls"] if s["calls"] else 0.0,
+                    "cost_usd": round(s["cost_usd"], 6),
+                    "models": dict(s["models"]),
+                }
+                for route, s in self._routes.items()
+            }
+        for route, stats in routes.items():
+            stats["p95"] = {model: self.p95(route, model) for model in stats["models"]}
+            stats["slo_seconds"] = ROUTE_SLO_SECONDS.get(route, LATENCY_SLO_SECONDS)
+        return routes
+
+
+router = ModelRouter()
@@ -0,0 +1,30 @@
+import math
+
+# Approximate characters-per-token for the model families we call.
+# Llama 3 uses a ~128k BPE vocabulary: English prose averages ~4 chars/token,
+# while XML/JSON tool output is denser. We do not ship a tokenizer, so these
+# ratios are deliberately a little pessimistic to keep prompts inside budget.
+CHARS_PER_TOKEN = {
+    "llama-3.1-8b-instant": 3.5,
+    "llama-3.3-70b-versatile": 3.5,
+}
+DEFAULT_CHARS_PER_TOKEN = 3.5
+
+# Context windows (tokens) as published by the provider.
+CONTEXT_WINDOWS = {
+    "llama-3.1-8b-instant": 131072,
+    "llama-3.3-70b-versatile": 131072,
+}
+
+
+def count_tokens(text: str, model: str = None) -> int:
+    """Estimates the number of tokens `text` costs for `model`."""
+    if not text:
+        return 0
+    ratio = CHARS_PER_TOKEN.get(model, DEFAULT_CHARS_PER_TOKEN)
+    return int(math.ceil(len(text) / ratio))
+
+
+def count_message_tokens(messages: list, model: str = None) -> int:
+    """Estimates tokens for a chat `messages` list, including per-message overhead."""
+    return sum(count_tokens(str(m.get("content", "")), model) + 4 for m in messages)
@@ -1,6 +1,9 @@
+import asyncio
+from typing import AsyncIterable, AsyncIterator, Iterable, Union
 from .planner import plan_scan
-from ..executor.runner import run_command
-from .analyzer import analyze_output
+from executor.runner import run_command, run_command_aio
+from .analyzer import analyze_output, analyze_output_async
+from .pipeline import DeepScanPipeline
 
 
 def orchestrate_scan(target: str, use_ai_planner: bool = False) -> dict:
@@ -75,4 +78,115 @@ def orchestrate_scan(target: str, use_ai_planner: bool = False) -> dict:
         "plan": plan,
         "execution": execution,
         "analysis": analysis
-    }
\ No newline at end of file
+    }
+
+
+def orchestrate_deep_scan(target: str, analyze: bool = True, deep_scan: bool = False, stage_limits: dict = None) -> dict:
+    """
+    Deep scan chaining: nmap -> gobuster/nikto pada setiap service HTTP(S) yang
+    ditemukan -> sqlmap pada URL berparameter. Stage independen berjalan paralel.
+
+    Returns:
+        dict agregat dari DeepScanPipeline.run() (stages, critical_path, risk_level, ...)
+    """
+    try:
+        return DeepScanPipeline(target, analyze=analyze, deep_scan=deep_scan, stage_limits=stage_limits).run()
+    except Exception as e:
+        return {
+            "ok": False,
+            "error": f"pipeline exception: {str(e)}",
+            "target": target
+        }
+
+
+async def orchestrate_scan_async(target: str, use_ai_planner: bool = False, tool: str = None,
+                                 deep_scan: bool = False, analyze: bool = True) -> dict:
+    """
+    asyncio variant of orchestrate_scan: subprocess lewat asyncio.create_subprocess_exec
+    dan analisis lewat async LLM client. Struktur hasil sama dengan orchestrate_scan.
+    """
+    # 1. Planning (AI planner masih sync, jalankan di thread supaya event loop tidak blok)
+    try:
+        if use_ai_planner:
+            plan = await asyncio.to_thread(plan_scan, target, use_ai=True, tool=tool, deep_scan=deep_scan)
+        else:
+            plan = plan_scan(target, use_ai=False, tool=tool, deep_scan=deep_scan)
+        if not plan or "command" not in plan:
+            return {"ok": False, "error": "planner failed", "target": target}
+    except Exception as e:
+        return {"ok": False, "error": f"planner exception: {str(e)}", "target": target}
+
+    # 2. Execution
+    try:
+        execution = await run_command_aio(plan["command"])
+        if not execution.get("ok"):
+            return {"ok": False, "error": "execution failed", "target": target, "plan": plan, "details": execution}
+    except Exception as e:
+        return {"ok": False, "error": f"execution exception: {str(e)}", "target": target, "plan": plan}
+
+    if not analyze:
+        return {"ok": True, "target": target, "plan": plan, "execution": execution}
+
+    # 3. Analysis
+    try:
+        analysis = await analyze_output_async(plan["tool"], execution, target=target)
+    except Exception as e:
+        return {"ok": False, "error": f"analysis exception: {str(e)}", "target": target, "plan": plan, "execution": execution}
+
+    return {"ok": True, "target": target, "plan": plan, "execution": execution, "analysis": analysis}
+
+
+async def orchestrate_scans_many(targets: Union[Iterable[str], AsyncIterable[str]], concurrency: int = 8,
+                                 use_ai_planner: bool = False, tool: str = None, deep_scan: bool = False,
+                                 analyze: bool = True) -> AsyncIterator[dict]:
+    """
+    Scan banyak target dengan paling banyak `concurrency` scan berjalan bersamaan.
+
+    Hasil di-yield begitu masing-masing selesai (bukan urutan input). Target
+    diambil dari `targets` secara lazy dan scan baru hanya dimulai setelah
+    consumer mengambil hasil sebelumnya, sehingga iterable besar (file, stdin)
+    tidak pernah dimuat/dijalankan sekaligus (backpressure).
+
+    Example:
+        async for result in orchestrate_scans_many(open("targets.txt"), concurrency=16):
+            print(result["target"], result["ok"])
+    """
+    concurrency = max(1, concurrency)
+    if hasattr(targets, "__aiter__"):
+        source = targets.__aiter__()
+        next_target = source.__anext__
+    else:
+        iterator = iter(targets)
+
+        async def next_target():
+            try:
+                return next(iterator)
+            except StopIteration:
+                raise StopAsyncIteration
+
+    in_flight = set()
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(in_flight) < concurrency:
+                try:
+                    target = (await next_target()).strip()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                if target:
+                    in_flight.add(asyncio.create_task(orchestrate_scan_async(
+                        target, use_ai_planner=use_ai_planner, tool=tool, deep_scan=deep_scan, analyze=analyze)))
+
+            if not in_flight:
+                return
+
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        # Consumer berhenti lebih awal: batalkan scan yang masih berjalan (proses di-kill)
+        for task in in_flight:
+            task.cancel()
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
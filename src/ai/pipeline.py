@@ -0,0 +1,260 @@
+"""
+Deep-scan pipeline: nmap -> (gobuster, nikto) per web service -> sqlmap per parameterized URL.
+
+Stage berikutnya dibuat saat runtime dari hasil parse stage sebelumnya (DAG
+dinamis) dan dijalankan paralel dengan batas concurrency per tool, sehingga
+assessment penuh selesai dalam waktu critical path-nya, bukan jumlah semua stage.
+"""
+import os
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urljoin, urlparse
+
+from .planner import build_rule_command, classify_target
+from .analyzer import analyze_output
+from .analyzer.structured_parser import extract_structured_data
+from executor.runner import run_command
+
+STAGE_CONCURRENCY = {
+    "nmap": int(os.getenv("PIPELINE_NMAP_CONCURRENCY", 2)),
+    "gobuster": int(os.getenv("PIPELINE_GOBUSTER_CONCURRENCY", 2)),
+    "nikto": int(os.getenv("PIPELINE_NIKTO_CONCURRENCY", 2)),
+    "sqlmap": int(os.getenv("PIPELINE_SQLMAP_CONCURRENCY", 1)),
+}
+MAX_SQLMAP_TARGETS = int(os.getenv("PIPELINE_MAX_SQLMAP_TARGETS", 5))
+
+SEVERITY_ORDER = ["unknown", "info", "low", "medium", "high", "critical"]
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def severity_rank(severity: str) -> int:
+    severity = (severity or "unknown").lower()
+    return SEVERITY_ORDER.index(severity) if severity in SEVERITY_ORDER else 0
+
+
+def normalize_url(url: str) -> str:
+    """Skema + host + port non-default + path (default '/'), tanpa fragment."""
+    parsed = urlparse(url)
+    port = parsed.port
+    netloc = parsed.hostname or ""
+    if port and port != _DEFAULT_PORTS.get(parsed.scheme):
+        netloc = f"{netloc}:{port}"
+    path = parsed.path or "/"
+    query = f"?{parsed.query}" if parsed.query else ""
+    return f"{parsed.scheme}://{netloc}{path}{query}"
+
+
+def discover_web_services(structured: Dict) -> List[str]:
+    """Base URL untuk setiap port HTTP(S) terbuka dari hasil parse nmap."""
+    urls = []
+    for host in structured.get("hosts", []):
+        addr = next((a.get("addr") for a in host.get("addresses", []) if a.get("addrtype") != "mac"), None)
+        if not addr:
+            continue
+        for port in host.get("ports", []):
+            name = (port.get("service") or {}).get("name", "")
+            if port.get("state") != "open" or "http" not in name or not str(port.get("port") or "").isdigit():
+                continue
+            portid = int(port.get("port"))
+            scheme = "https" if "https" in name or "ssl" in name or portid in (443, 8443) else "http"
+            url = normalize_url(f"{scheme}://{addr}:{portid}/")
+            if url not in urls:
+                urls.append(url)
+    return urls
+
+
+def discover_parameterized_urls(base_url: str, tool: str, structured: Dict) -> List[str]:
+    """URL dengan query string yang ditemukan nikto/gobuster (kandidat sqlmap)."""
+    if tool == "nikto":
+        paths = [item.get("uri") or "" for item in structured.get("items", [])]
+    elif tool == "gobuster":
+        paths = [finding.get("path") or "" for finding in structured.get("findings", [])]
+    else:
+        return []
+    urls = []
+    for path in paths:
+        if "?" in path and "=" in path:
+            url = normalize_url(urljoin(base_url, path))
+            if url not in urls:
+                urls.append(url)
+    return urls
+
+
+class PipelineTask:
+    def __init__(self, tool: str, target: str, depends_on: Optional[int] = None, deep_scan: bool = False):
+        self.id = None
+        self.tool = tool
+        self.target = target
+        self.command = build_rule_command(tool, target, deep_scan)
+        self.depends_on = depends_on
+        self.result = None
+
+
+class DeepScanPipeline:
+    """
+    Jalankan chain deep scan untuk satu target dan kembalikan satu hasil agregat.
+
+    `runner` dan `analyzer` bisa diganti (mis. untuk testing atau eksekusi async).
+    """
+
+    def __init__(self, target: str, analyze: bool = True, deep_scan: bool = False,
+                 stage_limits: Dict[str, int] = None,
+                 runner: Callable[[list], Dict] = run_command,
+                 analyzer: Callable[..., Dict] = analyze_output):
+        self.target = target.strip()
+        self.analyze = analyze
+        self.deep_scan = deep_scan
+        self.limits = {**STAGE_CONCURRENCY, **(stage_limits or {})}
+        # Limit 0 membuat task stage itu tidak pernah bisa jalan (run() menunggu selamanya)
+        invalid = sorted(tool for tool, limit in self.limits.items() if limit < 1)
+        if invalid:
+            raise ValueError(f"Stage concurrency must be at least 1: {', '.join(invalid)}")
+        self.runner = runner
+        self.analyzer = analyzer
+        self.tasks: List[PipelineTask] = []
+        self._seen = set()
+
+    # ------------------------------------------------------------------
+    # DAG construction
+    # ------------------------------------------------------------------
+    def _add(self, tool: str, target: str, parent: PipelineTask = None) -> Optional[PipelineTask]:
+        key = (tool, target)
+        if key in self._seen:
+            return None
+        if tool == "sqlmap" and sum(1 for t in self.tasks if t.tool == "sqlmap") >= MAX_SQLMAP_TARGETS:
+            return None
+        self._seen.add(key)
+        task = PipelineTask(tool, target, depends_on=parent.id if parent else None, deep_scan=self.deep_scan)
+        task.id = len(self.tasks)
+        self.tasks.append(task)
+        return task
+
+    def _add_web_service(self, url: str, parent: PipelineTask = None) -> List[PipelineTask]:
+        return [t for t in (self._add("gobuster", url, parent), self._add("nikto", url, parent)) if t]
+
+    def _root_tasks(self) -> List[PipelineTask]:
+        kind = classify_target(self.target)
+        host = urlparse(self.target).hostname or self.target
+        roots = [self._add("nmap", host)]
+        if kind in ("url", "url_params"):
+            # Target web sudah diketahui: enumerasi tidak perlu menunggu nmap
+            parsed = urlparse(self.target)
+            roots += self._add_web_service(normalize_url(f"{parsed.scheme}://{parsed.netloc}/"))
+        if kind == "url_params":
+            roots.append(self._add("sqlmap", normalize_url(self.target)))
+        return [t for t in roots if t]
+
+    def _expand(self, task: PipelineTask) -> List[PipelineTask]:
+        structured = (task.result or {}).get("structured") or {}
+        if not structured.get("parsed"):
+            return []
+        if task.tool == "nmap":
+            children = []
+            for url in discover_web_services(structured):
+                children += self._add_web_service(url, task)
+            return children
+        if task.tool in ("nikto", "gobuster"):
+            return [t for t in (self._add("sqlmap", url, task)
+                                for url in discover_parameterized_urls(task.target, task.tool, structured)) if t]
+        return []
+
+    # ------------------------------------------------------------------
+    # Execution
+    # ------------------------------------------------------------------
+    def _execute(self, task: PipelineTask) -> Dict:
+        started = time.monotonic()
+        try:
+            execution = self.runner(list(task.command))
+        except Exception as e:
+            execution = {"ok": False, "error": "exception", "details": str(e)}
+
+        stdout = execution.get("stdout") or ""
+        stderr = execution.get("stderr") or ""
+        structured = extract_structured_data(task.tool, stdout, stderr) if (stdout or stderr) else {"parsed": False}
+        analysis = None
+        if self.analyze and execution.get("ok"):
+            analysis = self.analyzer(task.tool, execution, target=task.target, structured=structured)
+
+        return {
+            "ok": bool(execution.get("ok")),
+            "error": execution.get("error"),
+            "returncode": execution.get("returncode"),
+            "structured": structured,
+            "analysis": analysis,
+            "started": started,
+            "finished": time.monotonic(),
+        }
+
+    def run(self) -> Dict:
+        started = time.monotonic()
+        pending = deque(self._root_tasks())
+        running = {}
+        active = Counter()
+
+        with ThreadPoolExecutor(max_workers=max(1, sum(self.limits.values()))) as pool:
+            while pending or running:
+                # Submit semua task yang masih dalam batas concurrency tool-nya
+                for task in list(pending):
+                    if active[task.tool] < self.limits.get(task.tool, 1):
+                        pending.remove(task)
+                        active[task.tool] += 1
+                        running[pool.submit(self._execute, task)] = task
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = running.pop(future)
+                    active[task.tool] -= 1
+                    task.result = future.result()
+                    pending.extend(self._expand(task))
+
+        return self._aggregate(time.monotonic() - started, started)
+
+    # ------------------------------------------------------------------
+    # Aggregation
+    # ------------------------------------------------------------------
+    def _critical_path(self) -> List[int]:
+        if not self.tasks:
+            return []
+        last = max(self.tasks, key=lambda t: t.result["finished"])
+        path = [last.id]
+        while self.tasks[path[-1]].depends_on is not None:
+            path.append(self.tasks[path[-1]].depends_on)
+        return list(reversed(path))
+
+    def _aggregate(self, elapsed: float, started: float) -> Dict:
+        stages = []
+        risk = "unknown"
+        for task in self.tasks:
+            result = task.result
+            analysis = result.get("analysis")
+            if isinstance(analysis, dict):
+                severity = (analysis.get("issue") or {}).get("severity")
+                if severity_rank(severity) > severity_rank(risk):
+                    risk = severity.lower()
+            stages.append({
+                "id": task.id,
+                "tool": task.tool,
+                "target": task.target,
+                "command": task.command,
+                "depends_on": task.depends_on,
+                "ok": result["ok"],
+                "error": result["error"],
+                "returncode": result["returncode"],
+                "started_at": round(result["started"] - started, 3),
+                "duration": round(result["finished"] - result["started"], 3),
+                "structured": result["structured"],
+                "analysis": result["analysis"],
+            })
+
+        return {
+            "ok": any(stage["ok"] for stage in stages),
+            "target": self.target,
+            "risk_level": risk,
+            "web_services": [t.target for t in self.tasks if t.tool == "nikto"],
+            "stages": stages,
+            "critical_path": self._critical_path(),
+            "elapsed": round(elapsed, 3),
+            "total_stage_time": round(sum(stage["duration"] for stage in stages), 3),
+        }
@@ -1,52 +1,222 @@
-from typing import Dict
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
 from .llm.groq import call_groq
+from .llm.governor import current_principal, use_principal
 from .analyzer.parser import safe_parse_json
+import hashlib
+import ipaddress
 import json
+import os
+import re
 import shlex
+import threading
+import time
 
 
 # ==========================================================
 # RULE-BASED PLANNER (DEFAULT & SAFE)
 # ==========================================================
-def plan_scan_rule_based(target: str, forced_tool: str = None) -> Dict[str, str]:
+# Di bawah threshold ini plan_scan(use_ai=True) baru memanggil LLM.
+CONFIDENCE_THRESHOLD = float(os.getenv("PLANNER_CONFIDENCE_THRESHOLD", 0.75))
+
+DEFAULT_WORDLIST = "data/wordlists/default_common.txt"
+
+_REASONS = {
+    "nmap": "Network service scan (rule-based, xml stdout)",
+    "nikto": "Web vulnerability scan (rule-based, xml output)",
+    "gobuster": "Web content discovery (rule-based)",
+    "sqlmap": "SQL injection test (rule-based)",
+}
+
+
+def classify_target(target: str) -> str:
+    """ip | hostname | url | url_params"""
+    target = (target or "").strip()
+    parsed = urlparse(target)
+    if parsed.scheme in ("http", "https"):
+        return "url_params" if parsed.query else "url"
+    try:
+        ipaddress.ip_address(target)
+        return "ip"
+    except ValueError:
+        return "hostname"
+
+
+def _host(target: str) -> str:
+    target = (target or "").strip()
+    return urlparse(target).hostname or target
+
+
+def build_rule_command(tool: str, target: str, deep_scan: bool = False) -> list:
+    """Command template per tool (standard / deep)."""
+    if tool == "nikto":
+        return ["nikto", "-h", target, "-Format", "xml"]
+    if tool == "gobuster":
+        return ["gobuster", "dir", "-u", target, "-w", DEFAULT_WORDLIST]
+    if tool == "sqlmap":
+        command = ["sqlmap", "-u", target, "--batch", "--random-agent"]
+        return command + ["--level", "3", "--risk", "2"] if deep_scan else command
+    return ["nmap", "-A" if deep_scan else "-sV", "-T4", "-oX", "-", target]
+
+
+def plan_scan_rule_based(target: str, forced_tool: str = None, deep_scan: bool = False, prior_scans: List[Dict] = None) -> Dict:
     """
     Planner tanpa AI.
     Aman, deterministik, cocok untuk testing awal.
+
+    Plan diberi skor `confidence` (0..1) dari tipe target, forced tool, deep_scan
+    dan hasil scan sebelumnya di session; plan_scan memakai skor ini untuk
+    memutuskan apakah LLM perlu dikonsultasikan.
     """
 
     target = target.strip()
+    kind = classify_target(target)
+    host = _host(target)
+    prior = [p for p in (prior_scans or []) if _host(p.get("target")) == host]
 
     # Respect user choice if provided
-    if forced_tool:
+    if forced_tool and forced_tool.lower() in _REASONS:
         tool = forced_tool.lower()
-        if tool == "nikto":
-            return {
-                "tool": "nikto",
-                "command": ["nikto", "-h", target, "-Format", "xml"],
-                "reason": "User selected Nikto"
-            }
-        elif tool == "nmap":
-            return {
-                "tool": "nmap",
-                "command": ["nmap", "-sV", "-T4", "-oX", "-", target],
-                "reason": "User selected Nmap"
-            }
-
-    # Default logic
-    if target.startswith("http://") or target.startswith("https://"):
-        return {
-            "tool": "nikto",
-            "command": ["nikto", "-h", target, "-Format", "xml"],
-            "reason": "Web vulnerability scan (rule-based, xml output)"
-        }
+        reason = f"User selected {tool.capitalize()}"
+        confidence = 0.95
+    elif kind in ("url", "url_params"):
+        # Query string saja bukan alasan menjalankan sqlmap (intrusif): nikto tetap default,
+        # sqlmap hanya lewat forced tool atau pilihan AI planner
+        tool, reason, confidence = "nikto", _REASONS["nikto"], 0.85
+    else:
+        tool, reason, confidence = "nmap", _REASONS["nmap"], 0.9
+
+    # Deep scan: LLM mungkin memilih chaining/flag yang lebih baik
+    if deep_scan and not forced_tool:
+        confidence -= 0.1
 
+    # Target sudah pernah di-scan dengan tool yang sama: perlu adaptasi
+    same_tool = [p for p in prior if p.get("tool") == tool]
+    if any(p.get("status") == "failed" for p in same_tool):
+        confidence -= 0.4
+        reason += "; previous run of this tool failed"
+    elif same_tool and not forced_tool:
+        confidence -= 0.3
+        reason += "; already scanned with this tool"
+
+    confidence = round(max(0.0, min(1.0, confidence)), 2)
     return {
-        "tool": "nmap",
-        "command": ["nmap", "-sV", "-T4", "-oX", "-", target],
-        "reason": "Network service scan (rule-based, xml stdout)"
+        "tool": tool,
+        "command": build_rule_command(tool, target, deep_scan),
+        "reason": reason,
+        "rationale": f"Rule-based plan (confidence {confidence:.2f}): {reason}",
+        "confidence": confidence,
     }
 
 
+# ==========================================================
+# PLAN CACHE
+# ==========================================================
+PLAN_CACHE_TTL = float(os.getenv("PLANNER_CACHE_TTL", 3600))
+PLAN_CACHE_SIZE = int(os.getenv("PLANNER_CACHE_SIZE", 512))
+
+TARGET_PLACEHOLDER = "{target}"
+HOST_PLACEHOLDER = "{host}"
+_PLACEHOLDER_RE = re.compile(re.escape(TARGET_PLACEHOLDER) + "|" + re.escape(HOST_PLACEHOLDER))
+
+
+def history_digest(history: str = None) -> str:
+    """Digest ringkas dari history (urutan baris diabaikan)."""
+    lines = sorted(line.strip().lower() for line in (history or "").splitlines() if line.strip())
+    return hashlib.sha1("\n".join(lines).encode()).hexdigest()[:16]
+
+
+class PlanCache:
+    """
+    Memo AI plan per (jenis target, forced tool, deep_scan, history digest).
+    Command disimpan sebagai template dengan placeholder target, sehingga plan
+    untuk example.com bisa dipakai ulang untuk example.org.
+    """
+
+    def __init__(self, ttl: float = PLAN_CACHE_TTL, max_entries: int = PLAN_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(target: str, forced_tool: str = None, deep_scan: bool = False, history: str = None) -> tuple:
+        return (classify_target(target), (forced_tool or "").lower(), bool(deep_scan), history_digest(history))
+
+    @staticmethod
+    def _substitutions(target: str):
+        """(pattern, placeholder): target/host hanya cocok sebagai token utuh, bukan substring."""
+        target = target.strip()
+        host = urlparse(target).hostname
+        values = [(target, TARGET_PLACEHOLDER)]
+        if host and host != target:
+            values.append((host, HOST_PLACEHOLDER))
+        # 10.0.0.1 tidak boleh cocok di dalam 10.0.0.10, a.example tidak di dalam www.a.example
+        return [(re.compile(r"(?<![\w.-])" + re.escape(value) + r"(?![\w-]|\.\w)"), placeholder)
+                for value, placeholder in values]
+
+    def get(self, target: str, forced_tool: str = None, deep_scan: bool = False, history: str = None) -> Optional[Dict]:
+        key = self.key(target, forced_tool, deep_scan, history)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry["stored_at"] > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            template = entry["plan"]
+
+        values = {TARGET_PLACEHOLDER: target.strip(), HOST_PLACEHOLDER: urlparse(target.strip()).hostname or target.strip()}
+
+        def render(text: str) -> str:
+            # Satu pass: nilai yang sudah disisipkan tidak dipindai ulang
+            return _PLACEHOLDER_RE.sub(lambda m: values[m.group(0)], text)
+
+        plan = dict(template)
+        plan["command"] = [render(arg) for arg in template["command"]]
+        plan["rationale"] = f"(cached plan) {render(template.get('rationale') or '')}".strip()
+        plan["cached"] = True
+        return plan
+
+    def put(self, target: str, plan: Dict, forced_tool: str = None, deep_scan: bool = False, history: str = None) -> bool:
+        """Simpan plan sebagai template. Plan yang tidak memuat target tidak di-cache."""
+        substitutions = self._substitutions(target)
+
+        def templatize(text: str) -> str:
+            for pattern, placeholder in substitutions:
+                text = pattern.sub(placeholder, text)
+            return text
+
+        command = [templatize(arg) for arg in plan.get("command") or []]
+        if not any(TARGET_PLACEHOLDER in arg or HOST_PLACEHOLDER in arg for arg in command):
+            return False
+
+        key = self.key(target, forced_tool, deep_scan, history)
+        template = {
+            "tool": plan.get("tool"),
+            "command": command,
+            "rationale": templatize(plan.get("rationale") or ""),
+        }
+        with self._lock:
+            # History digest bagian dari key: history yang berubah otomatis miss; entry
+            # untuk digest lain (session lain) tetap valid dan hanya keluar lewat TTL/LRU
+            self._entries[key] = {"plan": template, "stored_at": time.time()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+plan_cache = PlanCache()
+
+
 # ==========================================================
 # AI PLANNER (IMPLEMENTASI LENGKAP)
 # ==========================================================
@@ -54,7 +224,12 @@ def plan_scan_ai(target: str, forced_tool: str = None, history: str = None, deep
     """
     AI-powered planner yang menggunakan LLM untuk menentukan tool terbaik.
     Dapat beradaptasi berdasarkan history scan sebelumnya.
+    Hasil di-memo di plan_cache sehingga planning berulang tidak memanggil LLM.
     """
+    cached = plan_cache.get(target, forced_tool=forced_tool, deep_scan=deep_scan, history=history)
+    if cached:
+        print(f"⚡ AI Expert Planner cache hit: {cached.get('tool')} for {target}")
+        return cached
     
     tool_instruction = ""
     if forced_tool:
@@ -96,7 +271,7 @@ Return ONLY valid JSON (no markdown):
 """
 
     try:
-        response = call_groq(prompt)
+        response = call_groq(prompt, route="planner")
         plan = safe_parse_json(response)
         
         if "error" in plan and "tool" not in plan:
@@ -121,6 +296,8 @@ Return ONLY valid JSON (no markdown):
         
         # Logging
         print(f"✅ AI Expert Planner selected: {plan.get('tool')} - {plan.get('rationale')}")
+        if command_str:
+            plan_cache.put(target, plan, forced_tool=forced_tool, deep_scan=deep_scan, history=history)
             
         return plan
     except Exception as e:
@@ -132,25 +309,81 @@ Return ONLY valid JSON (no markdown):
 # ==========================================================
 # PUBLIC API (DIPANGGIL ORCHESTRATOR)
 # ==========================================================
-def plan_scan(target: str, use_ai: bool = False, tool: str = None, history: str = None, deep_scan: bool = False) -> Dict[str, str]:
+def plan_scan(target: str, use_ai: bool = False, tool: str = None, history: str = None, deep_scan: bool = False, prior_scans: List[Dict] = None) -> Dict[str, str]:
     """
     Entry point planner.
 
     use_ai=False -> rule-based (default, aman)
-    use_ai=True  -> AI-powered (lebih fleksibel)
-    tool         -> Optional forced tool name (nmap/nikto)
+    use_ai=True  -> hybrid: rule-based dulu, AI hanya jika confidence < CONFIDENCE_THRESHOLD
+    tool         -> Optional forced tool name (nmap/nikto/gobuster/sqlmap)
+    prior_scans  -> Optional list of {"target", "tool", "status", "risk_level"} from the session
     """
 
-    if use_ai:
+    plan = plan_scan_rule_based(target, forced_tool=tool, deep_scan=deep_scan, prior_scans=prior_scans)
+
+    if use_ai and plan["confidence"] < CONFIDENCE_THRESHOLD:
         try:
-            print(f"🤖 Using AI Expert Planner for target: {target} (Mode: {'Deep' if deep_scan else 'Standard'})")
+            print(f"🤖 Using AI Expert Planner for target: {target} (Mode: {'Deep' if deep_scan else 'Standard'}, rule confidence {plan['confidence']:.2f})")
             result = plan_scan_ai(target, forced_tool=tool, history=history, deep_scan=deep_scan)
             return result
         except Exception as e:
             # Fallback ke rule-based jika AI gagal
             print(f"⚠️ Warning: AI planner failed ({str(e)}), falling back to rule-based")
-            return plan_scan_rule_based(target, forced_tool=tool)
+            return plan
     else:
-        print(f"📋 Using Rule-Based Planner for target: {target} (Tool: {tool})")
+        print(f"📋 Using Rule-Based Planner for target: {target} (Tool: {plan['tool']}, confidence {plan['confidence']:.2f})")
+
+    return plan
+
+
+# ==========================================================
+# SPECULATIVE PLANNING
+# ==========================================================
+# Tool yang boleh dijalankan spekulatif sebelum AI selesai (recon murah & selalu berguna).
+SPECULATIVE_TOOLS = {t.strip() for t in os.getenv("PLANNER_SPECULATIVE_TOOLS", "nmap").split(",") if t.strip()}
+
+_ai_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="ai-planner")
+
+
+def needs_ai_plan(rule_plan: Dict) -> bool:
+    return rule_plan.get("confidence", 0.0) < CONFIDENCE_THRESHOLD
+
+
+def should_speculate(target: str, rule_plan: Dict, prior_scans: List[Dict] = None) -> bool:
+    """
+    Rule plan boleh langsung dijalankan sambil AI dikonsultasikan jika tool-nya
+    termasuk SPECULATIVE_TOOLS dan command yang persis sama belum pernah gagal
+    untuk host ini. Tidak bergantung pada alasan confidence-nya rendah.
+    """
+    if rule_plan.get("tool") not in SPECULATIVE_TOOLS:
+        return False
+    host = _host(target)
+    return not any(
+        p.get("status") == "failed" and p.get("command") == rule_plan.get("command") and _host(p.get("target")) == host
+        for p in prior_scans or []
+    )
+
+
+def submit_ai_plan(target: str, forced_tool: str = None, history: str = None, deep_scan: bool = False) -> Future:
+    """Jalankan plan_scan_ai di background thread (budget LLM tetap milik principal pemanggil)."""
+    principal = current_principal()
+
+    def _plan():
+        with use_principal(principal):
+            return plan_scan_ai(target, forced_tool=forced_tool, history=history, deep_scan=deep_scan)
 
-    return plan_scan_rule_based(target, forced_tool=tool)
\ No newline at end of file
+    return _ai_executor.submit(_plan)
+
+
+def compare_plans(speculative: Dict, ai_plan: Dict) -> str:
+    """
+    agree   -> tool dan argumen sama, scan spekulatif dipakai
+    replace -> tool sama tapi flag berbeda, scan spekulatif dibatalkan
+    extend  -> tool berbeda, scan spekulatif tetap jalan sebagai recon tambahan
+    """
+    if ai_plan.get("tool") != speculative.get("tool"):
+        return "extend"
+    # Urutan argumen dan flag ganda bermakna (mis. `-p 80 -sV` vs `-sV 80 -p`)
+    if list(ai_plan.get("command") or []) == list(speculative.get("command") or []):
+        return "agree"
+    return "replace"
@@ -0,0 +1,79 @@
+"""
+Retrieval lokal atas findings scan dalam satu session.
+
+Setiap scan yang selesai dipecah menjadi dokumen pendek (satu per service,
+item nikto, path gobuster, payload sqlmap, plus ringkasan analisis). Saat chat,
+dokumen session diranking dengan BM25 terhadap pesan user dan hanya top-k yang
+dimasukkan ke prompt, sehingga ukuran context tetap kecil.
+"""
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List
+
+from .analyzer.prompt_builder import compact_findings
+
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", 5))
+MAX_DOCUMENT_CHARS = 400
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9._\-/]*")
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = _TOKEN.findall((text or "").lower())
+    # Pecah juga token majemuk (apache/2.4.49, cve-2021-41773) supaya bagiannya bisa dicari.
+    parts = [p for t in tokens if any(c in t for c in "._-/") for p in re.split(r"[._\-/]", t) if p]
+    return tokens + parts
+
+
+def findings_to_documents(tool: str, target: str, structured: Dict, analysis: Dict = None) -> List[str]:
+    """Normalisasi hasil scan menjadi daftar dokumen teks pendek."""
+    documents = []
+    _, entries = compact_findings(tool, structured)
+    for _, entry in entries:
+        documents.append(f"[{tool} {target}] {json.dumps(entry, separators=(',', ':'))}"[:MAX_DOCUMENT_CHARS])
+
+    if isinstance(analysis, dict):
+        issue = analysis.get("issue") or {}
+        if isinstance(issue, dict) and issue.get("type"):
+            documents.append(
+                f"[{tool} {target}] issue: {issue.get('type')} severity={issue.get('severity')} "
+                f"endpoint={issue.get('endpoint')}"[:MAX_DOCUMENT_CHARS]
+            )
+        if analysis.get("summary"):
+            documents.append(f"[{tool} {target}] summary: {analysis.get('summary')}"[:MAX_DOCUMENT_CHARS])
+    return documents
+
+
+class BM25Index:
+    """Inverted index kecil dengan skor Okapi BM25."""
+
+    def __init__(self, documents: List[str], k1: float = 1.5, b: float = 0.75):
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.lengths = []
+        for doc_id, text in enumerate(documents):
+            counts = Counter(tokenize(text))
+            self.lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append((doc_id, tf))
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+    def search(self, query: str, k: int = None) -> List[str]:
+        k = k or RETRIEVAL_TOP_K
+        n = len(self.documents)
+        scores = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / self.avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        ranked = sorted(scores, key=lambda doc_id: (-scores[doc_id], doc_id))
+        return [self.documents[doc_id] for doc_id in ranked[:k]]
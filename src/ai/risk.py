@@ -0,0 +1,156 @@
+"""
+Risk scoring deterministik dari findings ternormalisasi (tanpa LLM).
+
+Setiap finding diubah menjadi vektor fitur:
+    [severity, cvss tertinggi dari CVE index, exposure class service, sensitivitas path]
+lalu skor finding = fitur . bobot. Skor scan = skor finding tertinggi ditambah
+bonus kecil untuk jumlah finding signifikan; skor target = skor tertinggi dari
+scan terakhir per tool.
+
+Perhitungan dilakukan batched dengan NumPy (satu matrix untuk seluruh history),
+sehingga seluruh ScanHistory bisa di-rescore dalam satu pass ketika bobot berubah.
+"""
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .analyzer.prompt_builder import RISKY_SERVICES, severity_signal
+from .vulndb import VulnIndex, vuln_index
+
+FEATURES = ("severity", "cvss", "service", "path")
+
+DEFAULT_WEIGHTS = {"severity": 1.0, "cvss": 0.8, "service": 0.5, "path": 0.6}
+RISK_WEIGHTS = {**DEFAULT_WEIGHTS, **json.loads(os.getenv("RISK_WEIGHTS", "{}"))}
+
+# Nilai fitur severity per label Finding.severity
+SEVERITY_VALUES = {"info": 0.0, "low": 2.0, "medium": 4.0, "high": 7.0, "critical": 9.0}
+# CVE tanpa CVSS (mis. disebut di deskripsi nikto) dianggap high
+DEFAULT_CVE_CVSS = 7.0
+# Path sensitif yang bisa diakses lebih berisiko daripada yang 401/403
+PATH_STATUS_FACTOR = {200: 1.0, 204: 1.0, 301: 0.5, 302: 0.5, 401: 0.5, 403: 0.5}
+MAX_PATH_SIGNAL = 10
+
+BREADTH_WEIGHT = 0.5
+SIGNIFICANT_SCORE = 4.0
+RISK_THRESHOLDS = [(9.0, "critical"), (6.5, "high"), (4.0, "medium"), (1.5, "low")]
+
+
+def risk_level(score: float) -> str:
+    for threshold, label in RISK_THRESHOLDS:
+        if score >= threshold:
+            return label
+    return "info"
+
+
+def finding_features(finding: Dict, index: Optional[VulnIndex] = None) -> List[float]:
+    """Satu finding (dict kolom tabel finding) -> vektor fitur sesuai FEATURES."""
+    index = index or vuln_index
+    cvss = 0.0
+    if finding.get("product") and finding.get("version"):
+        matches = index.lookup(finding["product"], finding["version"])
+        if matches:
+            cvss = float(matches[0]["cvss"] or DEFAULT_CVE_CVSS)
+    if not cvss and finding.get("cve"):
+        cvss = DEFAULT_CVE_CVSS
+
+    path_signal = 0.0
+    if finding.get("path"):
+        factor = PATH_STATUS_FACTOR.get(finding.get("status"), 1.0 if finding.get("status") is None else 0.25)
+        path_signal = min(severity_signal(finding["path"]), MAX_PATH_SIGNAL) * factor
+
+    return [
+        SEVERITY_VALUES.get(finding.get("severity") or "info", 0.0),
+        cvss,
+        float(RISKY_SERVICES.get(finding.get("service"), 0)),
+        path_signal,
+    ]
+
+
+def _weight_vector(weights: Optional[Dict[str, float]]) -> List[float]:
+    weights = {**RISK_WEIGHTS, **(weights or {})}
+    return [float(weights[name]) for name in FEATURES]
+
+
+def score_groups(features: Sequence[Sequence[float]], groups: Sequence[int], group_count: int,
+                 weights: Optional[Dict[str, float]] = None) -> List[float]:
+    """
+    Skor per group (scan) dalam satu pass.
+
+    features: matrix n x len(FEATURES); groups: index group [0, group_count) per baris.
+    Skor group = max(skor finding) + BREADTH_WEIGHT * log1p(jumlah finding >= SIGNIFICANT_SCORE).
+    """
+    w = np.asarray(_weight_vector(weights))
+    scores = np.asarray(features, dtype=float).reshape(-1, len(FEATURES)) @ w
+    idx = np.asarray(groups, dtype=int)
+    best = np.zeros(group_count)
+    significant = np.zeros(group_count)
+    np.maximum.at(best, idx, scores)
+    np.add.at(significant, idx, scores >= SIGNIFICANT_SCORE)
+    return (best + BREADTH_WEIGHT * np.log1p(significant)).tolist()
+
+
+def score_scan_findings(findings_by_scan: Dict[int, List[Dict]], weights: Optional[Dict[str, float]] = None,
+                        index: Optional[VulnIndex] = None) -> Dict[int, Tuple[float, str]]:
+    """{scan_id: [finding dict]} -> {scan_id: (score, risk level)}. Scan tanpa finding = info."""
+    scan_ids = list(findings_by_scan)
+    position = {scan_id: i for i, scan_id in enumerate(scan_ids)}
+    features, groups = [], []
+    for scan_id, findings in findings_by_scan.items():
+        for finding in findings:
+            features.append(finding_features(finding, index))
+            groups.append(position[scan_id])
+    scores = score_groups(features, groups, len(scan_ids), weights)
+    return {scan_id: (round(score, 2), risk_level(score)) for scan_id, score in zip(scan_ids, scores)}
+
+
+def score_findings(findings: List[Dict], weights: Optional[Dict[str, float]] = None,
+                   index: Optional[VulnIndex] = None) -> Tuple[float, str]:
+    """Skor dan risk level satu scan dari finding ternormalisasi (ai.findings.normalize_findings)."""
+    return score_scan_findings({0: findings}, weights, index)[0]
+
+
+def score_targets(scans: Iterable[Dict]) -> Dict[str, Tuple[float, str]]:
+    """
+    Risk per target dari scan yang sudah diskor: skor tertinggi di antara scan
+    terbaru untuk setiap tool. `scans`: dict dengan target, tool, created_at, score.
+    """
+    latest = {}
+    for scan in scans:
+        key = (scan["target"], scan["tool"])
+        if key not in latest or scan["created_at"] > latest[key]["created_at"]:
+            latest[key] = scan
+    targets = {}
+    for (target, _), scan in latest.items():
+        if target not in targets or scan["score"] > targets[target]:
+            targets[target] = scan["score"]
+    return {target: (score, risk_level(score)) for target, score in targets.items()}
+
+
+def rescore_history(weights: Optional[Dict[str, float]] = None, scan_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Hitung ulang ScanHistory.risk_level untuk semua scan yang punya findings
+    (atau hanya `scan_ids`) dalam satu query + satu bulk update. Butuh app context.
+    """
+    from models import db, Finding, ScanHistory
+
+    columns = (Finding.scan_id, Finding.severity, Finding.service, Finding.product,
+               Finding.version, Finding.path, Finding.status, Finding.cve)
+    query = db.session.query(*columns)
+    if scan_ids is not None:
+        query = query.filter(Finding.scan_id.in_(list(scan_ids)))
+
+    findings_by_scan: Dict[int, List[Dict]] = {}
+    for row in query.yield_per(5000):
+        finding = dict(row._mapping)
+        findings_by_scan.setdefault(finding.pop("scan_id"), []).append(finding)
+
+    scored = score_scan_findings(findings_by_scan, weights)
+    if scored:
+        db.session.execute(
+            db.update(ScanHistory),
+            [{"id": scan_id, "risk_level": level} for scan_id, (_, level) in scored.items()],
+        )
+        db.session.commit()
+    return len(scored)
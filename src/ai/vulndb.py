@@ -0,0 +1,298 @@
+"""
+Offline CVE/CPE index untuk lookup kerentanan service/version tanpa network.
+
+Feed NVD (JSON 1.1 `CVE_Items` atau API 2.0 `vulnerabilities`, boleh .gz)
+di-import sekali ke SQLite kecil: satu baris per cpeMatch yang vulnerable,
+keyed by CPE vendor/product dengan interval versi (start/end incl/excl).
+
+Saat scan, semua service dari nmap di-lookup sekaligus (lookup_many). Range per
+product dimuat sekali lalu di-cache di memory bersama version key yang sudah
+di-parse, dan hasil per (product, version) juga di-cache, sehingga lookup
+berulang cukup beberapa mikrodetik.
+
+    aivast vulndb import nvdcve-1.1-2023.json.gz nvdcve-1.1-2024.json.gz
+"""
+import gzip
+import json
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+VULNDB_PATH = os.getenv("VULNDB_PATH", str(BASE_DIR / "data" / "vulndb.sqlite"))
+VULNDB_MAX_RESULTS = int(os.getenv("VULNDB_MAX_RESULTS", 10))
+# Hasil lookup (product, version) yang di-cache (LRU); version dari banner tidak terbatas jumlahnya
+VULNDB_RESULT_CACHE_SIZE = int(os.getenv("VULNDB_RESULT_CACHE_SIZE", 4096))
+
+# Nama product dari nmap -> (cpe vendor, cpe product). Selain ini: lowercase, spasi -> '_'.
+PRODUCT_ALIASES = {
+    "openssh": ("openbsd", "openssh"),
+    "apache httpd": ("apache", "http_server"),
+    "apache tomcat": ("apache", "tomcat"),
+    "apache tomcat/coyote jsp engine": ("apache", "tomcat"),
+    "nginx": (None, "nginx"),
+    "microsoft iis httpd": ("microsoft", "internet_information_services"),
+    "lighttpd": ("lighttpd", "lighttpd"),
+    "vsftpd": (None, "vsftpd"),
+    "proftpd": ("proftpd", "proftpd"),
+    "pure-ftpd": ("pureftpd", "pure-ftpd"),
+    "mysql": ("oracle", "mysql"),
+    "mariadb": ("mariadb", "mariadb"),
+    "postgresql db": ("postgresql", "postgresql"),
+    "redis key-value store": ("redis", "redis"),
+    "mongodb": ("mongodb", "mongodb"),
+    "isc bind": ("isc", "bind"),
+    "exim smtpd": ("exim", "exim"),
+    "postfix smtpd": ("postfix", "postfix"),
+    "samba smbd": ("samba", "samba"),
+    "dropbear sshd": ("dropbear_ssh_project", "dropbear_ssh"),
+    "openssl": ("openssl", "openssl"),
+    "php": ("php", "php"),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cpe_match (
+    vendor TEXT NOT NULL,
+    product TEXT NOT NULL,
+    version TEXT,
+    start_incl TEXT,
+    start_excl TEXT,
+    end_incl TEXT,
+    end_excl TEXT,
+    cve TEXT NOT NULL,
+    cvss REAL,
+    severity TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_cpe_match_product ON cpe_match (product, vendor);
+"""
+
+_VERSION_PART = re.compile(r"\d+|[a-z]+")
+
+
+def version_key(version: Optional[str]) -> Tuple:
+    """'2.4.49' -> ((1,2),(1,4),(1,49)); '7.4p1' -> (...,(0,'p'),(1,1)). Bisa dibandingkan langsung."""
+    return tuple(
+        (1, int(part)) if part.isdigit() else (0, part)
+        for part in _VERSION_PART.findall((version or "").lower())
+    )
+
+
+def cpe_key(product: str) -> Tuple[Optional[str], str]:
+    """Product string dari nmap -> (vendor atau None, cpe product)."""
+    name = (product or "").strip().lower()
+    if name in PRODUCT_ALIASES:
+        return PRODUCT_ALIASES[name]
+    return None, re.sub(r"\s+", "_", name)
+
+
+# ==========================================================
+# IMPORT
+# ==========================================================
+def _open_feed(path: str):
+    return gzip.open(path, "rt", encoding="utf-8") if str(path).endswith(".gz") else open(path, "r", encoding="utf-8")
+
+
+def _split_cpe(uri: str) -> Optional[Tuple[str, str, str]]:
+    # cpe:2.3:part:vendor:product:version:...
+    parts = uri.replace("\\", "").split(":")
+    if len(parts) < 6:
+        return None
+    return parts[3], parts[4], parts[5]
+
+
+def _walk_nodes(nodes: Iterable[Dict]) -> Iterator[Dict]:
+    for node in nodes or []:
+        yield from node.get("cpe_match", []) or node.get("cpeMatch", [])
+        yield from _walk_nodes(node.get("children"))
+
+
+def _cve_records(feed: Dict) -> Iterator[Tuple[str, Optional[float], Optional[str], List[Dict]]]:
+    """(cve id, cvss, severity, [cpe match]) untuk feed 1.1 maupun 2.0."""
+    for item in feed.get("CVE_Items", []):
+        cve_id = item.get("cve", {}).get("CVE_data_meta", {}).get("ID")
+        impact = item.get("impact", {})
+        v3 = impact.get("baseMetricV3", {}).get("cvssV3", {})
+        v2 = impact.get("baseMetricV2", {})
+        cvss = v3.get("baseScore", v2.get("cvssV2", {}).get("baseScore"))
+        severity = v3.get("baseSeverity") or v2.get("severity")
+        yield cve_id, cvss, severity, list(_walk_nodes(item.get("configurations", {}).get("nodes")))
+
+    for entry in feed.get("vulnerabilities", []):
+        cve = entry.get("cve", {})
+        metrics = cve.get("metrics", {})
+        cvss = severity = None
+        for name in ("cvssMetricV31", "cvssMetricV30", "cvssMetricV2"):
+            if metrics.get(name):
+                metric = metrics[name][0]
+                cvss = metric.get("cvssData", {}).get("baseScore")
+                severity = metric.get("cvssData", {}).get("baseSeverity") or metric.get("baseSeverity")
+                break
+        matches = [m for config in cve.get("configurations", []) for m in _walk_nodes(config.get("nodes"))]
+        yield cve.get("id"), cvss, severity, matches
+
+
+def import_nvd_feeds(paths: Iterable[str], db_path: str = None, rebuild: bool = False) -> int:
+    """
+    Import satu atau lebih feed NVD JSON ke index SQLite. Returns jumlah baris cpe_match.
+    rebuild=True mengosongkan index dulu (feed tahunan biasanya di-import bertahap tanpa rebuild).
+    """
+    db_path = db_path or VULNDB_PATH
+    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    if rebuild:
+        conn.execute("DROP TABLE IF EXISTS cpe_match")
+    conn.executescript(_SCHEMA)
+    total = 0
+    try:
+        for path in paths:
+            with _open_feed(path) as f:
+                feed = json.load(f)
+            rows = []
+            for cve_id, cvss, severity, matches in _cve_records(feed):
+                if not cve_id:
+                    continue
+                for match in matches:
+                    if not match.get("vulnerable", True):
+                        continue
+                    cpe = _split_cpe(match.get("cpe23Uri") or match.get("criteria") or "")
+                    if cpe is None or cpe[2] == "-":
+                        continue
+                    vendor, product, version = cpe
+                    rows.append((
+                        vendor, product, None if version == "*" else version,
+                        match.get("versionStartIncluding"), match.get("versionStartExcluding"),
+                        match.get("versionEndIncluding"), match.get("versionEndExcluding"),
+                        cve_id, cvss, (severity or "").lower() or None,
+                    ))
+            conn.executemany("INSERT INTO cpe_match VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.commit()
+            total += len(rows)
+    finally:
+        conn.close()
+    if os.path.abspath(db_path) == os.path.abspath(vuln_index.db_path):
+        vuln_index.reset()
+    return total
+
+
+# ==========================================================
+# LOOKUP
+# ==========================================================
+class VulnIndex:
+    """Read-only view atas index SQLite dengan cache range per product di memory."""
+
+    def __init__(self, db_path: str = None, cache_size: int = None):
+        self.db_path = db_path or VULNDB_PATH
+        self.cache_size = cache_size or VULNDB_RESULT_CACHE_SIZE
+        self._lock = threading.Lock()
+        self._results_lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        if getattr(self, "_conn", None) is not None:
+            self._conn.close()
+        self._conn = None
+        self._ranges: Dict[str, List[Tuple]] = {}
+        self._results: "OrderedDict[Tuple[str, str], List[Dict]]" = OrderedDict()
+
+    @property
+    def available(self) -> bool:
+        return os.path.exists(self.db_path)
+
+    def _product_ranges(self, product: str) -> List[Tuple]:
+        ranges = self._ranges.get(product)
+        if ranges is not None:
+            return ranges
+        with self._lock:
+            if self._conn is None:
+                self._conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+            rows = self._conn.execute(
+                "SELECT vendor, version, start_incl, start_excl, end_incl, end_excl, cve, cvss, severity "
+                "FROM cpe_match WHERE product = ?", (product,)
+            ).fetchall()
+        ranges = [
+            (vendor, version_key(version) if version else None,
+             version_key(start_incl) if start_incl else None, version_key(start_excl) if start_excl else None,
+             version_key(end_incl) if end_incl else None, version_key(end_excl) if end_excl else None,
+             cve, cvss, severity)
+            for vendor, version, start_incl, start_excl, end_incl, end_excl, cve, cvss, severity in rows
+        ]
+        self._ranges[product] = ranges
+        return ranges
+
+    def lookup(self, product: str, version: str) -> List[Dict]:
+        """CVE yang cocok untuk product/version (urut CVSS tertinggi dulu)."""
+        if not product or not version or not version.strip() or not self.available:
+            return []
+        version = version.split()[0]
+        cache_key = (product.lower(), version)
+        with self._results_lock:
+            cached = self._results.get(cache_key)
+            if cached is not None:
+                self._results.move_to_end(cache_key)
+                return cached
+
+        vendor, cpe_product = cpe_key(product)
+        key = version_key(version)
+        found = {}
+        for row_vendor, exact, start_incl, start_excl, end_incl, end_excl, cve, cvss, severity in self._product_ranges(cpe_product):
+            if vendor and row_vendor != vendor:
+                continue
+            if exact is not None:
+                if key != exact:
+                    continue
+            elif not (
+                (start_incl is None or key >= start_incl)
+                and (start_excl is None or key > start_excl)
+                and (end_incl is None or key <= end_incl)
+                and (end_excl is None or key < end_excl)
+            ):
+                continue
+            found[cve] = {"cve": cve, "cvss": cvss, "severity": severity}
+
+        result = sorted(found.values(), key=lambda v: -(v["cvss"] or 0))[:VULNDB_MAX_RESULTS]
+        with self._results_lock:
+            self._results[cache_key] = result
+            self._results.move_to_end(cache_key)
+            while len(self._results) > self.cache_size:
+                self._results.popitem(last=False)
+        return result
+
+    def lookup_many(self, services: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], List[Dict]]:
+        """Bulk lookup untuk semua (product, version) unik; hanya yang punya CVE dikembalikan."""
+        results = {}
+        for product, version in set(services):
+            vulns = self.lookup(product, version)
+            if vulns:
+                results[(product, version)] = vulns
+        return results
+
+
+vuln_index = VulnIndex()
+
+
+def service_vulnerabilities(structured: Dict, index: VulnIndex = None) -> List[Dict]:
+    """
+    Evidence dari index offline untuk setiap service nmap yang punya product+version.
+    Returns list of {"product", "version", "endpoints", "cves": [...]}.
+    """
+    index = index or vuln_index
+    if not structured.get("parsed") or not index.available:
+        return []
+
+    endpoints: Dict[Tuple[str, str], List[str]] = {}
+    for host in structured.get("hosts", []):
+        addr = next((a.get("addr") for a in host.get("addresses", []) if a.get("addrtype") != "mac"), None)
+        for port in host.get("ports", []):
+            service = port.get("service") or {}
+            if port.get("state") == "open" and service.get("product") and service.get("version"):
+                endpoints.setdefault((service["product"], service["version"]), []).append(f"{addr}:{port.get('port')}")
+
+    matches = index.lookup_many(endpoints)
+    return [
+        {"product": product, "version": version, "endpoints": endpoints[(product, version)], "cves": cves}
+        for (product, version), cves in sorted(matches.items(), key=lambda item: -(item[1][0]["cvss"] or 0))
+    ]
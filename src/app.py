@@ -98,6 +98,12 @@ def create_app(config_overrides=None):
     from routes.session import session_bp
     app.register_blueprint(session_bp, url_prefix="/api/v1")
 
+    from routes.assets import assets_bp
+    app.register_blueprint(assets_bp, url_prefix="/api/v1")
+
+    from routes.analytics import analytics_bp
+    app.register_blueprint(analytics_bp, url_prefix="/api/v1")
+
     # Custom CLI commands
     @app.cli.command("create-db")
     def create_db_command():
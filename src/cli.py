@@ -0,0 +1,194 @@
+"""
+Headless CLI untuk AIVAST.
+
+    aivast scan -i targets.txt -o results.jsonl --concurrency 8 --ai
+    cat targets.txt | aivast scan > results.jsonl
+
+Setiap scan yang selesai ditulis sebagai satu baris JSON (JSONL) begitu selesai.
+Dengan --resume, target yang sudah ada di file output dilewati sehingga batch
+yang terhenti di tengah bisa dijalankan ulang tanpa mengulang target yang selesai.
+
+CLI memakai orchestrator, plan cache, LLM governor/router dan batasan executor
+(whitelist tool, TIMEOUTS, MAX_OUTPUT) yang sama dengan web app.
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Iterable, Iterator, Set, TextIO
+
+import click
+from dotenv import load_dotenv
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+load_dotenv(BASE_DIR / ".env")
+
+from ai.orchestrator import orchestrate_scans_many  # noqa: E402
+from ai.vulndb import VULNDB_PATH, import_nvd_feeds  # noqa: E402
+from executor.runner import ALLOWED_TOOLS  # noqa: E402
+
+DEFAULT_CONCURRENCY = int(os.getenv("CLI_SCAN_CONCURRENCY", 4))
+
+
+def read_targets(stream: TextIO) -> Iterator[str]:
+    """Yield target dari file/stdin secara lazy; baris kosong dan komentar (#) dilewati."""
+    for line in stream:
+        target = line.strip()
+        if target and not target.startswith("#"):
+            yield target
+
+
+def completed_targets(path: str, retry_failed: bool = False) -> Set[str]:
+    """
+    Target yang sudah tercatat di file JSONL hasil run sebelumnya.
+    Baris terakhir yang terpotong (proses di-kill saat menulis) diabaikan.
+    """
+    done = set()
+    if not path or not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(record, dict) or "target" not in record:
+                continue
+            if retry_failed and not record.get("ok"):
+                continue
+            done.add(record["target"])
+    return done
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def pending_targets(targets: Iterable[str], skip: Set[str]) -> Iterator[str]:
+    """Filter target yang sudah selesai dan duplikat di input."""
+    seen = set(skip)
+    for target in targets:
+        if target in seen:
+            continue
+        seen.add(target)
+        yield target
+
+
+async def run_batch(targets: Iterable[str], out: TextIO, concurrency: int, use_ai: bool = False,
+                    tool: str = None, deep_scan: bool = False, analyze: bool = True) -> dict:
+    """Jalankan batch dan tulis tiap hasil ke `out` segera setelah selesai."""
+    stats = {"total": 0, "ok": 0, "failed": 0}
+    async for result in orchestrate_scans_many(targets, concurrency=concurrency, use_ai_planner=use_ai,
+                                               tool=tool, deep_scan=deep_scan, analyze=analyze):
+        result["finished_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        out.write(json.dumps(result, default=str) + "\n")
+        out.flush()
+        stats["total"] += 1
+        stats["ok" if result.get("ok") else "failed"] += 1
+    return stats
+
+
+@click.group()
+def cli():
+    """AIVAST command line interface."""
+    pass
+
+
+@cli.command("scan")
+@click.option("-i", "--input", "input_path", default="-", show_default=True,
+              help="File berisi target (satu per baris), '-' untuk stdin.")
+@click.option("-o", "--output", "output_path", default="-", show_default=True,
+              help="File JSONL output, '-' untuk stdout.")
+@click.option("-c", "--concurrency", default=DEFAULT_CONCURRENCY, show_default=True, type=click.IntRange(1, 256),
+              help="Jumlah scan yang berjalan bersamaan.")
+@click.option("--tool", type=click.Choice(sorted(ALLOWED_TOOLS)), default=None,
+              help="Paksa tool tertentu (default: dipilih planner).")
+@click.option("--ai/--no-ai", "use_ai", default=False, show_default=True,
+              help="Gunakan AI planner untuk target yang rule-based planner-nya tidak yakin.")
+@click.option("--deep", "deep_scan", is_flag=True, help="Gunakan profil scan yang lebih agresif.")
+@click.option("--analyze/--no-analyze", default=True, show_default=True,
+              help="Jalankan analisis LLM untuk setiap hasil scan.")
+@click.option("--resume", is_flag=True, help="Lewati target yang sudah ada di file output (append).")
+@click.option("--retry-failed", is_flag=True, help="Dengan --resume, ulangi target yang sebelumnya gagal.")
+def scan_command(input_path, output_path, concurrency, tool, use_ai, deep_scan, analyze, resume, retry_failed):
+    """Scan banyak target dan stream hasilnya sebagai JSONL."""
+    if resume and output_path == "-":
+        raise click.UsageError("--resume membutuhkan --output ke file.")
+
+    skip = completed_targets(output_path, retry_failed=retry_failed) if resume else set()
+    if skip:
+        click.echo(f"Resuming: {len(skip)} target sudah selesai, dilewati.", err=True)
+
+    in_stream = sys.stdin if input_path == "-" else open(input_path, "r", encoding="utf-8")
+    out_stream = sys.stdout if output_path == "-" else open(output_path, "a" if resume else "w", encoding="utf-8")
+    if resume and out_stream.tell() and not _ends_with_newline(output_path):
+        out_stream.write("\n")  # jangan sambung ke baris yang terpotong
+    try:
+        targets = pending_targets(read_targets(in_stream), skip)
+        stats = asyncio.run(run_batch(targets, out_stream, concurrency, use_ai=use_ai, tool=tool,
+                                      deep_scan=deep_scan, analyze=analyze))
+    except KeyboardInterrupt:
+        click.echo("Interrupted; jalankan ulang dengan --resume untuk melanjutkan.", err=True)
+        sys.exit(130)
+    finally:
+        if in_stream is not sys.stdin:
+            in_stream.close()
+        if out_stream is not sys.stdout:
+            out_stream.close()
+
+    click.echo(f"Done: {stats['total']} scan ({stats['ok']} ok, {stats['failed']} failed).", err=True)
+    sys.exit(1 if stats["failed"] else 0)
+
+
+@cli.group("vulndb")
+def vulndb_group():
+    """Offline CVE/CPE index."""
+    pass
+
+
+@vulndb_group.command("import")
+@click.argument("feeds", nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option("--db", "db_path", default=VULNDB_PATH, show_default=True, help="Lokasi file index SQLite.")
+@click.option("--rebuild", is_flag=True, help="Kosongkan index sebelum import.")
+def vulndb_import_command(feeds, db_path, rebuild):
+    """Import feed NVD JSON (1.1 atau 2.0, boleh .gz) ke index offline."""
+    total = import_nvd_feeds(feeds, db_path=db_path, rebuild=rebuild)
+    click.echo(f"Imported {total} CPE match rows into {db_path}.", err=True)
+
+
+@cli.group("risk")
+def risk_group():
+    """Deterministic risk scoring."""
+    pass
+
+
+@risk_group.command("rescore")
+@click.option("--weight", "weights", multiple=True, metavar="FEATURE=VALUE",
+              help="Override bobot fitur (severity, cvss, service, path), bisa diulang.")
+def risk_rescore_command(weights):
+    """Hitung ulang risk_level seluruh ScanHistory dari findings tersimpan."""
+    from app import create_app
+    from ai.risk import FEATURES, rescore_history
+
+    overrides = {}
+    for item in weights:
+        name, _, value = item.partition("=")
+        if name not in FEATURES:
+            raise click.BadParameter(f"unknown feature '{name}'", param_hint="--weight")
+        overrides[name] = float(value)
+
+    with create_app().app_context():
+        total = rescore_history(weights=overrides)
+    click.echo(f"Rescored {total} scans.", err=True)
+
+
+def main():
+    cli()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import asyncio
 import shlex
 import shutil
 import subprocess
@@ -135,13 +136,13 @@ def run_command_async(command: list) -> Dict:
         return {"ok": False, "error": "exception", "details": str(e)}
 
 
-def run_command(command: list) -> Dict:
+def _validate_command(command: list):
     """
-    Executes a command synchronously and returns structured result.
-    Uses absolute executable path (shutil.which) and sanitizes args.
+    Whitelist + forbidden-argument checks shared by the synchronous and asyncio runners.
+    Returns (tool, tool_path, sanitized_args, error_dict).
     """
     if not command:
-        return {"ok": False, "error": "Empty command"}
+        return None, None, None, {"ok": False, "error": "Empty command"}
 
     tool = command[0]
     args = command
@@ -149,7 +150,7 @@ def run_command(command: list) -> Dict:
     # Resolve executable path and whitelist tool
     tool_path = shutil.which(tool)
     if tool not in ALLOWED_TOOLS or tool_path is None:
-        return {"ok": False, "error": "Tool not allowed or not found"}
+        return tool, None, None, {"ok": False, "error": "Tool not allowed or not found"}
 
     # Forbidden arguments check with safe exception for 'nmap -oX -'
     for i, arg in enumerate(args):
@@ -160,7 +161,7 @@ def run_command(command: list) -> Dict:
                 next_arg = args[i+1] if i+1 < len(args) else None
                 if next_arg == "-":
                     continue
-            return {"ok": False, "error": "Forbidden argument detected"}
+            return tool, None, None, {"ok": False, "error": "Forbidden argument detected"}
 
     # Build sanitized arg list
     sanitized_args = args[1:]
@@ -170,6 +171,18 @@ def run_command(command: list) -> Dict:
         if "--random-agent" not in sanitized_args:
             sanitized_args.append("--random-agent")
 
+    return tool, tool_path, sanitized_args, None
+
+
+def run_command(command: list) -> Dict:
+    """
+    Executes a command synchronously and returns structured result.
+    Uses absolute executable path (shutil.which) and sanitizes args.
+    """
+    tool, tool_path, sanitized_args, error = _validate_command(command)
+    if error:
+        return error
+
     try:
         result = subprocess.run(
             [tool_path, *sanitized_args],
@@ -199,3 +212,50 @@ def run_command(command: list) -> Dict:
         return {"ok": False, "error": "executable not found", "details": str(fnf)}
     except Exception as e:
         return {"ok": False, "error": "exception", "details": str(e)}
+
+
+async def run_command_aio(command: list) -> Dict:
+    """
+    asyncio variant of run_command (same validation and result shape), for
+    running many scans concurrently from one event loop.
+    """
+    tool, tool_path, sanitized_args, error = _validate_command(command)
+    if error:
+        return error
+
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            tool_path, *sanitized_args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+    except FileNotFoundError as fnf:
+        return {"ok": False, "error": "executable not found", "details": str(fnf)}
+    except Exception as e:
+        return {"ok": False, "error": "exception", "details": str(e)}
+
+    timeout = TIMEOUTS.get(tool, 120)
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        stdout, stderr = await proc.communicate()
+        return {
+            "ok": False,
+            "error": "timeout",
+            "details": f"Command timed out after {timeout} seconds",
+            "stdout": stdout.decode(errors="replace")[:MAX_OUTPUT],
+            "stderr": stderr.decode(errors="replace")[:MAX_OUTPUT],
+        }
+    except asyncio.CancelledError:
+        proc.kill()
+        await proc.wait()
+        raise
+
+    return {
+        "ok": True,
+        "tool": tool,
+        "returncode": proc.returncode,
+        "stdout": stdout.decode(errors="replace")[:MAX_OUTPUT],
+        "stderr": stderr.decode(errors="replace")[:MAX_OUTPUT],
+    }
@@ -1,6 +1,9 @@
+import os
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from authlib.integrations.flask_client import OAuth
 
-limiter = Limiter(key_func=get_remote_address)
+# Shared with the LLM token governor (ai/llm/governor.py); use redis:// in
+# production so every gunicorn worker sees the same counters.
+limiter = Limiter(key_func=get_remote_address, storage_uri=os.getenv("RATELIMIT_STORAGE_URI", "memory://"))
 oauth = OAuth()
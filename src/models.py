@@ -1,4 +1,5 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import validates
 from datetime import datetime, timezone
 import json
 from flask_login import UserMixin
@@ -22,6 +23,8 @@ class User(db.Model, UserMixin):
     password_hash = db.Column(db.String(256), nullable=True) # Now nullable
     google_id = db.Column(db.String(128), unique=True, nullable=True)
     profile_pic = db.Column(db.String(512), nullable=True)
+    # Naik setiap findings/port state user berubah; marker murah untuk cache analytics
+    findings_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     def set_password(self, password):
         if password:
@@ -32,10 +35,22 @@ class User(db.Model, UserMixin):
             return False
         return check_password_hash(self.password_hash, password)
 
+    @staticmethod
+    def bump_findings_version(user_id):
+        """Increment atomik di SQL (aman antar worker); tanpa commit."""
+        if user_id:
+            db.session.query(User).filter(User.id == user_id).update(
+                {User.findings_version: User.findings_version + 1}, synchronize_session=False)
+
 
 class ChatSession(db.Model):
     """Model untuk mengelompokkan scan dalam satu sesi percakapan."""
     __tablename__ = "chat_session"
+    __table_args__ = (
+        # Keyset pagination list sesi (updated_at, id) per pemilik
+        db.Index('ix_chat_session_user_updated', 'user_id', 'updated_at'),
+        db.Index('ix_chat_session_anon_updated', 'anon_id', 'updated_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True) # Nullable for guest
@@ -44,10 +59,16 @@ class ChatSession(db.Model):
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
 
+    # Rolling summary of turns that fell out of the chat context window
+    summary = db.Column(db.Text, nullable=True)
+    summary_upto_id = db.Column(db.Integer, nullable=True) # Last ChatMessage.id folded into summary
+
     # Relationship to scans
     scans = db.relationship('ScanHistory', backref='session', lazy=True, cascade="all, delete-orphan")
     # Relationship to messages
     messages = db.relationship('ChatMessage', backref='session', lazy=True, cascade="all, delete-orphan")
+    # Relationship to retrieval documents
+    finding_documents = db.relationship('FindingDocument', lazy=True, cascade="all, delete-orphan")
 
     def to_dict(self):
         return {
@@ -61,6 +82,9 @@ class ChatSession(db.Model):
 class ChatMessage(db.Model):
     """Model untuk menyimpan pesan chat (non-scan) per sesi."""
     __tablename__ = "chat_message"
+    __table_args__ = (
+        db.Index('ix_chat_message_session_created', 'session_id', 'created_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.Integer, db.ForeignKey('chat_session.id'), nullable=False)
@@ -69,12 +93,17 @@ class ChatMessage(db.Model):
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
 
     def to_dict(self):
+        return ChatMessage.message_dict(self)
+
+    @staticmethod
+    def message_dict(row):
+        """Dict pesan dari instance atau row hasil query kolom (timeline UNION ALL)."""
         return {
             "type": "message",
-            "id": self.id,
-            "role": self.role,
-            "content": self.content,
-            "timestamp": self.created_at.isoformat()
+            "id": row.id,
+            "role": row.role,
+            "content": row.content,
+            "timestamp": row.created_at.isoformat()
         }
 
 
@@ -82,6 +111,11 @@ class ScanHistory(db.Model):
     """Model untuk menyimpan history scanning."""
     
     __tablename__ = "scan_history"
+    __table_args__ = (
+        # Keyset pagination history per user dan timeline per sesi
+        db.Index('ix_scan_history_user_created', 'user_id', 'created_at'),
+        db.Index('ix_scan_history_session_created', 'session_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True) # Nullable for guest
@@ -96,14 +130,52 @@ class ScanHistory(db.Model):
     stdout_path = db.Column(db.String(500), nullable=True)
     stderr_path = db.Column(db.String(500), nullable=True)
 
-    # Fields for results
-    execution_result = db.Column(db.Text)  # JSON string
-    analysis_result = db.Column(db.Text)   # JSON string
+    # Fields for results. Blob JSON (bisa puluhan MB) deferred: hanya dimuat saat diakses (detail endpoint)
+    execution_result = db.deferred(db.Column(db.Text))  # JSON string
+    analysis_result = db.deferred(db.Column(db.Text))   # JSON string
+    summary = db.Column(db.Text)  # analysis["summary"], disalin saat analysis_result di-set
     risk_level = db.Column(db.String(20), index=True)
     rationale = db.Column(db.Text) # New field to store AI's explanation for choosing the tool/command
+    # State speculative planning (JSON): pending -> ready/failed (AI selesai) -> done (direkonsiliasi).
+    # Disimpan di row supaya worker mana pun yang melayani poll bisa merekonsiliasi.
+    speculation = db.deferred(db.Column(db.Text))
     
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), index=True)
     start_time = db.Column(db.DateTime, nullable=True)
+
+    finding_documents = db.relationship('FindingDocument', lazy=True, cascade="all, delete-orphan")
+    findings = db.relationship('Finding', lazy=True, cascade="all, delete-orphan")
+
+    # Kolom untuk list/timeline; dipakai dengan load_only() sehingga blob tidak pernah di-SELECT
+    SUMMARY_COLUMNS = ("id", "session_id", "target", "tool", "command", "status", "risk_level",
+                       "summary", "rationale", "created_at")
+
+    @validates("analysis_result")
+    def _copy_summary(self, key, value):
+        analysis = _safe_json_loads(value)
+        self.summary = analysis.get("summary") if isinstance(analysis, dict) else None
+        return value
+
+    def to_summary(self):
+        """Proyeksi ringan tanpa execution/analysis; aman dipanggil pada query load_only(SUMMARY_COLUMNS)."""
+        return ScanHistory.summary_dict(self)
+
+    @staticmethod
+    def summary_dict(row):
+        """Ringkasan scan dari instance atau row yang memuat SUMMARY_COLUMNS."""
+        return {
+            "type": "scan",
+            "id": row.id,
+            "session_id": row.session_id,
+            "target": row.target,
+            "tool": row.tool,
+            "command": _safe_json_loads(row.command),
+            "status": row.status,
+            "risk_level": row.risk_level,
+            "summary": row.summary,
+            "rationale": row.rationale,
+            "created_at": row.created_at.isoformat() if row.created_at else None
+        }
     
     def to_dict(self):
         """Convert model ke dictionary."""
@@ -123,4 +195,99 @@ class ScanHistory(db.Model):
         }
     
     def __repr__(self):
-        return f"<ScanHistory {self.id}: {self.target} ({self.tool})>"
\ No newline at end of file
+        return f"<ScanHistory {self.id}: {self.target} ({self.tool})>"
+
+
+class FindingDocument(db.Model):
+    """Dokumen finding ternormalisasi per scan, dipakai untuk retrieval di chat."""
+    __tablename__ = "finding_document"
+
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, db.ForeignKey('chat_session.id', ondelete='CASCADE'), nullable=False, index=True)
+    scan_id = db.Column(db.Integer, db.ForeignKey('scan_history.id', ondelete='CASCADE'), nullable=False, index=True)
+    content = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+
+class Finding(db.Model):
+    """Finding ternormalisasi (satu baris per service/item/path) dari structured parser, diisi sekali per scan."""
+    __tablename__ = "finding"
+    __table_args__ = (
+        db.Index('ix_finding_product_version', 'product', 'version'),
+        db.Index('ix_finding_host_port', 'host', 'port'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    scan_id = db.Column(db.Integer, db.ForeignKey('scan_history.id', ondelete='CASCADE'), nullable=False, index=True)
+    host = db.Column(db.String(255), nullable=True)
+    port = db.Column(db.Integer, nullable=True)
+    proto = db.Column(db.String(10), nullable=True)
+    service = db.Column(db.String(100), nullable=True, index=True)
+    product = db.Column(db.String(200), nullable=True)
+    version = db.Column(db.String(100), nullable=True)
+    path = db.Column(db.String(1000), nullable=True)
+    status = db.Column(db.Integer, nullable=True)
+    cve = db.Column(db.String(30), nullable=True, index=True)
+    severity = db.Column(db.String(20), nullable=False, default='info', index=True)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "scan_id": self.scan_id,
+            "host": self.host,
+            "port": self.port,
+            "proto": self.proto,
+            "service": self.service,
+            "product": self.product,
+            "version": self.version,
+            "path": self.path,
+            "status": self.status,
+            "cve": self.cve,
+            "severity": self.severity
+        }
+
+
+class Asset(db.Model):
+    """
+    State terakhir yang diketahui per host milik user, di-update incremental setiap scan selesai.
+    IP disimpan sebagai integer supaya query CIDR cukup range scan di index:
+    IPv4 di `ipv4`, IPv6 dipecah jadi dua kolom 64-bit (`ipv6_hi`, `ipv6_lo`, offset -2^63 agar urutan tetap).
+    """
+    __tablename__ = "asset"
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'address', name='uq_asset_user_address'),
+        db.Index('ix_asset_user_ipv4', 'user_id', 'ipv4'),
+        db.Index('ix_asset_user_ipv6', 'user_id', 'ipv6_hi', 'ipv6_lo'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    address = db.Column(db.String(255), nullable=False) # IP kanonik, atau hostname jika IP belum diketahui
+    ip_version = db.Column(db.Integer, nullable=True)
+    ipv4 = db.Column(db.BigInteger, nullable=True)
+    ipv6_hi = db.Column(db.BigInteger, nullable=True)
+    ipv6_lo = db.Column(db.BigInteger, nullable=True)
+    hostnames = db.Column(db.Text, nullable=True) # JSON list of aliases
+    status = db.Column(db.String(20), nullable=True)
+    open_ports = db.Column(db.Text, nullable=True) # JSON list of {port, proto, service, product, version}
+    risk_level = db.Column(db.String(20), nullable=True, index=True)
+    risk_scores = db.Column(db.Text, nullable=True) # JSON {tool: skor finding scan terbaru tool itu}
+    last_scan_id = db.Column(db.Integer, db.ForeignKey('scan_history.id', ondelete='SET NULL'), nullable=True)
+    # Scan terakhir yang melaporkan state port host ini (nmap), termasuk nol port terbuka
+    ports_scan_id = db.Column(db.Integer, db.ForeignKey('scan_history.id', ondelete='SET NULL'), nullable=True)
+    first_seen = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    last_seen = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), index=True)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "address": self.address,
+            "ip_version": self.ip_version,
+            "hostnames": _safe_json_loads(self.hostnames) or [],
+            "status": self.status,
+            "open_ports": _safe_json_loads(self.open_ports) or [],
+            "risk_level": self.risk_level,
+            "last_scan_id": self.last_scan_id,
+            "first_seen": self.first_seen.isoformat() if self.first_seen else None,
+            "last_seen": self.last_seen.isoformat() if self.last_seen else None
+        }
@@ -0,0 +1,87 @@
+from flask import Blueprint, request, jsonify
+from flask_login import login_required, current_user
+from models import db, User, Asset, Finding, ScanHistory
+from ai.analytics import ExposureMatrix, BUCKET_SECONDS, DEFAULT_OUTLIER_Z
+import threading
+
+analytics_bp = Blueprint("analytics", __name__)
+
+MAX_TREND_PERIODS = 104
+MAX_TOP_LIMIT = 200
+# Matrix per (user, by) di-cache sampai User.findings_version naik (scan selesai/terhapus)
+_CACHE_SIZE = 64
+_matrix_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _service_rows(user_id: int):
+    """Baris service (tanpa path) milik user; hanya kolom yang dibutuhkan matrix."""
+    return (
+        db.session.query(Finding.host, Finding.port, Finding.proto, Finding.service, ScanHistory.created_at)
+        .join(ScanHistory, ScanHistory.id == Finding.scan_id)
+        .filter(ScanHistory.user_id == user_id, Finding.port.isnot(None), Finding.path.is_(None),
+                Finding.host.isnot(None))
+        .yield_per(10000)
+    )
+
+
+def _port_scans(user_id: int):
+    """(host, waktu) scan completed terbaru yang melaporkan state port tiap asset, termasuk nol port terbuka."""
+    return (
+        db.session.query(Asset.address, ScanHistory.created_at)
+        .join(ScanHistory, ScanHistory.id == Asset.ports_scan_id)
+        .filter(Asset.user_id == user_id, ScanHistory.status.in_(("completed", "partial")))
+        .yield_per(10000)
+    )
+
+
+def exposure_matrix(user_id: int, by: str = "service") -> ExposureMatrix:
+    # Lookup primary key; tidak ada join/aggregate atas seluruh findings per request
+    stamp = db.session.query(User.findings_version).filter(User.id == user_id).scalar()
+    key = (user_id, by)
+    cached = _matrix_cache.get(key)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    matrix = ExposureMatrix(_service_rows(user_id), by=by, port_scans=_port_scans(user_id))
+    with _cache_lock:
+        if len(_matrix_cache) >= _CACHE_SIZE:
+            _matrix_cache.pop(next(iter(_matrix_cache)))
+        _matrix_cache[key] = (stamp, matrix)
+    return matrix
+
+
+def _by_param():
+    return "port" if request.args.get("by") == "port" else "service"
+
+
+@analytics_bp.route("/analytics/exposure", methods=["GET"])
+@login_required
+def exposure():
+    """Service (atau port/proto dengan by=port) yang paling banyak terbuka di state terbaru tiap host."""
+    limit = min(request.args.get("limit", 20, type=int), MAX_TOP_LIMIT)
+    matrix = exposure_matrix(current_user.id, _by_param())
+    return jsonify({"hosts": len(matrix.hosts), "top": matrix.exposure(limit=limit)})
+
+
+@analytics_bp.route("/analytics/trends", methods=["GET"])
+@login_required
+def trends():
+    """Host distinct per service per bucket (day|week|month). services=ssh,http untuk memilih series."""
+    bucket = request.args.get("bucket", "week")
+    if bucket not in BUCKET_SECONDS:
+        return jsonify({"error": f"bucket must be one of {', '.join(BUCKET_SECONDS)}"}), 400
+    periods = max(1, min(request.args.get("periods", 12, type=int), MAX_TREND_PERIODS))
+    labels = [label for label in request.args.get("services", "").split(",") if label]
+    matrix = exposure_matrix(current_user.id, _by_param())
+    return jsonify(matrix.trends(bucket=bucket, periods=periods, labels=labels or None))
+
+
+@analytics_bp.route("/analytics/outliers", methods=["GET"])
+@login_required
+def outliers():
+    """Host dengan jumlah service terbuka tidak wajar (z-score) dan service langka."""
+    z = request.args.get("z", DEFAULT_OUTLIER_Z, type=float)
+    limit = min(request.args.get("limit", 50, type=int), MAX_TOP_LIMIT)
+    matrix = exposure_matrix(current_user.id, _by_param())
+    return jsonify(matrix.outliers(z=z, limit=limit))
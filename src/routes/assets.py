@@ -0,0 +1,46 @@
+from flask import Blueprint, request, jsonify
+from flask_login import login_required, current_user
+from models import db, Asset
+from ai.assets import cidr_filter
+import ipaddress
+import json
+
+assets_bp = Blueprint("assets", __name__)
+
+MAX_ASSETS_PER_PAGE = 5000
+
+
+def _like_escape(value: str) -> str:
+    """Escape wildcard LIKE (`%`, `_`) dan escape char-nya sendiri."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+@assets_bp.route("/assets", methods=["GET"])
+@login_required
+def list_assets():
+    """
+    Inventory asset user. Filter:
+      cidr=10.2.0.0/16 atau 2001:db8::/48  (range query di kolom integer IP)
+      hostname=example.com                 (alias hostname)
+    """
+    limit = max(1, min(request.args.get("limit", 500, type=int), MAX_ASSETS_PER_PAGE))
+    query = Asset.query.filter(Asset.user_id == current_user.id)
+
+    cidr = request.args.get("cidr")
+    if cidr:
+        try:
+            network = ipaddress.ip_network(cidr, strict=False)
+        except ValueError:
+            return jsonify({"error": "Invalid CIDR"}), 400
+        query = query.filter(cidr_filter(network)).order_by(Asset.ipv4, Asset.ipv6_hi, Asset.ipv6_lo)
+    else:
+        query = query.order_by(Asset.last_seen.desc())
+
+    hostname = (request.args.get("hostname") or "").strip().lower()
+    if hostname:
+        # Alias disimpan lowercase sebagai JSON list: cocokkan token JSON utuh, bukan substring
+        alias = _like_escape(json.dumps(hostname))
+        query = query.filter(db.or_(Asset.address == hostname, Asset.hostnames.like(f"%{alias}%", escape="\\")))
+
+    assets = query.limit(limit).all()
+    return jsonify({"assets": [asset.to_dict() for asset in assets], "count": len(assets)})
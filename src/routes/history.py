@@ -1,20 +1,28 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
-from models import db, ScanHistory
+from models import db, User, ScanHistory, Finding
 from sqlalchemy import desc
+from sqlalchemy.orm import load_only
+from ai.findings import FINDING_FIELDS, diff_findings
+from routes.pagination import keyset_page, page_size, approximate_total, wants_total
 
 history_bp = Blueprint("history", __name__)
 
 @history_bp.route("/scans", methods=["GET"])
 @login_required
 def list_scans():
-    """List semua scan history dengan pagination."""
-    page = request.args.get("page", 1, type=int)
-    per_page = request.args.get("per_page", 20, type=int)
+    """
+    List scan history (terbaru dulu) dengan keyset pagination: kirim `next_cursor`
+    sebagai `cursor` untuk halaman berikutnya. Hanya ringkasan; execution/analysis
+    ada di GET /scans/<id>. `include_total=1` menambahkan total (di-cache, approximate).
+    """
+    limit = page_size()
     tool_filter = request.args.get("tool", None)
     risk_filter = request.args.get("risk", None)
     
-    query = ScanHistory.query.filter_by(user_id=current_user.id)
+    query = ScanHistory.query.filter_by(user_id=current_user.id).options(
+        load_only(*(getattr(ScanHistory, name) for name in ScanHistory.SUMMARY_COLUMNS))
+    )
     
     # Filters
     if tool_filter:
@@ -22,20 +30,22 @@ def list_scans():
     if risk_filter:
         query = query.filter(ScanHistory.risk_level == risk_filter)
     
-    # Pagination
-    pagination = query.order_by(desc(ScanHistory.created_at)).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
-    
-    scans = [scan.to_dict() for scan in pagination.items]
+    # Pagination (index ix_scan_history_user_created)
+    try:
+        scans, next_cursor = keyset_page(query, ScanHistory.created_at, ScanHistory.id,
+                                         request.args.get("cursor"), limit)
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
     
-    return jsonify({
-        "scans": scans,
-        "total": pagination.total,
-        "page": page,
-        "per_page": per_page,
-        "pages": pagination.pages
-    })
+    response = {
+        "scans": [scan.to_summary() for scan in scans],
+        "per_page": limit,
+        "next_cursor": next_cursor
+    }
+    if wants_total():
+        response["total"] = approximate_total(("scans", current_user.id, tool_filter, risk_filter),
+                                              query, ScanHistory.id)
+    return jsonify(response)
 
 @history_bp.route("/scans/<int:scan_id>", methods=["GET"])
 @login_required
@@ -50,5 +60,62 @@ def delete_scan(scan_id):
     """Delete scan tertentu."""
     scan = ScanHistory.query.filter_by(id=scan_id, user_id=current_user.id).first_or_404()
     db.session.delete(scan)
+    User.bump_findings_version(current_user.id)
     db.session.commit()
-    return jsonify({"message": "Scan deleted successfully"})
\ No newline at end of file
+    return jsonify({"message": "Scan deleted successfully"})
+
+
+def _scan_summary(scan):
+    return {
+        "id": scan.id,
+        "tool": scan.tool,
+        "risk_level": scan.risk_level,
+        "created_at": scan.created_at.isoformat() if scan.created_at else None
+    }
+
+
+@history_bp.route("/targets/<path:target>/diff", methods=["GET"])
+@login_required
+def diff_target(target):
+    """
+    Diff finding ternormalisasi antara dua scan completed untuk target yang sama.
+    Default: `to` = scan terbaru, `from` = scan sebelumnya dengan tool yang sama.
+    """
+    from_id = request.args.get("from", None, type=int)
+    to_id = request.args.get("to", None, type=int)
+
+    scans = ScanHistory.query.filter_by(user_id=current_user.id, target=target, status="completed")
+
+    to_scan = scans.filter_by(id=to_id).first() if to_id else scans.order_by(desc(ScanHistory.created_at)).first()
+    if to_scan is None:
+        return jsonify({"error": "Scan not found for target"}), 404
+
+    if from_id:
+        from_scan = scans.filter_by(id=from_id).first()
+    else:
+        from_scan = scans.filter(
+            ScanHistory.tool == to_scan.tool,
+            ScanHistory.created_at < to_scan.created_at
+        ).order_by(desc(ScanHistory.created_at)).first()
+    if from_scan is None:
+        return jsonify({"error": "No earlier scan to compare with"}), 404
+    if from_scan.id == to_scan.id:
+        return jsonify({"error": "'from' and 'to' must be different scans"}), 400
+    # Tool lain melihat permukaan lain; selisihnya akan terbaca sebagai perubahan palsu
+    if from_scan.tool != to_scan.tool:
+        return jsonify({"error": "'from' and 'to' must be scans with the same tool"}), 400
+
+    # Satu query terindeks (ix_finding_scan_id) untuk kedua scan, tanpa re-parse output
+    columns = [getattr(Finding, field) for field in FINDING_FIELDS]
+    rows = {from_scan.id: [], to_scan.id: []}
+    for row in db.session.query(Finding.scan_id, *columns).filter(Finding.scan_id.in_(list(rows))):
+        finding = dict(row._mapping)
+        rows[finding.pop("scan_id")].append(finding)
+
+    diff = diff_findings(rows[from_scan.id], rows[to_scan.id])
+    return jsonify({
+        "target": target,
+        "from": _scan_summary(from_scan),
+        "to": _scan_summary(to_scan),
+        **diff
+    })
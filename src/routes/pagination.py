@@ -0,0 +1,98 @@
+"""
+Keyset (cursor) pagination untuk list yang diurutkan berdasarkan (timestamp, id).
+
+Cursor adalah string opaque berisi timestamp + id (+ rank tipe untuk timeline
+gabungan) dari item terakhir di halaman. Halaman berikutnya difilter
+`(timestamp, id) < cursor` dan memakai index komposit, sehingga halaman ke-1000
+sama cepatnya dengan halaman pertama (tanpa OFFSET, tanpa COUNT per halaman).
+"""
+import base64
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Optional, Tuple
+
+from flask import request
+from models import db
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+TOTAL_CACHE_TTL = int(os.getenv("PAGINATION_TOTAL_CACHE_TTL", 60))
+_TOTAL_CACHE_SIZE = 1024
+
+_total_cache = {}
+_total_lock = threading.Lock()
+
+
+def encode_cursor(timestamp: datetime, row_id: int, rank: int = 0) -> str:
+    raw = f"{timestamp.isoformat()}|{row_id}|{rank}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int, int]]:
+    """Cursor -> (timestamp, id, rank); None jika tidak ada. ValueError jika rusak."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, row_id, rank = raw.split("|")
+        return datetime.fromisoformat(timestamp), int(row_id), int(rank)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def page_size(default: int = DEFAULT_PAGE_SIZE) -> int:
+    """`limit` (atau `per_page` lama) dari query string, dibatasi MAX_PAGE_SIZE."""
+    size = request.args.get("limit", request.args.get("per_page", default, type=int), type=int)
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def keyset_filter(time_col, id_col, cursor: Tuple[datetime, int, int], rank: int = 0):
+    """
+    Baris yang urut sesudah cursor pada urutan (time, rank, id) DESC.
+    `rank` membedakan tabel di timeline gabungan; untuk list biasa selalu 0.
+    """
+    timestamp, row_id, cursor_rank = cursor
+    if rank < cursor_rank:
+        return time_col <= timestamp
+    if rank > cursor_rank:
+        return time_col < timestamp
+    return db.or_(time_col < timestamp, db.and_(time_col == timestamp, id_col < row_id))
+
+
+def keyset_page(query, time_col, id_col, cursor: Optional[str], limit: int):
+    """
+    Satu halaman (terbaru dulu) dari query. Returns (rows, next_cursor).
+    ValueError jika cursor tidak valid.
+    """
+    position = decode_cursor(cursor)
+    if position is not None:
+        query = query.filter(keyset_filter(time_col, id_col, position))
+    rows = query.order_by(time_col.desc(), id_col.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, time_col.key), getattr(last, id_col.key))
+
+
+def approximate_total(key, query, id_col) -> int:
+    """
+    COUNT untuk query, di-cache TOTAL_CACHE_TTL detik per `key`.
+    Bisa sedikit tertinggal dari data terbaru; hanya dihitung jika diminta (include_total=1).
+    """
+    now = time.monotonic()
+    cached = _total_cache.get(key)
+    if cached and now - cached[0] < TOTAL_CACHE_TTL:
+        return cached[1]
+    total = query.order_by(None).with_entities(db.func.count(id_col)).scalar()
+    with _total_lock:
+        if len(_total_cache) >= _TOTAL_CACHE_SIZE:
+            _total_cache.clear()
+        _total_cache[key] = (now, total)
+    return total
+
+
+def wants_total() -> bool:
+    return request.args.get("include_total", "").lower() in ("1", "true", "yes")
@@ -1,12 +1,20 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, session, current_app
 from flask_login import current_user
-from ai.planner import plan_scan
+from ai.planner import (
+    plan_scan, plan_scan_rule_based, needs_ai_plan, should_speculate, submit_ai_plan, compare_plans
+)
 from ai.analyzer import analyze_output
+from ai.analyzer.structured_parser import extract_structured_data_from_files
+from ai.retrieval import findings_to_documents
+from ai.findings import FINDING_FIELDS, normalize_findings, normalize_nmap_host
+from ai.risk import score_findings
+from ai.assets import nmap_host_state, record_scan_assets
 from executor.runner import run_command_async, check_reachability, normalize_target
-from models import db, ScanHistory, ChatSession
+from models import db, User, ScanHistory, ChatSession, FindingDocument, Finding
 import json
 import psutil
 import os
+import time
 from datetime import datetime, timezone # Import datetime and timezone
 from executor.runner import TIMEOUTS # Import TIMEOUTS dictionary
 import uuid
@@ -15,6 +23,14 @@ WORDLISTS_DIR = "data/wordlists"
 UPLOAD_WORDLISTS_DIR = os.path.join(WORDLISTS_DIR, "uploads")
 DEFAULT_WORDLIST = os.path.join(WORDLISTS_DIR, "default_common.txt")
 
+# Speculative planning: start the rule-based scan while the AI planner thinks
+SPECULATIVE_PLANNING = os.getenv("PLANNER_SPECULATIVE", "true").lower() == "true"
+SPECULATIVE_AI_TIMEOUT = float(os.getenv("PLANNER_SPECULATIVE_TIMEOUT", 30))
+
+# Structured data di-parse streaming dari file; hanya ekor output ini yang dimuat ke memory
+# (raw-text fallback untuk LLM dan execution_result yang disimpan)
+RAW_OUTPUT_TAIL_BYTES = int(os.getenv("SCAN_RAW_OUTPUT_TAIL_BYTES", 256 * 1024))
+
 # Ensure directories exist
 os.makedirs(UPLOAD_WORDLISTS_DIR, exist_ok=True)
 
@@ -90,50 +106,76 @@ def start_scan():
 
     # 2. Planning (Adaptive)
     history_context = ""
+    prior_scans = []
     if chat_session:
         # Pull last 3 scans for context
         prev_scans = ScanHistory.query.filter_by(session_id=chat_session.id).order_by(ScanHistory.created_at.desc()).limit(3).all()
         for ps in prev_scans:
             history_context += f"- Tool: {ps.tool}, Status: {ps.status}, Risk: {ps.risk_level}\n"
+            prior_scans.append({"target": ps.target, "tool": ps.tool, "status": ps.status, "risk_level": ps.risk_level,
+                                "command": _safe_json(ps.command)})
 
     try:
-        plan = plan_scan(target, use_ai=use_ai, tool=tool, history=history_context, deep_scan=deep_scan)
-        
-        # 2.5 Wordlist Injection / Handling
-        if plan.get("tool") == "gobuster":
-            custom_wordlist_content = data.get("custom_wordlist")
-            command = plan.get("command", [])
-            
-            # If user provided raw wordlist content, save it
-            if custom_wordlist_content:
-                filename = f"custom_{uuid.uuid4().hex[:8]}.txt"
-                filepath = os.path.join(UPLOAD_WORDLISTS_DIR, filename)
-                with open(filepath, "w") as f:
-                    f.write(custom_wordlist_content)
-                
-                # Replace or Add -w argument
-                if "-w" in command:
-                    idx = command.index("-w")
-                    if idx + 1 < len(command):
-                        command[idx + 1] = filepath
-                else:
-                    command.extend(["-w", filepath])
-            
-            # Ensure -w exists even if not provided by AI, fallback to default
-            if "-w" not in command:
-                command.extend(["-w", DEFAULT_WORDLIST])
-            
-            plan["command"] = command
+        # 2.1 Speculative mode: start the rule-based scan now, ask the AI in parallel
+        rule_plan = plan_scan_rule_based(target, forced_tool=tool, deep_scan=deep_scan, prior_scans=prior_scans)
+        speculative = use_ai and data.get("speculative", SPECULATIVE_PLANNING)
+        if speculative and needs_ai_plan(rule_plan) and should_speculate(target, rule_plan, prior_scans):
+            return _start_speculative_scan(target, tool, deep_scan, history_context, rule_plan, data, user_id, chat_session)
+
+        plan = plan_scan(target, use_ai=use_ai, tool=tool, history=history_context, deep_scan=deep_scan, prior_scans=prior_scans)
+        _apply_wordlist(plan, data)
             
     except Exception as e:
         return jsonify({"error": f"Planner failed: {str(e)}"}), 500
 
+    new_scan, error = _launch_scan(plan, target, user_id, chat_session)
+    if error:
+        return error
+
+    # 4. Immediate Response
+    return _scan_started(new_scan, chat_session)
+
+
+def _apply_wordlist(plan, data):
+    """Wordlist Injection / Handling for gobuster plans."""
+    if plan.get("tool") != "gobuster":
+        return
+    custom_wordlist_content = data.get("custom_wordlist")
+    command = plan.get("command", [])
+    
+    # If user provided raw wordlist content, save it
+    if custom_wordlist_content:
+        filename = f"custom_{uuid.uuid4().hex[:8]}.txt"
+        filepath = os.path.join(UPLOAD_WORDLISTS_DIR, filename)
+        with open(filepath, "w") as f:
+            f.write(custom_wordlist_content)
+        
+        # Replace or Add -w argument
+        if "-w" in command:
+            idx = command.index("-w")
+            if idx + 1 < len(command):
+                command[idx + 1] = filepath
+        else:
+            command.extend(["-w", filepath])
+    
+    # Ensure -w exists even if not provided by AI, fallback to default
+    if "-w" not in command:
+        command.extend(["-w", DEFAULT_WORDLIST])
+    
+    plan["command"] = command
+
+
+def _launch_scan(plan, target, user_id, chat_session, rationale=None):
+    """
+    Creates the ScanHistory record and spawns the process.
+    Returns (scan, None) on success or (scan, error_response) on failure.
+    """
     # 3. Create initial record in DB
     new_scan = ScanHistory(
         target=target,
         tool=plan.get("tool"),
         command=json.dumps(plan.get("command")), 
-        rationale=plan.get("rationale"), # Store AI's reasoning
+        rationale=rationale or plan.get("rationale"), # Store AI's reasoning
         status='running',
         start_time=datetime.now(timezone.utc),
         user_id=user_id,
@@ -149,26 +191,219 @@ def start_scan():
             new_scan.status = 'failed'
             new_scan.analysis_result = json.dumps({"error": exec_data.get("error")})
             db.session.commit()
-            return jsonify({"error": f"Failed to start scan: {exec_data.get('error')}"}), 500
+            return new_scan, (jsonify({"error": f"Failed to start scan: {exec_data.get('error')}"}), 500)
 
         # Update record with PID and temp file paths
         new_scan.pid = exec_data["pid"]
         new_scan.stdout_path = exec_data["stdout_path"]
         new_scan.stderr_path = exec_data["stderr_path"]
         db.session.commit()
-
-        # 4. Immediate Response
-        return jsonify({
-            "message": "Scan started successfully",
-            "scan_id": new_scan.id,
-            "session_id": chat_session.id if chat_session else None
-        }), 202
+        return new_scan, None
 
     except Exception as e:
         new_scan.status = 'failed'
         new_scan.analysis_result = json.dumps({"error": str(e)})
         db.session.commit()
-        return jsonify({"error": f"Failed to execute command: {str(e)}"}), 500
+        return new_scan, (jsonify({"error": f"Failed to execute command: {str(e)}"}), 500)
+
+
+def _scan_started(scan, chat_session, **extra):
+    return jsonify({
+        "message": "Scan started successfully",
+        "scan_id": scan.id,
+        "session_id": chat_session.id if chat_session else None,
+        **extra
+    }), 202
+
+
+def _start_speculative_scan(target, tool, deep_scan, history_context, rule_plan, data, user_id, chat_session):
+    """
+    Launches the rule-based plan immediately and returns 202 without waiting
+    for the AI planner running in parallel. The pending plan lives on the
+    ScanHistory row: the planner thread stores the AI's answer there and any
+    worker serving a status poll reconciles it (see _reconcile_speculative).
+    """
+    spec_tool = rule_plan["tool"]
+    spec_scan, error = _launch_scan(
+        rule_plan, target, user_id, chat_session,
+        rationale=f"Speculative {spec_tool} scan started while the AI planner was consulted. {rule_plan['rationale']}"
+    )
+    if error:
+        return error
+
+    spec_scan.speculation = json.dumps({
+        "state": "pending",
+        "rule_plan": rule_plan,
+        "custom_wordlist": data.get("custom_wordlist"),
+        "submitted_at": time.time(),
+    })
+    db.session.commit()
+
+    future = submit_ai_plan(target, forced_tool=tool, history=history_context, deep_scan=deep_scan)
+    app, scan_id, pending = current_app._get_current_object(), spec_scan.id, spec_scan.speculation
+    future.add_done_callback(lambda f: _store_ai_plan(app, scan_id, pending, f))
+    return _scan_started(spec_scan, chat_session, speculative="pending")
+
+
+def _swap_speculation(scan_id, expected, state):
+    """Compare-and-set atas kolom speculation; False jika worker/thread lain sudah mengubahnya."""
+    result = db.session.execute(
+        db.update(ScanHistory)
+        .where(ScanHistory.id == scan_id, ScanHistory.speculation == expected)
+        .values(speculation=json.dumps(state))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def _store_ai_plan(app, scan_id, pending, future):
+    """Done-callback di thread planner: simpan jawaban AI ke row (pending -> ready/failed)."""
+    state = json.loads(pending)
+    try:
+        state.update(state="ready", ai_plan=future.result())
+    except Exception as e:
+        state.update(state="failed", error=str(e) or type(e).__name__)
+    with app.app_context():
+        # Tidak menimpa jika poll sudah memutuskan timeout lebih dulu
+        _swap_speculation(scan_id, pending, state)
+        db.session.commit()
+
+
+def _reconcile_speculative(scan):
+    """
+    Applies the AI plan stored on a speculative scan: keep the speculative
+    scan if the AI agrees, cancel it if the AI wants the same tool with
+    different flags, or keep it as extra recon and start the AI's command if
+    the AI picked another tool. Without an answer within SPECULATIVE_AI_TIMEOUT
+    the speculative plan is kept. The outcome is stored on the row, so every
+    later poll (on any worker) reports the same verdict and followup_scan_id.
+    Returns extra fields for the status response.
+    """
+    if not scan.speculation:
+        return {}
+    current = scan.speculation
+    state = json.loads(current)
+    if state["state"] == "done":
+        return {key: state[key] for key in ("speculative", "followup_scan_id") if key in state}
+    if state["state"] == "pending":
+        if time.time() - state["submitted_at"] < SPECULATIVE_AI_TIMEOUT:
+            return {"speculative": "pending"}
+        state.update(state="failed", error="timed out")
+
+    rule_plan, ai_plan = state["rule_plan"], state.get("ai_plan")
+    verdict = compare_plans(rule_plan, ai_plan) if state["state"] == "ready" else "keep"
+    if verdict == "replace" and scan.status != 'running':
+        # Scan spekulatif sudah selesai sebelum AI menjawab: hasilnya tetap dipakai
+        verdict = "extend"
+    outcome = {"state": "done", "speculative": {"agree": "kept", "keep": "kept", "replace": "cancelled"}.get(verdict, "extended")}
+
+    # Claim atomik: hanya satu poll yang menjalankan side effect (cancel / scan lanjutan)
+    if not _swap_speculation(scan.id, current, outcome):
+        db.session.rollback()
+        db.session.refresh(scan)
+        return _reconcile_speculative(scan)
+    db.session.expire(scan, ["speculation"])
+
+    spec_tool = rule_plan["tool"]
+    if verdict == "keep":
+        scan.rationale += f" AI planner unavailable ({state['error']}); speculative plan kept."
+        db.session.commit()
+        return {"speculative": "kept"}
+    if verdict == "agree":
+        scan.rationale = f"Speculative {spec_tool} scan kept: AI planner agreed. {ai_plan.get('rationale') or ''}".strip()
+        db.session.commit()
+        return {"speculative": "kept"}
+
+    if verdict == "replace":
+        _terminate_process(scan.pid)
+        scan.status = 'cancelled'
+        scan.rationale += " Cancelled: AI planner chose different flags for the same tool."
+        scan.analysis_result = json.dumps({"summary": "Speculative scan cancelled in favour of the AI plan."})
+        _cleanup_temp_files(scan)
+        spec_path = f"speculative {spec_tool} scan #{scan.id} cancelled"
+    else:
+        scan.rationale += f" Kept as extra recon: AI planner chose {ai_plan.get('tool')}."
+        spec_path = f"speculative {spec_tool} scan #{scan.id} kept as extra recon"
+    db.session.commit()
+
+    _apply_wordlist(ai_plan, {"custom_wordlist": state.get("custom_wordlist")})
+    chat_session = db.session.get(ChatSession, scan.session_id) if scan.session_id else None
+    ai_scan, _ = _launch_scan(
+        ai_plan, scan.target, scan.user_id, chat_session,
+        rationale=f"AI plan ({spec_path}). {ai_plan.get('rationale') or ''}".strip()
+    )
+    # Gagal start tercatat di ai_scan (status failed); client tetap mem-poll-nya
+    outcome["followup_scan_id"] = ai_scan.id
+    scan.speculation = json.dumps(outcome)
+    db.session.commit()
+    return {"speculative": outcome["speculative"], "followup_scan_id": ai_scan.id}
+
+
+def _previous_scan_context(scan):
+    """Analisis dan findings scan completed terakhir untuk target+tool yang sama (milik owner yang sama)."""
+    query = ScanHistory.query.filter(
+        ScanHistory.target == scan.target,
+        ScanHistory.tool == scan.tool,
+        ScanHistory.status == 'completed',
+        ScanHistory.id != scan.id,
+        ScanHistory.analysis_result.isnot(None),
+    )
+    if scan.user_id:
+        query = query.filter(ScanHistory.user_id == scan.user_id)
+    elif scan.session_id:
+        query = query.filter(ScanHistory.session_id == scan.session_id)
+    else:
+        return None
+
+    previous = query.order_by(ScanHistory.created_at.desc()).first()
+    if previous is None:
+        return None
+    columns = [getattr(Finding, field) for field in FINDING_FIELDS]
+    rows = db.session.query(*columns).filter(Finding.scan_id == previous.id).all()
+    return {
+        "scan_id": previous.id,
+        "analysis": _safe_json(previous.analysis_result),
+        "findings": [dict(row._mapping) for row in rows],
+    }
+
+
+def _safe_json(text):
+    try:
+        return json.loads(text) if text else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _store_findings(scan, structured, rows=None):
+    """
+    Bulk insert baris Finding dari structured data; dipanggil sekali saat scan selesai.
+    `rows` dipakai jika finding sudah dinormalisasi saat output di-stream.
+    """
+    if rows is None:
+        rows = normalize_findings(scan.tool, scan.target, structured)
+    if rows:
+        for row in rows:
+            row["scan_id"] = scan.id
+        db.session.execute(db.insert(Finding), rows)
+    # Scan tanpa findings tetap bisa mengubah state port (semua service tertutup)
+    User.bump_findings_version(scan.user_id)
+    return rows
+
+
+def _terminate_process(pid):
+    """Terminates a scan process, escalating to kill if it does not exit."""
+    if not pid or not psutil.pid_exists(pid):
+        return
+    try:
+        proc = psutil.Process(pid)
+        proc.terminate() # or proc.kill() if terminate fails
+        proc.wait(timeout=5) # Wait for process to terminate
+        print(f"Process {pid} terminated.")
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        print(f"Could not terminate process {pid} due to NoSuchProcess or AccessDenied.")
+    except psutil.TimeoutExpired:
+        proc.kill()
+        print(f"Process {pid} killed forcefully (terminate failed).")
 
 
 @scan_bp.route("/scans/<int:scan_id>/status", methods=["GET"])
@@ -186,39 +421,27 @@ def get_scan_status(scan_id):
     if scan.user_id is not None and scan.user_id != user_id:
         return jsonify({"error": "forbidden"}), 403
 
+    speculative = _reconcile_speculative(scan)
     if scan.status != 'running':
-        return jsonify(scan.to_dict())
+        return jsonify({**scan.to_dict(), **speculative})
 
     # Get expected timeout from runner.py
     max_timeout = TIMEOUTS.get(scan.tool, 120) # Default to 120 seconds
 
     # Check for timeout
+    timed_out_after = None
     if scan.start_time and (datetime.now(timezone.utc) - scan.start_time.replace(tzinfo=timezone.utc)).total_seconds() > max_timeout:
-        if scan.pid and psutil.pid_exists(scan.pid):
-            try:
-                proc = psutil.Process(scan.pid)
-                proc.terminate() # or proc.kill() if terminate fails
-                proc.wait(timeout=5) # Wait for process to terminate
-                print(f"Process {scan.pid} for scan {scan.id} killed due to timeout.")
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                print(f"Could not terminate process {scan.pid} for scan {scan.id} due to NoSuchProcess or AccessDenied.")
-            except psutil.TimeoutExpired:
-                proc.kill()
-                print(f"Process {scan.pid} for scan {scan.id} killed forcefully due to timeout (terminate failed).")
-        
-        scan.status = 'failed'
-        scan.analysis_result = json.dumps({"error": f"Scan timed out after {max_timeout} seconds."})
-        db.session.commit()
-        # Cleanup temp files immediately
-        _cleanup_temp_files(scan)
-        return jsonify(scan.to_dict()), 200
+        _terminate_process(scan.pid)
+        print(f"Scan {scan.id} stopped due to timeout.")
+        # Output yang sudah di-spool tetap di-parse: host/item lengkap sebelum kill disimpan sebagai hasil partial
+        timed_out_after = max_timeout
 
     # Check if the process is still running or is a zombie
-    if scan.pid:
+    elif scan.pid:
         try:
             proc = psutil.Process(scan.pid)
             if proc.is_running() and proc.status() != psutil.STATUS_ZOMBIE:
-                return jsonify({"status": "running", "target": scan.target, "tool": scan.tool})
+                return jsonify({"status": "running", "target": scan.target, "tool": scan.tool, **speculative})
             # If we reach here, PID exists, but proc.is_running() is False or it's a zombie.
             # This means the process has terminated (or is a zombie that needs reaping).
             # Proceed to process results.
@@ -231,47 +454,122 @@ def get_scan_status(scan_id):
         # This is an inconsistent state, assume finished and proceed to process results.
         pass
 
-    # --- Process is finished, let's process the results ---
+    # --- Process is finished (or killed at its timeout), let's process the results ---
     try:
-        # Read output from temp files
-        try:
-            with open(scan.stdout_path, 'r') as f:
-                stdout = f.read()
-            with open(scan.stderr_path, 'r') as f:
-                stderr = f.read()
-        except (FileNotFoundError, TypeError): # TypeError if path is None
-            stdout = ""
-            stderr = "Log files not found or path is invalid. The process may have crashed or failed to write output."
-
-        execution_result = {
-            "ok": True,
-            "tool": scan.tool,
-            "stdout": stdout,
-            "stderr": stderr
-        }
-
-        # Analysis
-        analysis = analyze_output(scan.tool, execution_result, target=scan.target)
-        
-        # New Structured Risk Level Extraction
-        risk_level = analysis.get("issue", {}).get("severity") or analysis.get("risk") or analysis.get("risk_level") or "unknown"
-        
-        # Update Database
-        scan.status = 'completed'
-        scan.execution_result = json.dumps(execution_result)
-        scan.analysis_result = json.dumps(analysis)
-        scan.risk_level = risk_level
-        
+        _process_results(scan, timed_out_after)
         db.session.commit()
-        return jsonify(scan.to_dict())
+        return jsonify({**scan.to_dict(), **speculative})
 
     except Exception as e:
         # Handle exceptions during result processing
+        db.session.rollback()
         scan.status = 'failed'
         scan.analysis_result = json.dumps({"error": "Failed to process results", "details": str(e)})
         db.session.commit()
         return jsonify({"status": "failed", "error": str(e)}), 200
     
     finally:
-        # Cleanup temp files
-        _cleanup_temp_files(scan)
\ No newline at end of file
+        # Cleanup temp files (setelah output di-parse)
+        _cleanup_temp_files(scan)
+        db.session.commit()
+
+
+def _read_tail(path, limit=None):
+    """Paling banyak `limit` byte terakhir dari file output (dimulai di awal baris jika terpotong)."""
+    limit = limit or RAW_OUTPUT_TAIL_BYTES
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - limit))
+        data = f.read()
+    if size > limit and b"\n" in data:
+        data = data[data.index(b"\n") + 1:]
+    return data.decode('utf-8', errors='replace')
+
+
+def _parse_output(scan):
+    """
+    Parse output yang di-spool -> (structured, findings, host_states).
+
+    Host nmap diteruskan satu per satu ke normalisasi finding dan state asset saat
+    file di-stream; structured hanya menyimpan agregat dan sampel host untuk prompt.
+    findings/host_states None untuk tool lain (diturunkan dari structured).
+    """
+    if scan.tool != "nmap":
+        return extract_structured_data_from_files(scan.tool, scan.stdout_path, scan.stderr_path), None, None
+
+    findings, host_states = [], []
+
+    def on_host(host):
+        findings.extend(normalize_nmap_host(scan.target, host))
+        state = nmap_host_state(host)
+        if state:
+            host_states.append(state)
+
+    structured = extract_structured_data_from_files(scan.tool, scan.stdout_path, scan.stderr_path, on_host=on_host)
+    if not structured.get("parsed"):
+        return structured, [], None
+    return structured, findings, host_states
+
+
+def _process_results(scan, timed_out_after=None):
+    """
+    Parse output yang di-spool, analisis, dan simpan hasilnya ke scan (tanpa commit).
+
+    Structured data di-parse streaming langsung dari file; hanya ekor stdout/stderr
+    yang dibaca untuk raw-text fallback. Untuk scan yang di-kill karena timeout,
+    hasil yang ter-parse disimpan dengan status 'partial'; tanpa data yang bisa
+    dipakai, scan ditandai failed.
+    """
+    structured, findings, host_states = _parse_output(scan)
+    timeout_error = f"Scan timed out after {timed_out_after} seconds." if timed_out_after else None
+    if timeout_error and not structured.get("parsed"):
+        scan.status = 'failed'
+        scan.analysis_result = json.dumps({"error": timeout_error})
+        return
+
+    try:
+        stdout = _read_tail(scan.stdout_path)
+        stderr = _read_tail(scan.stderr_path)
+    except (FileNotFoundError, TypeError): # TypeError if path is None
+        stdout = ""
+        stderr = "Log files not found or path is invalid. The process may have crashed or failed to write output."
+
+    execution_result = {
+        "ok": True,
+        "tool": scan.tool,
+        "stdout": stdout,
+        "stderr": stderr
+    }
+    if timeout_error:
+        execution_result["timed_out"] = True
+
+    # Analysis (delta-only jika target ini sudah pernah di-scan dengan tool yang sama).
+    # Hasil partial tidak di-diff: host yang belum sempat di-scan akan terlihat seperti port tertutup.
+    analysis = analyze_output(scan.tool, execution_result, target=scan.target, structured=structured,
+                              previous=None if timeout_error else _previous_scan_context(scan),
+                              current_findings=findings)
+    if timeout_error:
+        analysis["partial"] = {"reason": timeout_error + " Results cover only what was completed before the timeout."}
+
+    # Update Database
+    scan.status = 'partial' if timeout_error else 'completed'
+    scan.execution_result = json.dumps(execution_result)
+    scan.analysis_result = json.dumps(analysis)
+
+    # Persist normalized findings (satu bulk insert per scan)
+    findings = _store_findings(scan, structured, findings)
+
+    # Risk level deterministik dari findings; severity LLM hanya fallback untuk output yang tidak ter-parse
+    if structured.get("parsed"):
+        _, scan.risk_level = score_findings(findings)
+    else:
+        scan.risk_level = analysis.get("issue", {}).get("severity") or analysis.get("risk") or analysis.get("risk_level") or "unknown"
+
+    # Update inventory asset (state terakhir per host)
+    record_scan_assets(scan, structured, findings, host_states)
+
+    # Index normalized findings for chat retrieval
+    if scan.session_id:
+        for content in findings_to_documents(scan.tool, scan.target, structured, analysis):
+            db.session.add(FindingDocument(session_id=scan.session_id, scan_id=scan.id, content=content))
@@ -1,12 +1,26 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, session, Response, stream_with_context, current_app
 from flask_login import current_user
-from models import db, ChatSession, ScanHistory, ChatMessage
+from models import db, User, ChatSession, ScanHistory, ChatMessage, FindingDocument
 from datetime import datetime, timezone
-from ai.chat import ai_chat_response
+import json
+import logging
+from ai.chat import ai_chat_response, ai_chat_response_stream, CHAT_MODEL
+from ai.chat_context import split_window, submit_summary, build_history
+from ai.retrieval import BM25Index
 from extensions import limiter
+from routes.pagination import (
+    keyset_page, keyset_filter, encode_cursor, decode_cursor, page_size, approximate_total, wants_total
+)
+
+logger = logging.getLogger(__name__)
 
 session_bp = Blueprint("session", __name__)
 
+SESSION_PAGE_SIZE = 50
+TIMELINE_PAGE_SIZE = 50
+# Urutan tie-break entri timeline dengan created_at sama
+TIMELINE_RANK = {"scan": 0, "message": 1}
+
 def get_current_user_or_guest():
     if current_user.is_authenticated:
         return current_user.id, None
@@ -35,16 +49,35 @@ def create_session():
 
 @session_bp.route("/sessions", methods=["GET"])
 def list_sessions():
+    """
+    Sesi terbaru (updated_at) dulu, keyset pagination via `cursor` / `next_cursor`.
+
+    updated_at berubah setiap ada pesan baru, jadi urutannya bisa bergeser saat
+    halaman di-walk. Ini disengaja (sidebar diurutkan menurut aktivitas terakhir):
+    sesi yang di-update setelah halamannya terlewati pindah ke atas cursor dan
+    tidak muncul lagi di walk itu, tapi juga tidak pernah muncul dua kali.
+    Walk baru dari halaman pertama selalu lengkap.
+    """
     user_id, anon_id = get_current_user_or_guest()
     if not user_id and not anon_id:
         return jsonify({"error": "Unauthorized"}), 401
         
     if user_id:
-        sessions = ChatSession.query.filter_by(user_id=user_id).order_by(ChatSession.updated_at.desc()).all()
+        query = ChatSession.query.filter_by(user_id=user_id)
     else:
-        sessions = ChatSession.query.filter_by(anon_id=anon_id).order_by(ChatSession.updated_at.desc()).all()
-        
-    return jsonify({"sessions": [s.to_dict() for s in sessions]})
+        query = ChatSession.query.filter_by(anon_id=anon_id)
+
+    limit = page_size(default=SESSION_PAGE_SIZE)
+    try:
+        sessions, next_cursor = keyset_page(query, ChatSession.updated_at, ChatSession.id,
+                                            request.args.get("cursor"), limit)
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    response = {"sessions": [s.to_dict() for s in sessions], "next_cursor": next_cursor}
+    if wants_total():
+        response["total"] = approximate_total(("sessions", user_id, anon_id), query, ChatSession.id)
+    return jsonify(response)
 
 @session_bp.route("/sessions/<int:session_id>", methods=["GET"])
 def get_session(session_id):
@@ -62,40 +95,76 @@ def get_session(session_id):
     if not chat_session:
         return jsonify({"error": "Session not found"}), 404
         
-    # Get scans associated with this session
-    scans = ScanHistory.query.filter_by(session_id=session_id).all()
-    # Get messages associated with this session
-    messages = ChatMessage.query.filter_by(session_id=session_id).all()
-    
-    # Merge and sort by creation time
-    timeline = []
-    for s in scans:
-        item = s.to_dict()
-        item['timestamp'] = item['created_at']
-        timeline.append(item)
-        
-    for m in messages:
-        timeline.append(m.to_dict())
-        
-    # Sort timeline by timestamp
-    timeline.sort(key=lambda x: x['timestamp'])
-    
+    try:
+        rows, next_cursor = _timeline_rows(session_id, request.args.get("cursor"),
+                                           page_size(default=TIMELINE_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
+
     return jsonify({
         "session": chat_session.to_dict(),
-        "timeline": timeline
+        "timeline": [_timeline_item(row) for row in rows],
+        "next_cursor": next_cursor
     })
 
-@session_bp.route("/chat", methods=["POST"])
-@limiter.limit("10 per day")
-def send_chat_message():
-    user_id, anon_id = get_current_user_or_guest()
-    if not user_id and not anon_id:
-        return jsonify({"error": "Unauthorized"}), 401
+def timeline_query(session_id, position, limit):
+    """
+    Query UNION ALL satu halaman timeline (scan + pesan), terbaru dulu.
 
-    data = request.get_json()
-    if not data or "message" not in data:
-        return jsonify({"error": "Message is required"}), 400
-        
+    Setiap cabang diurutkan dan dibatasi limit + 1 sendiri di atas index
+    (session_id, created_at) dengan keyset `position`, jadi ORDER BY/LIMIT luar
+    hanya menggabungkan paling banyak 2 * (limit + 1) baris, berapa pun panjang sesinya.
+    """
+    scan_rank, message_rank = TIMELINE_RANK["scan"], TIMELINE_RANK["message"]
+    null = db.null
+
+    # Scan hanya kolom ringkasan, tanpa blob execution/analysis
+    scans = db.select(
+        db.literal(scan_rank).label("rank"), ScanHistory.id, ScanHistory.created_at, ScanHistory.session_id,
+        ScanHistory.target, ScanHistory.tool, ScanHistory.command, ScanHistory.status, ScanHistory.risk_level,
+        ScanHistory.summary, ScanHistory.rationale,
+        null().label("role"), null().label("content"),
+    ).where(ScanHistory.session_id == session_id)
+    messages = db.select(
+        db.literal(message_rank).label("rank"), ChatMessage.id, ChatMessage.created_at, ChatMessage.session_id,
+        null(), null(), null(), null(), null(), null(), null(),
+        ChatMessage.role, ChatMessage.content,
+    ).where(ChatMessage.session_id == session_id)
+    if position is not None:
+        scans = scans.where(keyset_filter(ScanHistory.created_at, ScanHistory.id, position, scan_rank))
+        messages = messages.where(keyset_filter(ChatMessage.created_at, ChatMessage.id, position, message_rank))
+
+    scans = scans.order_by(ScanHistory.created_at.desc(), ScanHistory.id.desc()).limit(limit + 1).subquery()
+    messages = messages.order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc()).limit(limit + 1).subquery()
+    timeline = db.union_all(db.select(scans), db.select(messages)).subquery()
+    return (
+        db.select(timeline)
+        .order_by(timeline.c.created_at.desc(), timeline.c.rank.desc(), timeline.c.id.desc())
+        .limit(limit + 1)
+    )
+
+def _timeline_rows(session_id, cursor, limit):
+    """Returns (rows urut lama -> baru, next_cursor ke entri yang lebih lama)."""
+    rows = db.session.execute(timeline_query(session_id, decode_cursor(cursor), limit)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id, rows[-1].rank)
+    return rows[::-1], next_cursor
+
+def _timeline_item(row):
+    if row.rank == TIMELINE_RANK["scan"]:
+        item = ScanHistory.summary_dict(row)
+        item['timestamp'] = item['created_at']
+        return item
+    return ChatMessage.message_dict(row)
+
+def _prepare_chat_turn(user_id, anon_id, data):
+    """
+    Resolves (or creates) the chat session, saves the user's message and
+    returns (chat_session, user_msg, session_history) or (None, error_response, None).
+    """
     content = data["message"]
     session_id = data.get("session_id")
     
@@ -109,7 +178,7 @@ def send_chat_message():
         chat_session = query.first()
         
         if not chat_session:
-            return jsonify({"error": "Session not found"}), 404
+            return None, (jsonify({"error": "Session not found"}), 404), None
     else:
         # Create new session if not provided
         title = content[:30] + "..." if len(content) > 30 else content
@@ -117,35 +186,111 @@ def send_chat_message():
         db.session.add(chat_session)
         db.session.commit()
     
-    # 2. Save User Message
+    # 2. Build context (before saving, ai_chat_response appends the new message itself)
+    session_history = _session_history(chat_session)
+
+    # 3. Save User Message
     user_msg = ChatMessage(session_id=chat_session.id, role='user', content=content)
     db.session.add(user_msg)
     db.session.commit()
+    return chat_session, user_msg, session_history
+
+def _split_pending(chat_session):
+    """(to_fold, window) of the messages not yet folded into the stored summary."""
+    pending = ChatMessage.query.filter(
+        ChatMessage.session_id == chat_session.id,
+        ChatMessage.id > (chat_session.summary_upto_id or 0)
+    ).order_by(ChatMessage.created_at, ChatMessage.id).all()
+    pending = [{'id': m.id, 'role': m.role, 'content': m.content} for m in pending]
+    return split_window(pending, summary=chat_session.summary, model=CHAT_MODEL)
+
+def _session_history(chat_session):
+    """
+    Rolling context: the last turns verbatim plus the stored summary of older ones.
+    No LLM call here: turns that already left the window but are not folded yet
+    are left out of this prompt and folded after the reply (_fold_history).
+    """
+    _, window = _split_pending(chat_session)
+    return build_history(chat_session.summary, window)
+
+def _fold_history(chat_session):
+    """Fold turns that left the window into the stored summary, in the background."""
+    to_fold, _ = _split_pending(chat_session)
+    if not to_fold:
+        return
+    app = current_app._get_current_object()
+    session_id, folded_upto, upto_id = chat_session.id, chat_session.summary_upto_id, to_fold[-1]['id']
+    future = submit_summary(chat_session.summary, to_fold)
+    future.add_done_callback(lambda f: _store_summary(app, session_id, folded_upto, upto_id, f))
+
+def _store_summary(app, session_id, folded_upto, upto_id, future):
+    """Done-callback in the summary thread: save the new summary unless another fold got there first."""
+    try:
+        summary = future.result()
+    except Exception as e:
+        # Keep the old summary; the turns are retried after the next reply.
+        logger.warning(f"Chat summary update failed for session {session_id}: {str(e)}")
+        return
+    with app.app_context():
+        current = (ChatSession.summary_upto_id.is_(None) if folded_upto is None
+                   else ChatSession.summary_upto_id == folded_upto)
+        db.session.execute(
+            db.update(ChatSession)
+            .where(ChatSession.id == session_id, current)
+            # Folding is not activity: keep the session's place in the sidebar
+            .values(summary=summary, summary_upto_id=upto_id, updated_at=ChatSession.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+def _relevant_findings(chat_session, query):
+    """Top-k findings from the session's completed scans, ranked by BM25 against `query`."""
+    documents = [d.content for d in FindingDocument.query.filter_by(session_id=chat_session.id)
+                 .with_entities(FindingDocument.content).order_by(FindingDocument.id)]
+    if not documents:
+        return []
+    return BM25Index(documents).search(query)
+
+def _save_ai_message(chat_session, content):
+    ai_msg = ChatMessage(session_id=chat_session.id, role='assistant', content=content)
+    db.session.add(ai_msg)
+    
+    # Update session timestamp
+    chat_session.updated_at = datetime.now(timezone.utc)
+    db.session.commit()
+    _fold_history(chat_session)
+    return ai_msg
+
+@session_bp.route("/chat", methods=["POST"])
+@limiter.limit("10 per day")
+def send_chat_message():
+    user_id, anon_id = get_current_user_or_guest()
+    if not user_id and not anon_id:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    data = request.get_json()
+    if not data or "message" not in data:
+        return jsonify({"error": "Message is required"}), 400
+
+    chat_session, user_msg, session_history = _prepare_chat_turn(user_id, anon_id, data)
+    if chat_session is None:
+        return user_msg
     
     # 3. Call AI (Groq) with Context
     try:
-        # Fetch timeline for context
-        messages = ChatMessage.query.filter_by(session_id=chat_session.id).order_by(ChatMessage.created_at).all()
-        # Simplify context specifically for Chat
-        session_history = [{'role': m.role, 'content': m.content} for m in messages]
-        
         # Limit token usage for guests?
         # User requested "Max 500 token / request". We can pass this param or truncate context.
         # AI function doesn't accept max_token override currently, but we can update it or assume defaults.
         # For now, let's proceed.
         
-        ai_response_content = ai_chat_response(content, session_history=session_history)
+        findings = _relevant_findings(chat_session, data["message"])
+        ai_response_content = ai_chat_response(data["message"], session_history=session_history, findings=findings)
         
     except Exception as e:
          ai_response_content = f"Error processing AI response: {str(e)}"
 
     # 4. Save AI Response
-    ai_msg = ChatMessage(session_id=chat_session.id, role='assistant', content=ai_response_content)
-    db.session.add(ai_msg)
-    
-    # Update session timestamp
-    chat_session.updated_at = datetime.now(timezone.utc)
-    db.session.commit()
+    ai_msg = _save_ai_message(chat_session, ai_response_content)
     
     return jsonify({
         "session_id": chat_session.id,
@@ -153,6 +298,63 @@ def send_chat_message():
         "ai_message": ai_msg.to_dict()
     })
 
+def _sse(payload: dict) -> str:
+    return f"data: {json.dumps(payload)}\n\n"
+
+@session_bp.route("/chat/stream", methods=["POST"])
+@limiter.limit("10 per day")
+def stream_chat_message():
+    """
+    Same as /chat, but forwards tokens as Server-Sent Events while the model
+    generates them. Events are JSON objects with a `type` of
+    `start`, `token`, `done` or `error`. The assistant ChatMessage is written
+    once the stream ends; if the client disconnects mid-stream the partial
+    response is kept so the timeline matches what the user saw.
+    """
+    user_id, anon_id = get_current_user_or_guest()
+    if not user_id and not anon_id:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    data = request.get_json()
+    if not data or "message" not in data:
+        return jsonify({"error": "Message is required"}), 400
+
+    chat_session, user_msg, session_history = _prepare_chat_turn(user_id, anon_id, data)
+    if chat_session is None:
+        return user_msg
+
+    findings = _relevant_findings(chat_session, data["message"])
+
+    def generate():
+        chunks = []
+        saved = False
+        tokens = ai_chat_response_stream(data["message"], session_history=session_history, findings=findings)
+        yield _sse({"type": "start", "session_id": chat_session.id, "user_message": user_msg.to_dict()})
+        try:
+            for delta in tokens:
+                chunks.append(delta)
+                yield _sse({"type": "token", "content": delta})
+            ai_msg = _save_ai_message(chat_session, "".join(chunks))
+            saved = True
+            yield _sse({"type": "done", "session_id": chat_session.id, "ai_message": ai_msg.to_dict()})
+        except Exception as e:
+            chunks.append(f"Error communicating with AI: {str(e)}")
+            ai_msg = _save_ai_message(chat_session, "".join(chunks))
+            saved = True
+            yield _sse({"type": "error", "error": str(e), "ai_message": ai_msg.to_dict()})
+        finally:
+            # Runs on GeneratorExit too (client disconnected): stop the upstream
+            # stream and keep whatever was already sent.
+            tokens.close()
+            if not saved and chunks:
+                _save_ai_message(chat_session, "".join(chunks))
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # ============ EPHEMERAL GUEST ENDPOINT ============
 # This endpoint does NOT save anything to the database.
 # Client must send the full chat history with each request.
@@ -225,6 +427,7 @@ def delete_session(session_id):
         return jsonify({"error": "Session not found"}), 404
         
     db.session.delete(chat_session)
+    User.bump_findings_version(user_id)
     db.session.commit()
     
     return jsonify({"message": "Session deleted"})
@@ -274,6 +274,9 @@ function renderDetailedAnalysis(container, data) {
     container.innerHTML = html;
 }
 
+// Scan lanjutan dari AI planner yang sudah di-poll (followup_scan_id dilaporkan di setiap poll)
+const followedScans = new Set();
+
 // Fungsi untuk polling status scan
 async function pollScanStatus(scanId, botMessageBubble) {
     const pollInterval = setInterval(async () => {
@@ -282,7 +285,19 @@ async function pollScanStatus(scanId, botMessageBubble) {
             if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
             const data = await response.json();
 
-            if (data.status === 'completed') {
+            // Speculative scan: AI planner memulai scan lanjutan (atau mengganti scan ini)
+            if (data.followup_scan_id && !followedScans.has(data.followup_scan_id)) {
+                followedScans.add(data.followup_scan_id);
+                if (data.status === 'cancelled') {
+                    clearInterval(pollInterval);
+                    pollScanStatus(data.followup_scan_id, botMessageBubble);
+                    return;
+                }
+                pollScanStatus(data.followup_scan_id, displayMessage(`AI planner started a follow-up scan... <i class='fa-solid fa-spinner fa-spin'></i>`, 'bot'));
+            }
+
+            // 'partial': scan di-kill saat timeout, hasil yang sempat di-parse tetap dilaporkan
+            if (data.status === 'completed' || data.status === 'partial') {
                 clearInterval(pollInterval);
                 const analysis = data.analysis || {};
 
@@ -290,7 +305,7 @@ async function pollScanStatus(scanId, botMessageBubble) {
                     <div class="scan-result-container">
                         <div class="scan-summary-header">
                             <div class="status-badge completed">
-                                <i class="fa-solid fa-shield-halved"></i> Analysis Report
+                                <i class="fa-solid fa-shield-halved"></i> ${data.status === 'partial' ? 'Partial Report (timed out)' : 'Analysis Report'}
                             </div>
                             <div class="target-info">${data.target || 'N/A'}</div>
                         </div>
@@ -327,6 +342,12 @@ async function pollScanStatus(scanId, botMessageBubble) {
                 }
                 fetchSessions();
             }
+            else if (data.status === 'cancelled') {
+                // Dibatalkan oleh AI planner: scan pengganti muncul di poll berikutnya
+                if (data.speculative === 'cancelled' && !data.followup_scan_id) return;
+                clearInterval(pollInterval);
+                botMessageBubble.innerHTML = `<div class="error-message">Scan dibatalkan.</div>`;
+            }
             else if (data.status === 'failed') {
                 clearInterval(pollInterval);
                 const error = data.error || data.details || "Scan gagal karena kesalahan server.";
@@ -457,7 +478,7 @@ async function sendMessage() {
                 try {
                     const body = { message: message };
                     if (currentSessionId) body.session_id = currentSessionId;
-                    const response = await fetch('/api/v1/chat', {
+                    const response = await fetch('/api/v1/chat/stream', {
                         method: 'POST',
                         headers: { 'Content-Type': 'application/json' },
                         body: JSON.stringify(body)
@@ -467,15 +488,7 @@ async function sendMessage() {
                         return;
                     }
                     if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
-                    const data = await response.json();
-                    if (data.session_id) {
-                        currentSessionId = data.session_id;
-                        fetchSessions();
-                    }
-                    if (data.ai_message) {
-                        const cleanResponse = parseAutonomousScan(data.ai_message.content);
-                        renderMessageContent(botMessageBubble, cleanResponse);
-                    }
+                    await readChatStream(response, botMessageBubble);
                 } catch (error) {
                     console.error("Error creating chat:", error);
                     botMessageBubble.innerHTML = "Failed to communicate with AI.";
@@ -485,6 +498,42 @@ async function sendMessage() {
     }
 }
 
+// Membaca Server-Sent Events dari /api/v1/chat/stream dan render token secara bertahap
+async function readChatStream(response, botMessageBubble) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let text = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // Event SSE dipisahkan oleh baris kosong
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+
+        for (const raw of events) {
+            if (!raw.startsWith('data: ')) continue;
+            const event = JSON.parse(raw.slice(6));
+
+            if (event.type === 'start') {
+                if (event.session_id && event.session_id !== currentSessionId) {
+                    currentSessionId = event.session_id;
+                    fetchSessions();
+                }
+            } else if (event.type === 'token') {
+                text += event.content;
+                renderMessageContent(botMessageBubble, text);
+            } else if (event.type === 'done' || event.type === 'error') {
+                const finalText = event.ai_message ? event.ai_message.content : text;
+                renderMessageContent(botMessageBubble, parseAutonomousScan(finalText));
+            }
+        }
+    }
+}
+
 async function handleEnter(e) {
     if (e.key === 'Enter') {
         sendMessage();
@@ -512,7 +561,26 @@ async function startNewChat() {
     if (window.innerWidth <= 768) toggleSidebar();
 }
 
-async function fetchSessions() {
+function renderSessionItem(historyList, session) {
+    const li = document.createElement('li');
+    li.className = 'history-item';
+    if (session.id === currentSessionId) li.classList.add('active');
+
+    li.innerHTML = `
+        <div class="history-info" onclick="loadSession(${session.id})">
+            <span class="history-title">${session.title}</span>
+            <span style="font-size: 0.7em; color: var(--subtitle-color);">${new Date(session.updated_at).toLocaleDateString()}</span>
+        </div>
+        <div class="history-actions">
+            <button class="action-btn" onclick="renameSession(${session.id}, '${session.title.replace(/'/g, "\\'")}', event)"><i class="fa-solid fa-pen"></i></button>
+            <button class="action-btn" onclick="deleteSession(${session.id}, event)"><i class="fa-solid fa-trash"></i></button>
+        </div>
+    `;
+    historyList.appendChild(li);
+}
+
+// cursor null = muat ulang dari halaman pertama; selain itu halaman berikutnya ditambahkan di bawah
+async function fetchSessions(cursor = null) {
     const isGuest = typeof IS_GUEST !== 'undefined' && IS_GUEST === true;
     if (isGuest) {
         const historyList = document.getElementById('historyList');
@@ -521,33 +589,33 @@ async function fetchSessions() {
     }
 
     try {
-        const response = await fetch('/api/v1/sessions');
+        const url = cursor ? `/api/v1/sessions?cursor=${encodeURIComponent(cursor)}` : '/api/v1/sessions';
+        const response = await fetch(url);
         const data = await response.json();
         const historyList = document.getElementById('historyList');
         if (!historyList) return;
-        historyList.innerHTML = '';
+        if (cursor) {
+            historyList.querySelector('.history-load-more')?.remove();
+        } else {
+            historyList.innerHTML = '';
+        }
 
         if (data.sessions && data.sessions.length > 0) {
-            data.sessions.forEach(session => {
-                const li = document.createElement('li');
-                li.className = 'history-item';
-                if (session.id === currentSessionId) li.classList.add('active');
-
-                li.innerHTML = `
-                    <div class="history-info" onclick="loadSession(${session.id})">
-                        <span class="history-title">${session.title}</span>
-                        <span style="font-size: 0.7em; color: var(--subtitle-color);">${new Date(session.updated_at).toLocaleDateString()}</span>
-                    </div>
-                    <div class="history-actions">
-                        <button class="action-btn" onclick="renameSession(${session.id}, '${session.title.replace(/'/g, "\\'")}', event)"><i class="fa-solid fa-pen"></i></button>
-                        <button class="action-btn" onclick="deleteSession(${session.id}, event)"><i class="fa-solid fa-trash"></i></button>
-                    </div>
-                `;
-                historyList.appendChild(li);
-            });
-        } else {
+            data.sessions.forEach(session => renderSessionItem(historyList, session));
+        } else if (!cursor) {
             historyList.innerHTML = '<li class="history-item" style="cursor:default;">No conversations yet.</li>';
         }
+
+        if (data.next_cursor) {
+            const li = document.createElement('li');
+            li.className = 'history-load-more';
+            const loadMore = document.createElement('button');
+            loadMore.className = 'load-earlier-btn';
+            loadMore.textContent = 'Load more conversations';
+            loadMore.onclick = () => fetchSessions(data.next_cursor);
+            li.appendChild(loadMore);
+            historyList.appendChild(li);
+        }
     } catch (error) {
         console.error('Error fetching sessions:', error);
     }
@@ -585,6 +653,72 @@ async function deleteSession(sessionId, event) {
     }
 }
 
+let sessionTimeline = [];
+let sessionCursor = null;
+
+function renderTimelineItem(item) {
+    if (item.type === 'message') {
+        displayMessage(item.content, item.role === 'assistant' ? 'bot' : 'user');
+    } else if (item.type === 'scan') {
+        let content = '';
+        if (item.status === 'completed' || item.status === 'partial') {
+            const summary = item.summary || 'No summary available.';
+            const summaryId = `history-scan-summary-${item.id}`;
+            content = `<div class="scan-result">
+                <div class="scan-header">
+                    <i class="fa-solid fa-check-circle" style="color: var(--badge-text-completed)"></i>
+                    <strong>${item.status === 'partial' ? 'Scan Timed Out (partial results)' : 'Scan Completed'}</strong>
+                </div>
+                <div class="scan-details">
+                    <p><strong>Target:</strong> ${item.target}</p>
+                    <p><strong>Tool:</strong> ${item.tool}</p>
+                    <p><strong>Rationale:</strong> ${item.rationale || 'N/A'}</p>
+                    <details class="command-transparency">
+                        <summary>Show executed command</summary>
+                        <code>${(item.command || []).join(' ')}</code>
+                    </details>
+                    <p><strong>Risk:</strong> <span class="badge ${item.risk_level ? item.risk_level.toLowerCase() : 'unknown'}">${item.risk_level || 'Unknown'}</span></p>
+                    <div class="summary" id="${summaryId}"></div>
+                </div>
+            </div>`;
+
+            const bubble = displayMessage(content, 'bot');
+            const summaryEl = bubble.querySelector(`#${summaryId}`);
+            if (summaryEl) renderMessageContent(summaryEl, summary);
+        } else {
+            content = `<div class="error-message">Scan Failed or Pending.</div>`;
+            displayMessage(content, 'bot');
+        }
+    }
+}
+
+function renderTimeline() {
+    const chatContainer = document.getElementById('chatContainer');
+    chatContainer.innerHTML = '';
+    if (sessionCursor) {
+        // Timeline dimuat per halaman (terbaru dulu); entri lama diambil on demand
+        const loadEarlier = document.createElement('button');
+        loadEarlier.className = 'load-earlier-btn';
+        loadEarlier.textContent = 'Load earlier messages';
+        loadEarlier.onclick = loadEarlierTimeline;
+        chatContainer.appendChild(loadEarlier);
+    }
+    sessionTimeline.forEach(renderTimelineItem);
+}
+
+async function loadEarlierTimeline() {
+    if (!currentSessionId || !sessionCursor) return;
+    try {
+        const response = await fetch(`/api/v1/sessions/${currentSessionId}?cursor=${encodeURIComponent(sessionCursor)}`);
+        const data = await response.json();
+        sessionTimeline = (data.timeline || []).concat(sessionTimeline);
+        sessionCursor = data.next_cursor || null;
+        renderTimeline();
+    } catch (e) {
+        console.error("Failed to load earlier messages", e);
+    }
+}
+
 async function loadSession(sessionId) {
     currentSessionId = sessionId;
     currentTool = null;
@@ -593,48 +727,11 @@ async function loadSession(sessionId) {
     try {
         const response = await fetch(`/api/v1/sessions/${sessionId}`);
         const data = await response.json();
-        const chatContainer = document.getElementById('chatContainer');
-        chatContainer.innerHTML = '';
         fetchSessions();
 
-        if (data.timeline) {
-            data.timeline.forEach(item => {
-                if (item.type === 'message') {
-                    displayMessage(item.content, item.role === 'assistant' ? 'bot' : 'user');
-                } else if (item.type === 'scan') {
-                    let content = '';
-                    if (item.status === 'completed') {
-                        const analysis = item.analysis || {};
-                        const summary = analysis.summary || 'No summary available.';
-                        const summaryId = `history-scan-summary-${item.id}`;
-                        content = `<div class="scan-result">
-                            <div class="scan-header">
-                                <i class="fa-solid fa-check-circle" style="color: var(--badge-text-completed)"></i>
-                                <strong>Scan Completed</strong>
-                            </div>
-                            <div class="scan-details">
-                                <p><strong>Target:</strong> ${item.target}</p>
-                                <p><strong>Tool:</strong> ${item.tool}</p>
-                                <p><strong>Rationale:</strong> ${item.rationale || 'N/A'}</p>
-                                <details class="command-transparency">
-                                    <summary>Show executed command</summary>
-                                    <code>${(item.command || []).join(' ')}</code>
-                                </details>
-                                <p><strong>Risk:</strong> <span class="badge ${item.risk_level ? item.risk_level.toLowerCase() : 'unknown'}">${item.risk_level || 'Unknown'}</span></p>
-                                <div class="summary" id="${summaryId}"></div>
-                            </div>
-                        </div>`;
-
-                        const bubble = displayMessage(content, 'bot');
-                        const summaryEl = bubble.querySelector(`#${summaryId}`);
-                        if (summaryEl) renderMessageContent(summaryEl, summary);
-                    } else {
-                        content = `<div class="error-message">Scan Failed or Pending.</div>`;
-                        displayMessage(content, 'bot');
-                    }
-                }
-            });
-        }
+        sessionTimeline = data.timeline || [];
+        sessionCursor = data.next_cursor || null;
+        renderTimeline();
     } catch (e) {
         console.error("Failed to load session", e);
     }
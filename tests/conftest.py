@@ -0,0 +1,37 @@
+import pytest
+from unittest.mock import patch, MagicMock
+from app import create_app
+from models import db, User
+
+
+@pytest.fixture
+def app():
+    """
+    Flask app with an in-memory database, inside an app context.
+    """
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "RATELIMIT_ENABLED": False,
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+
+
+@pytest.fixture
+def client(app):
+    """
+    Flask test client with an in-memory database and a logged-in test user.
+    """
+    with app.test_client() as client:
+        test_user = User(username="testuser", email="test@example.com")
+        db.session.add(test_user)
+        db.session.commit()
+
+        mock_user = MagicMock()
+        mock_user.id = test_user.id
+        mock_user.is_authenticated = True
+
+        with patch('flask_login.utils._get_user', return_value=mock_user):
+            yield client
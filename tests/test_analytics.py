@@ -0,0 +1,136 @@
+import pytest
+from sqlalchemy import event
+from datetime import datetime, timedelta, timezone
+from models import db, User, ScanHistory, Finding
+from ai.analytics import ExposureMatrix
+from ai.analyzer.structured_parser import extract_structured_data
+from routes.analytics import _matrix_cache
+from ai.assets import record_scan_assets
+from routes.scan import _store_findings
+
+NOW = datetime(2026, 3, 4, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def clear_matrix_cache():
+    _matrix_cache.clear()
+
+
+def _rows():
+    old, new = NOW - timedelta(days=8), NOW - timedelta(days=1)
+    rows = [
+        # 10.0.0.1 menutup telnet di scan terbaru
+        ("10.0.0.1", 22, "tcp", "ssh", old), ("10.0.0.1", 23, "tcp", "telnet", old),
+        ("10.0.0.1", 22, "tcp", "ssh", new),
+        ("10.0.0.2", 22, "tcp", "ssh", new), ("10.0.0.2", 80, "tcp", "http", new),
+        ("10.0.0.3", 80, "tcp", "http", new),
+    ]
+    # Host dengan banyak port terbuka
+    rows += [("10.0.0.9", port, "tcp", f"svc{port}", new) for port in range(1000, 1012)]
+    rows += [(f"10.0.1.{i}", 22, "tcp", "ssh", new) for i in range(6)]
+    return rows
+
+
+def test_exposure_uses_latest_state_per_host():
+    matrix = ExposureMatrix(_rows())
+    top = {row["service"]: row["hosts"] for row in matrix.exposure(limit=50)}
+    assert top["ssh"] == 8
+    assert top["http"] == 2
+    assert "telnet" not in top
+
+    by_port = ExposureMatrix(_rows(), by="port").exposure(limit=1)
+    assert by_port == [{"port": "22/tcp", "hosts": 8, "share": round(8 / 10, 4)}]
+
+
+def test_newer_port_scan_without_open_services_clears_exposure():
+    old, new = NOW - timedelta(days=2), NOW - timedelta(days=1)
+    rows = [("10.0.0.1", 22, "tcp", "ssh", old), ("10.0.0.2", 22, "tcp", "ssh", old)]
+    matrix = ExposureMatrix(rows, port_scans=[("10.0.0.1", new), ("10.0.0.2", old), ("10.0.0.3", new)])
+    assert matrix.exposure() == [{"service": "ssh", "hosts": 1, "share": round(1 / 3, 4)}]
+
+
+def test_trends_count_distinct_hosts_per_bucket():
+    rows = _rows() + [("10.0.0.1", 22, "tcp", "ssh", NOW - timedelta(days=1, hours=1))]
+    result = ExposureMatrix(rows).trends(bucket="week", periods=3, labels=["ssh", "telnet"], now=NOW)
+    assert len(result["buckets"]) == 3
+    assert result["series"]["telnet"][-1] == 0
+    assert sum(result["series"]["telnet"]) == 1
+    assert result["series"]["ssh"][-1] == 8
+
+
+def test_outliers_flag_wide_open_host_and_rare_services():
+    result = ExposureMatrix(_rows()).outliers(z=2.0)
+    assert [host["host"] for host in result["hosts"]] == ["10.0.0.9"]
+    assert result["hosts"][0]["open"] == 12
+    rare_hosts = {row["host"] for row in result["rare"]}
+    assert "10.0.0.9" in rare_hosts
+    assert "10.0.1.0" not in rare_hosts
+
+
+def test_empty_matrix():
+    matrix = ExposureMatrix([])
+    assert matrix.exposure() == []
+    assert matrix.trends(periods=2, now=NOW)["series"] == {}
+    assert matrix.outliers()["hosts"] == []
+
+
+def test_analytics_endpoints_are_user_scoped(client):
+    user_id = User.query.first().id
+    other = User(username="other", email="other@example.com")
+    db.session.add(other)
+    db.session.commit()
+
+    for owner, host, service in ((user_id, "10.0.0.1", "ssh"), (user_id, "10.0.0.2", "ssh"), (other.id, "10.9.9.9", "ftp")):
+        scan = ScanHistory(user_id=owner, target=host, tool="nmap", command="[]", status="completed",
+                           created_at=NOW - timedelta(days=1))
+        db.session.add(scan)
+        db.session.flush()
+        db.session.add(Finding(scan_id=scan.id, host=host, port=22, proto="tcp", service=service))
+        db.session.add(Finding(scan_id=scan.id, host=host, port=80, proto="tcp", service="http", path="/admin"))
+    db.session.commit()
+
+    response = client.get("/api/v1/analytics/exposure")
+    assert response.status_code == 200
+    assert response.get_json() == {"hosts": 2, "top": [{"service": "ssh", "hosts": 2, "share": 1.0}]}
+
+    response = client.get("/api/v1/analytics/trends?bucket=day&periods=400&services=ssh,ftp")
+    data = response.get_json()
+    assert len(data["buckets"]) == 104
+    assert list(data["series"]) == ["ssh"]
+
+    assert client.get("/api/v1/analytics/trends?bucket=year").status_code == 400
+    assert client.get("/api/v1/analytics/outliers").get_json()["hosts"] == []
+
+
+def _nmap_scan(user_id, ports, created_at):
+    port_xml = "".join(
+        f'<port protocol="tcp" portid="{port}"><state state="open"/><service name="{name}"/></port>' for port, name in ports
+    )
+    xml = (f'<?xml version="1.0"?><nmaprun><host><status state="up"/><address addr="10.0.0.1" addrtype="ipv4"/>'
+           f'<ports>{port_xml}</ports></host></nmaprun>')
+    scan = ScanHistory(user_id=user_id, target="10.0.0.1", tool="nmap", command="[]", status="completed",
+                       created_at=created_at)
+    db.session.add(scan)
+    db.session.flush()
+    structured = extract_structured_data("nmap", xml)
+    record_scan_assets(scan, structured, _store_findings(scan, structured))
+    db.session.commit()
+    return scan
+
+
+def test_exposure_follows_newest_port_scan_per_host(client):
+    user_id = User.query.first().id
+    _nmap_scan(user_id, [(22, "ssh"), (80, "http")], NOW - timedelta(days=2))
+    data = client.get("/api/v1/analytics/exposure").get_json()
+    assert {row["service"] for row in data["top"]} == {"ssh", "http"}
+
+    # Scan lebih baru tanpa port terbuka: tidak ada baris finding, tetapi exposure harus turun
+    _nmap_scan(user_id, [], NOW - timedelta(days=1))
+    assert client.get("/api/v1/analytics/exposure").get_json() == {"hosts": 1, "top": []}
+
+    # Marker cache hanya lookup primary key user, tanpa aggregate atas findings
+    statements = []
+    event.listen(db.engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    client.get("/api/v1/analytics/exposure")
+    assert len(statements) == 1
+    assert "FROM user" in statements[0] and "JOIN" not in statements[0]
@@ -0,0 +1,116 @@
+import ipaddress
+from datetime import datetime, timezone
+from models import db, User, ScanHistory, Asset
+from ai.analyzer.structured_parser import extract_structured_data
+from ai.findings import normalize_findings
+from ai.assets import _create_assets, ip_columns, record_scan_assets
+
+
+def nmap_xml(hosts):
+    body = ""
+    for addr, state, ports, hostname in hosts:
+        kind = "ipv6" if ":" in addr else "ipv4"
+        names = f'<hostnames><hostname name="{hostname}" type="PTR"/></hostnames>' if hostname else ""
+        port_xml = "".join(
+            f'<port protocol="tcp" portid="{p}"><state state="open"/><service name="{name}"/></port>' for p, name in ports
+        )
+        body += f'<host><status state="{state}"/><address addr="{addr}" addrtype="{kind}"/>{names}<ports>{port_xml}</ports></host>'
+    return f'<?xml version="1.0"?><nmaprun>{body}</nmaprun>'
+
+
+def _complete_scan(user_id, target, xml, tool="nmap"):
+    scan = ScanHistory(user_id=user_id, target=target, tool=tool, command="[]", status="completed")
+    db.session.add(scan)
+    db.session.flush()
+    structured = extract_structured_data(tool, xml)
+    record_scan_assets(scan, structured, normalize_findings(tool, target, structured))
+    db.session.commit()
+    return scan
+
+
+def test_ip_columns_preserve_order():
+    assert ip_columns("example.com") == {"ip_version": None, "ipv4": None, "ipv6_hi": None, "ipv6_lo": None}
+    assert ip_columns("10.2.0.1")["ipv4"] == int(ipaddress.ip_address("10.2.0.1"))
+    ordered = ["::1", "2001:db8::1", "2001:db8::ffff", "fe80::1", "ffff::1"]
+    keys = [(ip_columns(a)["ipv6_hi"], ip_columns(a)["ipv6_lo"]) for a in ordered]
+    assert keys == sorted(keys)
+
+
+def test_assets_updated_incrementally_and_queried_by_cidr(client):
+    user_id = User.query.first().id
+    _complete_scan(user_id, "10.2.0.0/24", nmap_xml([
+        ("10.2.0.5", "up", [(22, "ssh")], "web1.internal"),
+        ("10.2.1.9", "up", [(23, "telnet")], None),
+        ("10.3.0.1", "up", [(80, "http")], None),
+        ("2001:db8::10", "up", [(443, "https")], None),
+    ]))
+    second = _complete_scan(user_id, "10.2.0.5", nmap_xml([("10.2.0.5", "up", [(22, "ssh"), (3306, "mysql")], None)]))
+
+    asset = Asset.query.filter_by(address="10.2.0.5").one()
+    assert asset.last_scan_id == second.id
+    assert [p["port"] for p in asset.to_dict()["open_ports"]] == [22, 3306]
+    assert asset.to_dict()["hostnames"] == ["web1.internal"]
+    assert Asset.query.count() == 4
+
+    data = client.get("/api/v1/assets?cidr=10.2.0.0/16").get_json()
+    assert [a["address"] for a in data["assets"]] == ["10.2.0.5", "10.2.1.9"]
+    assert data["assets"][1]["risk_level"] == "high"
+
+    assert [a["address"] for a in client.get("/api/v1/assets?cidr=2001:db8::/32").get_json()["assets"]] == ["2001:db8::10"]
+    assert [a["address"] for a in client.get("/api/v1/assets?cidr=2001:db8::10/127").get_json()["assets"]] == ["2001:db8::10"]
+    assert [a["address"] for a in client.get("/api/v1/assets?hostname=web1.internal").get_json()["assets"]] == ["10.2.0.5"]
+    assert client.get("/api/v1/assets?cidr=not-a-network").status_code == 400
+
+
+def test_hostname_filter_is_case_insensitive_and_literal(client):
+    user_id = User.query.first().id
+    _complete_scan(user_id, "10.4.0.0/24", nmap_xml([
+        ("10.4.0.1", "up", [(22, "ssh")], "Web_1.Internal"),
+        ("10.4.0.2", "up", [(22, "ssh")], "webx1.internal"),
+    ]))
+    assert Asset.query.filter_by(address="10.4.0.1").one().to_dict()["hostnames"] == ["web_1.internal"]
+
+    def addresses(hostname):
+        return [a["address"] for a in client.get(f"/api/v1/assets?hostname={hostname}").get_json()["assets"]]
+
+    assert addresses("WEB_1.internal") == ["10.4.0.1"]
+    # `_` dan `%` bukan wildcard
+    assert addresses("web%25") == []
+    assert addresses("web_1.internal") == ["10.4.0.1"]
+    assert addresses("webx1.INTERNAL") == ["10.4.0.2"]
+
+
+def test_asset_risk_combines_latest_findings_of_every_tool(client):
+    user_id = User.query.first().id
+    _complete_scan(user_id, "10.5.0.1", nmap_xml([("10.5.0.1", "up", [(22, "ssh"), (23, "telnet")], None)]))
+    assert Asset.query.one().risk_level == "high"
+
+    # Temuan gobuster yang ringan tidak menimpa risk dari port scan terakhir
+    _complete_scan(user_id, "http://10.5.0.1", "Found: /images (Status: 200)\n", tool="gobuster")
+    assert Asset.query.one().risk_level == "high"
+
+    # Port scan terbaru tanpa telnet menggantikan skor nmap sebelumnya
+    _complete_scan(user_id, "10.5.0.1", nmap_xml([("10.5.0.1", "up", [(22, "ssh")], None)]))
+    assert Asset.query.one().risk_level != "high"
+
+
+def test_concurrent_first_scan_reuses_the_winning_asset(client):
+    user_id = User.query.first().id
+    # Worker lain sudah membuat asset yang sama sejak lookup awal
+    winner = Asset(user_id=user_id, address="10.6.0.1", **ip_columns("10.6.0.1"))
+    db.session.add(winner)
+    db.session.commit()
+
+    created = _create_assets(user_id, ["10.6.0.1", "10.6.0.2"], datetime.now(timezone.utc))
+    db.session.commit()
+
+    assert created["10.6.0.1"].id == winner.id
+    assert sorted(a.address for a in Asset.query) == ["10.6.0.1", "10.6.0.2"]
+
+
+def test_list_assets_clamps_non_positive_limit(client):
+    user_id = User.query.first().id
+    _complete_scan(user_id, "10.7.0.0/30", nmap_xml([("10.7.0.1", "up", [(22, "ssh")], None),
+                                                     ("10.7.0.2", "up", [(22, "ssh")], None)]))
+    assert len(client.get("/api/v1/assets?limit=0").get_json()["assets"]) == 1
+    assert len(client.get("/api/v1/assets?limit=-1").get_json()["assets"]) == 1
@@ -0,0 +1,54 @@
+from ai.chat_context import split_window, build_history
+
+
+def _turns(n):
+    messages = []
+    for i in range(n):
+        messages.append({"id": 2 * i + 1, "role": "user", "content": f"question {i}"})
+        messages.append({"id": 2 * i + 2, "role": "assistant", "content": f"answer {i}"})
+    return messages
+
+
+def test_split_window_keeps_last_turns_verbatim():
+    """
+    Only the last N turns stay in the window; older ones are returned for folding.
+    """
+    to_fold, window = split_window(_turns(10), window_turns=3, budget=10000)
+    assert [m["id"] for m in window] == [15, 16, 17, 18, 19, 20]
+    assert [m["id"] for m in to_fold] == list(range(1, 15))
+
+
+def test_split_window_shrinks_to_token_budget():
+    """
+    Long messages push the window below N turns so summary + window fits the budget.
+    """
+    messages = _turns(3)
+    messages[2]["content"] = "x" * 4000
+    to_fold, window = split_window(messages, summary="short summary", window_turns=3, budget=200)
+    assert [m["id"] for m in to_fold] == [1, 2, 3]
+    assert [m["id"] for m in window] == [4, 5, 6]
+
+
+def test_build_history_prepends_summary():
+    history = build_history("user scanned 10.0.0.1", _turns(1))
+    assert history[0]["role"] == "system"
+    assert "10.0.0.1" in history[0]["content"]
+    assert [m["role"] for m in history[1:]] == ["user", "assistant"]
+
+
+def test_bm25_ranks_matching_findings_first():
+    """
+    Retrieval returns the findings that share terms with the question.
+    """
+    from ai.retrieval import BM25Index, findings_to_documents
+    structured = {
+        "parsed": True,
+        "hosts": [{"status": "up", "addresses": [{"addr": "10.0.0.1", "addrtype": "ipv4"}], "ports": [
+            {"port": "22", "protocol": "tcp", "state": "open", "service": {"name": "ssh", "product": "OpenSSH", "version": "7.2p2"}},
+            {"port": "3306", "protocol": "tcp", "state": "open", "service": {"name": "mysql", "product": "MySQL", "version": "5.5.62"}},
+        ]},
+    ]}
+    documents = findings_to_documents("nmap", "10.0.0.1", structured, {"summary": "Outdated services exposed."})
+    results = BM25Index(documents).search("is the openssh version vulnerable?", k=1)
+    assert len(results) == 1
+    assert "OpenSSH" in results[0]
@@ -0,0 +1,96 @@
+import json
+from unittest.mock import patch
+from models import db, ChatMessage
+
+
+def _events(response):
+    body = response.get_data(as_text=True)
+    return [json.loads(chunk[len("data: "):]) for chunk in body.split("\n\n") if chunk.startswith("data: ")]
+
+
+def test_chat_stream_forwards_tokens_and_saves_message(client):
+    """
+    Tokens are forwarded as SSE events and the full reply is stored once the stream ends.
+    """
+    with patch('routes.session.ai_chat_response_stream', side_effect=lambda *args, **kwargs: (t for t in ["Hel", "lo", "!"])):
+        response = client.post('/api/v1/chat/stream',
+                               data=json.dumps({'message': 'hi'}),
+                               content_type='application/json')
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    events = _events(response)
+    assert [e["type"] for e in events] == ["start", "token", "token", "token", "done"]
+    assert events[-1]["ai_message"]["content"] == "Hello!"
+
+    saved = ChatMessage.query.filter_by(role="assistant").all()
+    assert [m.content for m in saved] == ["Hello!"]
+
+
+def test_chat_stream_keeps_partial_reply_on_disconnect(client):
+    """
+    If the client disconnects mid-stream, the upstream stream is closed and the partial reply is kept.
+    """
+    upstream_closed = []
+
+    def fake_stream(*args, **kwargs):
+        try:
+            yield "partial "
+            yield "answer"
+            yield "never sent"
+        finally:
+            upstream_closed.append(True)
+
+    with patch('routes.session.ai_chat_response_stream', side_effect=fake_stream):
+        response = client.post('/api/v1/chat/stream',
+                               data=json.dumps({'message': 'hi'}),
+                               content_type='application/json',
+                               buffered=False)
+        chunks = iter(response.response)
+        next(chunks)  # start
+        next(chunks)  # "partial "
+        response.close()
+
+    assert upstream_closed == [True]
+    saved = ChatMessage.query.filter_by(role="assistant").one()
+    assert saved.content == "partial "
+
+
+def test_chat_folds_old_turns_into_stored_summary(client):
+    """
+    Turns that fall out of the window are summarized after the reply is saved, without
+    holding up the response; the next turn uses the stored summary.
+    """
+    from concurrent.futures import Future
+    from models import ChatSession
+    chat_session = ChatSession(user_id=1, title="long chat")
+    db.session.add(chat_session)
+    db.session.commit()
+    for i in range(12):
+        db.session.add(ChatMessage(session_id=chat_session.id, role="user" if i % 2 == 0 else "assistant", content=f"msg {i}"))
+    db.session.commit()
+
+    summary = Future()
+    summary.set_result("SUMMARY")
+
+    def post(message):
+        return client.post('/api/v1/chat', data=json.dumps({'message': message, 'session_id': chat_session.id}),
+                           content_type='application/json')
+
+    with patch('routes.session.submit_summary', return_value=summary) as mock_summarize, \
+         patch('routes.session.ai_chat_response', return_value="ok") as mock_chat:
+        assert post('next').status_code == 200
+        # This turn: no summary yet and no LLM call before the reply
+        history = mock_chat.call_args.kwargs["session_history"]
+        assert [m["content"] for m in history] == [f"msg {i}" for i in range(4, 12)]
+        mock_summarize.assert_called_once()
+        assert [t["content"] for t in mock_summarize.call_args.args[1]] == [f"msg {i}" for i in range(6)]
+
+        db.session.refresh(chat_session)
+        assert chat_session.summary == "SUMMARY"
+        assert chat_session.summary_upto_id is not None
+
+        assert post('again').status_code == 200
+        history = mock_chat.call_args.kwargs["session_history"]
+        assert history[0] == {"role": "system", "content": "Summary of the earlier conversation:\nSUMMARY"}
+        assert [m["content"] for m in history[1:]] == [f"msg {i}" for i in range(6, 12)] + ["next", "ok"]
@@ -0,0 +1,48 @@
+import json
+from unittest.mock import patch
+from click.testing import CliRunner
+from cli import cli
+
+
+def fake_scans_many(calls):
+    async def _scans_many(targets, concurrency=8, **kwargs):
+        for target in targets:
+            calls.append(target)
+            yield {"ok": target != "bad.example", "target": target, "plan": {"tool": "nmap"}}
+    return _scans_many
+
+
+def test_scan_streams_jsonl_to_stdout():
+    calls = []
+    with patch("cli.orchestrate_scans_many", fake_scans_many(calls)):
+        result = CliRunner().invoke(cli, ["scan"], input="a.example\n\n# comment\nb.example\na.example\n")
+
+    assert result.exit_code == 0
+    lines = [json.loads(line) for line in result.stdout.splitlines() if line.startswith("{")]
+    assert [r["target"] for r in lines] == ["a.example", "b.example"]
+    assert all("finished_at" in r for r in lines)
+
+
+def test_scan_resume_skips_completed_targets(tmp_path):
+    out = tmp_path / "results.jsonl"
+    out.write_text(
+        json.dumps({"ok": True, "target": "a.example"}) + "\n"
+        + json.dumps({"ok": False, "target": "bad.example"}) + "\n"
+        + '{"ok": true, "targ'  # baris terpotong dari run yang di-kill
+    )
+    targets = tmp_path / "targets.txt"
+    targets.write_text("a.example\nbad.example\nc.example\n")
+
+    calls = []
+    with patch("cli.orchestrate_scans_many", fake_scans_many(calls)):
+        result = CliRunner().invoke(cli, ["scan", "-i", str(targets), "-o", str(out), "--resume", "--retry-failed"])
+
+    assert calls == ["bad.example", "c.example"]
+    assert result.exit_code == 1  # bad.example masih gagal
+    records = [json.loads(line) for line in out.read_text().splitlines()[3:]]
+    assert [r["target"] for r in records] == ["bad.example", "c.example"]
+
+
+def test_scan_resume_requires_output_file():
+    result = CliRunner().invoke(cli, ["scan", "--resume"], input="a.example\n")
+    assert result.exit_code != 0
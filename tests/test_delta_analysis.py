@@ -0,0 +1,61 @@
+from unittest.mock import patch
+from ai.analyzer import analyze_output
+from ai.findings import normalize_findings
+
+
+def _nmap_structured(ports):
+    return {"parsed": True, "hosts": [{"status": "up", "addresses": [{"addr": "10.0.0.1", "addrtype": "ipv4"}], "ports": [
+        {"port": str(port), "protocol": "tcp", "state": "open", "service": {"name": name, "product": product, "version": version}}
+        for port, name, product, version in ports
+    ]}]}
+
+
+BASE_PORTS = [(22, "ssh", "OpenSSH", "8.9"), (80, "http", "nginx", "1.24"), (443, "https", "nginx", "1.24"),
+              (8080, "http-proxy", "", ""), (5432, "postgresql", "PostgreSQL DB", "15")]
+PREVIOUS_ANALYSIS = {"summary": "Five services exposed, nothing critical.", "issue": {"severity": "low"}}
+EXECUTION = {"ok": True, "tool": "nmap", "stdout": "", "stderr": ""}
+
+
+def _previous():
+    return {"scan_id": 7, "analysis": PREVIOUS_ANALYSIS,
+            "findings": normalize_findings("nmap", "10.0.0.1", _nmap_structured(BASE_PORTS))}
+
+
+def test_unchanged_rescan_reuses_previous_analysis_without_llm():
+    with patch("ai.analyzer.delta.call_groq") as delta_llm, patch("ai.analyzer.base.call_groq") as full_llm:
+        result = analyze_output("nmap", EXECUTION, target="10.0.0.1",
+                                structured=_nmap_structured(BASE_PORTS), previous=_previous())
+
+    delta_llm.assert_not_called()
+    full_llm.assert_not_called()
+    assert result["summary"] == PREVIOUS_ANALYSIS["summary"]
+    assert result["delta"]["mode"] == "unchanged" and result["delta"]["previous_scan_id"] == 7
+
+
+def test_small_change_sends_only_delta():
+    ports = BASE_PORTS + [(23, "telnet", "", "")]
+    response = '{"summary": "Telnet newly exposed.", "issue": {"severity": "high"}}'
+    with patch("ai.analyzer.delta.call_groq", return_value=response) as delta_llm, \
+         patch("ai.analyzer.base.call_groq") as full_llm:
+        result = analyze_output("nmap", EXECUTION, target="10.0.0.1",
+                                structured=_nmap_structured(ports), previous=_previous())
+
+    full_llm.assert_not_called()
+    prompt = delta_llm.call_args[0][0]
+    assert '"port":23' in prompt and '"port":5432' not in prompt
+    assert PREVIOUS_ANALYSIS["summary"] in prompt
+    assert delta_llm.call_args.kwargs["route"] == "analyzer:nmap:delta"
+    assert result["summary"] == "Telnet newly exposed."
+    assert result["delta"]["changes"]["ports_opened"] == 1
+
+
+def test_large_change_falls_back_to_full_analysis():
+    ports = [(p, "http", "", "") for p in range(9000, 9010)]
+    with patch("ai.analyzer.delta.call_groq") as delta_llm, \
+         patch("ai.analyzer.base.call_groq", return_value='{"summary": "full"}') as full_llm:
+        result = analyze_output("nmap", EXECUTION, target="10.0.0.1",
+                                structured=_nmap_structured(ports), previous=_previous())
+
+    delta_llm.assert_not_called()
+    full_llm.assert_called_once()
+    assert result["summary"] == "full" and "delta" not in result
@@ -0,0 +1,59 @@
+from models import db, ScanHistory, Finding
+from ai.findings import normalize_findings, severity_label
+from ai.analyzer.structured_parser import extract_structured_data
+from routes.scan import _store_findings
+
+
+NMAP_XML = """<?xml version="1.0"?><nmaprun>
+<host><status state="up"/><address addr="10.0.0.1" addrtype="ipv4"/><ports>
+<port protocol="tcp" portid="22"><state state="open"/><service name="ssh" product="OpenSSH" version="7.4"/></port>
+<port protocol="tcp" portid="23"><state state="open"/><service name="telnet"/></port>
+<port protocol="tcp" portid="443"><state state="closed"/></port>
+</ports></host>
+<host><status state="up"/><address addr="10.0.0.2" addrtype="ipv4"/><ports>
+<port protocol="tcp" portid="22"><state state="open"/><service name="ssh" product="OpenSSH" version="8.9p1"/></port>
+</ports></host></nmaprun>"""
+
+
+def test_normalize_nmap_keeps_open_ports_only():
+    rows = normalize_findings("nmap", "10.0.0.0/30", extract_structured_data("nmap", NMAP_XML))
+
+    assert [(r["host"], r["port"], r["service"]) for r in rows] == [
+        ("10.0.0.1", 22, "ssh"), ("10.0.0.1", 23, "telnet"), ("10.0.0.2", 22, "ssh"),
+    ]
+    assert rows[0]["product"] == "OpenSSH" and rows[0]["version"] == "7.4"
+    assert rows[1]["severity"] == "medium"
+    assert set(rows[0]) == {"host", "port", "proto", "service", "product", "version", "path", "status", "cve", "severity"}
+
+
+def test_normalize_web_tools():
+    nikto = {"parsed": True, "target": {"targethostname": "example.com", "targetport": "8080", "targetbanner": "Apache/2.4.49 (Unix)"},
+             "items": [{"description": "Apache 2.4.49 path traversal CVE-2021-41773", "uri": "/cgi-bin/"}]}
+    row = normalize_findings("nikto", "http://example.com:8080", nikto)[0]
+    assert (row["host"], row["port"], row["product"], row["version"]) == ("example.com", 8080, "Apache", "2.4.49")
+    assert row["cve"] == "CVE-2021-41773"
+    assert row["severity"] == "critical"
+
+    gobuster = {"parsed": True, "findings": [{"path": "/.git", "status": 403}]}
+    row = normalize_findings("gobuster", "https://example.com", gobuster)[0]
+    assert (row["host"], row["port"], row["path"], row["status"]) == ("example.com", 443, "/.git", 403)
+
+    assert normalize_findings("sqlmap", "http://example.com/item?id=1", {"parsed": True, "vulnerable": False}) == []
+    assert normalize_findings("nmap", "x", {"parsed": False}) == []
+    assert severity_label(0) == "info"
+
+
+def test_store_findings_bulk_insert_and_indexed_query(app):
+    scan = ScanHistory(target="10.0.0.0/30", tool="nmap", command="[]", status="completed")
+    db.session.add(scan)
+    db.session.flush()
+
+    assert len(_store_findings(scan, extract_structured_data("nmap", NMAP_XML))) == 3
+    db.session.commit()
+
+    old_ssh = Finding.query.filter(Finding.product == "OpenSSH", Finding.version.like("7.%")).all()
+    assert [f.host for f in old_ssh] == ["10.0.0.1"]
+
+    db.session.delete(scan)
+    db.session.commit()
+    assert Finding.query.count() == 0
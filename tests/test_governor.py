@@ -0,0 +1,87 @@
+import pytest
+from unittest.mock import patch, MagicMock
+from ai.llm import governor as governor_module
+from ai.llm.governor import TokenGovernor, LLMBudgetExceeded, use_principal
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    monkeypatch.setattr(governor_module, "PROVIDER_LIMITS", {"m": {"rpm": "100/minute", "tpm": "1000/minute"}})
+    monkeypatch.setattr(governor_module, "PRINCIPAL_RPM", "100/minute")
+    monkeypatch.setattr(governor_module, "PRINCIPAL_TOKENS", "500/hour")
+
+
+def test_principal_budget_is_shed_immediately(limits):
+    """
+    A principal over its token budget is rejected without waiting; others are unaffected.
+    """
+    gov = TokenGovernor("memory://")
+    with use_principal("user:1"):
+        principal = gov.acquire("m", 300)
+        gov.record("m", 150, principal)
+        with patch("time.sleep") as mock_sleep, pytest.raises(LLMBudgetExceeded) as exc:
+            gov.acquire("m", 100)
+        mock_sleep.assert_not_called()
+        assert exc.value.scope == "principal"
+
+    with use_principal("user:2"):
+        assert gov.acquire("m", 100) == "user:2"
+
+
+def test_global_limit_queues_then_sheds(limits):
+    """
+    When the provider TPM window is full, calls wait up to max_wait and are then shed.
+    """
+    gov = TokenGovernor("memory://")
+    for i in range(2):
+        gov.acquire("m", 450, principal=f"user:{i}")
+
+    with patch("time.sleep") as mock_sleep, pytest.raises(LLMBudgetExceeded) as exc:
+        gov.acquire("m", 200, principal="user:3", max_wait=0)
+    assert exc.value.scope == "global"
+    mock_sleep.assert_not_called()
+
+
+def test_hit_is_the_atomic_check(limits):
+    """
+    A stale test() (another worker took the last slot) must not admit the call.
+    """
+    gov = TokenGovernor("memory://")
+    for i in range(2):
+        gov.acquire("m", 450, principal=f"user:{i}")
+    with patch.object(gov.limiter, "test", return_value=True), pytest.raises(LLMBudgetExceeded) as exc:
+        gov.acquire("m", 200, principal="user:2", max_wait=0)
+    assert exc.value.scope == "global"
+    # Window global tidak pernah melebihi limit
+    assert gov.limiter.get_window_stats(governor_module.parse("1000/minute"), "llm-tpm", "m").remaining == 100
+    # Budget principal yang sempat di-hit dikembalikan saat panggilan ditolak
+    assert gov.limiter.get_window_stats(governor_module.parse("500/hour"), "llm-tokens", "user:2").remaining == 500
+    assert gov.limiter.get_window_stats(governor_module.parse("100/minute"), "llm-rpm", "user:2").remaining == 100
+
+
+def test_refund_trims_newest_redis_entries(limits):
+    from limits.storage import RedisStorage
+    gov = TokenGovernor("memory://")
+    gov.storage = MagicMock(spec=RedisStorage)
+    gov.storage.prefixed_key.side_effect = lambda key: f"LIMITS:{key}"
+    item = governor_module.parse("500/hour")
+
+    gov._refund(item, ("llm-tokens", "user:1"), 200)
+
+    gov.storage.get_connection.return_value.ltrim.assert_called_once_with(
+        f"LIMITS:{item.key_for('llm-tokens', 'user:1')}", 200, -1
+    )
+
+
+def test_web_request_fails_fast_instead_of_sleeping(limits):
+    from flask import Flask
+    gov = TokenGovernor("memory://")
+    for i in range(2):
+        gov.acquire("m", 450, principal=f"user:{i}")
+
+    with Flask(__name__).test_request_context(), patch("time.sleep") as mock_sleep, \
+            pytest.raises(LLMBudgetExceeded) as exc:
+        gov.acquire("m", 200, principal="user:2")
+    mock_sleep.assert_not_called()
+    assert exc.value.scope == "global"
+    assert exc.value.retry_after > 0
@@ -0,0 +1,65 @@
+import json
+from sqlalchemy import event
+from models import db, User, ScanHistory, ChatSession
+
+
+def _add_scan(user_id, session_id=None):
+    scan = ScanHistory(
+        user_id=user_id, session_id=session_id, target="example.com", tool="nmap", command='["nmap"]',
+        status="completed", risk_level="low",
+        execution_result=json.dumps({"stdout": "x" * 100000}),
+        analysis_result=json.dumps({"summary": "Only SSH is open.", "analysis": "y" * 50000}),
+    )
+    db.session.add(scan)
+    db.session.commit()
+    scan_id = scan.id
+    db.session.expunge_all()
+    return scan_id
+
+
+def _capture_statements():
+    statements = []
+    event.listen(db.engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+
+def test_summary_copied_from_analysis_result():
+    scan = ScanHistory(target="t", tool="nmap", command="[]", analysis_result=json.dumps({"summary": "s"}))
+    assert scan.summary == "s"
+    scan.analysis_result = json.dumps({"error": "failed"})
+    assert scan.summary is None
+
+
+def test_list_scans_does_not_load_blobs(client):
+    user_id = User.query.first().id
+    scan_id = _add_scan(user_id)
+    statements = _capture_statements()
+
+    response = client.get("/api/v1/scans")
+    assert response.status_code == 200
+    item = response.get_json()["scans"][0]
+    assert item["summary"] == "Only SSH is open."
+    assert item["command"] == ["nmap"]
+    assert "execution" not in item and "analysis" not in item
+    assert not any("execution_result" in s or "analysis_result" in s for s in statements)
+
+    detail = client.get(f"/api/v1/scans/{scan_id}").get_json()
+    assert detail["analysis"]["summary"] == "Only SSH is open."
+    assert len(detail["execution"]["stdout"]) == 100000
+
+
+def test_session_timeline_uses_scan_summaries(client):
+    user_id = User.query.first().id
+    chat_session = ChatSession(user_id=user_id, title="engagement")
+    db.session.add(chat_session)
+    db.session.commit()
+    session_id = chat_session.id
+    _add_scan(user_id, session_id=session_id)
+
+    statements = _capture_statements()
+    timeline = client.get(f"/api/v1/sessions/{session_id}").get_json()["timeline"]
+    assert timeline[0]["type"] == "scan"
+    assert timeline[0]["summary"] == "Only SSH is open."
+    assert "execution" not in timeline[0]
+    assert not any("execution_result" in s for s in statements)
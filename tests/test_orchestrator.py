@@ -0,0 +1,69 @@
+import asyncio
+from unittest.mock import patch
+from ai.orchestrator import orchestrate_scans_many
+
+
+def test_orchestrate_scans_many_bounded_and_yields_as_completed():
+    """
+    At most `concurrency` scans run at once, and results arrive in completion order.
+    """
+    state = {"active": 0, "max": 0}
+    delays = {"slow.example": 0.2, "a.example": 0.01, "b.example": 0.01, "c.example": 0.01}
+
+    async def fake_run(command):
+        state["active"] += 1
+        state["max"] = max(state["max"], state["active"])
+        await asyncio.sleep(delays[command[-1]])
+        state["active"] -= 1
+        return {"ok": True, "tool": command[0], "returncode": 0, "stdout": "", "stderr": ""}
+
+    async def fake_analyze(tool, execution, target=None):
+        return {"summary": f"analysis of {target}"}
+
+    async def collect():
+        results = []
+        async for result in orchestrate_scans_many(["slow.example", "a.example", "b.example", "c.example"], concurrency=2):
+            results.append(result)
+        return results
+
+    with patch("ai.orchestrator.run_command_aio", side_effect=fake_run), \
+         patch("ai.orchestrator.analyze_output_async", side_effect=fake_analyze):
+        results = asyncio.run(collect())
+
+    assert state["max"] == 2
+    assert [r["target"] for r in results][-1] == "slow.example"
+    assert all(r["ok"] for r in results)
+    assert results[0]["analysis"]["summary"] == "analysis of a.example"
+
+
+def test_orchestrate_scans_many_pulls_targets_lazily():
+    """
+    Targets are only consumed as slots free up, so a huge iterable is never drained up front.
+    """
+    consumed = []
+
+    def targets():
+        for i in range(1000):
+            consumed.append(i)
+            yield f"host{i}.example"
+
+    async def fake_run(command):
+        return {"ok": True, "tool": command[0], "returncode": 0, "stdout": "", "stderr": ""}
+
+    async def fake_analyze(tool, execution, target=None):
+        return {}
+
+    async def take_two():
+        results = []
+        async for result in orchestrate_scans_many(targets(), concurrency=3):
+            results.append(result)
+            if len(results) == 2:
+                break
+        return results
+
+    with patch("ai.orchestrator.run_command_aio", side_effect=fake_run), \
+         patch("ai.orchestrator.analyze_output_async", side_effect=fake_analyze):
+        results = asyncio.run(take_two())
+
+    assert len(results) == 2
+    assert len(consumed) <= 5
@@ -0,0 +1,147 @@
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from models import db, User, ScanHistory, ChatSession, ChatMessage
+
+BASE = datetime(2026, 5, 1, 8, 0)
+
+
+def _collect(client, url, key):
+    items, cursor, pages = [], None, 0
+    while True:
+        response = client.get(url + (f"&cursor={cursor}" if cursor else ""))
+        assert response.status_code == 200
+        data = response.get_json()
+        items.extend(data[key])
+        pages += 1
+        cursor = data["next_cursor"]
+        if not cursor:
+            return items, pages
+
+
+def test_scans_keyset_pagination_walks_every_row_once(client):
+    user_id = User.query.first().id
+    # Beberapa scan dengan created_at sama: tie-break pada id
+    for i in range(7):
+        db.session.add(ScanHistory(user_id=user_id, target=f"t{i}", tool="nmap", command="[]",
+                                   created_at=BASE + timedelta(minutes=i // 2)))
+    db.session.commit()
+
+    scans, pages = _collect(client, "/api/v1/scans?limit=3", "scans")
+    assert pages == 3
+    assert [scan["target"] for scan in scans] == ["t6", "t5", "t4", "t3", "t2", "t1", "t0"]
+
+    # COUNT hanya dijalankan jika diminta
+    statements = []
+    event.listen(db.engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    data = client.get("/api/v1/scans?limit=3").get_json()
+    assert "total" not in data
+    assert not any("count(" in statement.lower() for statement in statements)
+    assert client.get("/api/v1/scans?limit=3&include_total=1").get_json()["total"] == 7
+
+
+def test_invalid_cursor_is_rejected(client):
+    assert client.get("/api/v1/scans?cursor=not-a-cursor").status_code == 400
+    assert client.get("/api/v1/sessions?cursor=%%%").status_code == 400
+
+
+def test_sessions_keyset_pagination(client):
+    user_id = User.query.first().id
+    for i in range(5):
+        db.session.add(ChatSession(user_id=user_id, title=f"s{i}", updated_at=BASE + timedelta(hours=i)))
+    db.session.commit()
+
+    sessions, pages = _collect(client, "/api/v1/sessions?limit=2", "sessions")
+    assert pages == 3
+    assert [s["title"] for s in sessions] == ["s4", "s3", "s2", "s1", "s0"]
+
+
+def test_session_touched_mid_walk_moves_to_top_without_repeating(client):
+    user_id = User.query.first().id
+    for i in range(5):
+        db.session.add(ChatSession(user_id=user_id, title=f"s{i}", updated_at=BASE + timedelta(hours=i)))
+    db.session.commit()
+
+    first = client.get("/api/v1/sessions?limit=2").get_json()
+    # s4 (sudah terlihat) dan s0 (belum) mendapat pesan baru di tengah walk
+    for title in ("s4", "s0"):
+        ChatSession.query.filter_by(title=title).one().updated_at = BASE + timedelta(days=1)
+    db.session.commit()
+    rest = client.get(f"/api/v1/sessions?limit=2&cursor={first['next_cursor']}").get_json()
+
+    titles = [s["title"] for s in first["sessions"] + rest["sessions"]]
+    assert titles == ["s4", "s3", "s2", "s1"] and rest["next_cursor"] is None
+    fresh, _ = _collect(client, "/api/v1/sessions?limit=2", "sessions")
+    assert [s["title"] for s in fresh][:2] == ["s4", "s0"]
+
+
+def test_session_timeline_pages_backwards_in_time(client):
+    user_id = User.query.first().id
+    chat_session = ChatSession(user_id=user_id, title="engagement")
+    db.session.add(chat_session)
+    db.session.commit()
+    session_id = chat_session.id
+
+    # Pesan dan scan berselang-seling, satu scan dengan created_at sama dengan pesan
+    for i in range(6):
+        db.session.add(ChatMessage(session_id=session_id, role="user", content=f"m{i}",
+                                   created_at=BASE + timedelta(minutes=2 * i)))
+    for i in range(3):
+        db.session.add(ScanHistory(user_id=user_id, session_id=session_id, target=f"scan{i}", tool="nmap",
+                                   command="[]", created_at=BASE + timedelta(minutes=4 * i)))
+    db.session.commit()
+
+    first = client.get(f"/api/v1/sessions/{session_id}?limit=4").get_json()
+    labels = [item.get("content") or item.get("target") for item in first["timeline"]]
+    assert labels == ["m3", "scan2", "m4", "m5"]
+
+    older = client.get(f"/api/v1/sessions/{session_id}?limit=4&cursor={first['next_cursor']}").get_json()
+    assert [item.get("content") or item.get("target") for item in older["timeline"]] == ["m0", "m1", "scan1", "m2"]
+    rest = client.get(f"/api/v1/sessions/{session_id}?limit=4&cursor={older['next_cursor']}").get_json()
+    assert rest["next_cursor"] is None
+
+    everything = rest["timeline"] + older["timeline"] + first["timeline"]
+    assert [item.get("content") or item.get("target") for item in everything] == [
+        "scan0", "m0", "m1", "scan1", "m2", "m3", "scan2", "m4", "m5"
+    ]
+
+
+def test_session_timeline_is_one_union_query(client):
+    user_id = User.query.first().id
+    chat_session = ChatSession(user_id=user_id, title="engagement")
+    db.session.add(chat_session)
+    db.session.commit()
+    session_id = chat_session.id
+    for i in range(30):
+        db.session.add(ChatMessage(session_id=session_id, role="assistant", content=f"m{i}",
+                                   created_at=BASE + timedelta(seconds=i)))
+    db.session.add(ScanHistory(user_id=user_id, session_id=session_id, target="example.com", tool="nmap",
+                               command='["nmap"]', status="completed", created_at=BASE + timedelta(seconds=29),
+                               analysis_result='{"summary": "ok", "analysis": "long"}'))
+    db.session.commit()
+
+    statements = []
+    event.listen(db.engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    data = client.get(f"/api/v1/sessions/{session_id}?limit=5").get_json()
+
+    timeline_queries = [statement for statement in statements if "chat_message" in statement]
+    assert len(timeline_queries) == 1
+    assert "UNION ALL" in timeline_queries[0]
+    assert "analysis_result" not in timeline_queries[0]
+    assert [item.get("content") or item.get("summary") for item in data["timeline"]] == ["m26", "m27", "m28", "ok", "m29"]
+    assert data["timeline"][3]["command"] == ["nmap"]
+    assert data["next_cursor"]
+
+
+def test_timeline_branches_are_limited_on_their_indexes(client):
+    from routes.session import timeline_query
+
+    for position in (None, (BASE, 10, 1)):
+        compiled = timeline_query(1, position, 50).compile(db.engine)
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+        with db.engine.connect() as conn:
+            plan = " | ".join(row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + str(compiled), params))
+        # Tiap cabang dibaca lewat index komposit, tidak men-scan seluruh sesi lalu sort
+        assert "ix_scan_history_session_created" in plan
+        assert "ix_chat_message_session_created" in plan
+        # Hanya satu sort: merge luar atas paling banyak 2 * (limit + 1) baris
+        assert plan.count("TEMP B-TREE") == 1
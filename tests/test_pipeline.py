@@ -0,0 +1,103 @@
+import threading
+import time
+import pytest
+from ai.pipeline import DeepScanPipeline, discover_web_services
+
+NMAP_XML = """<?xml version="1.0"?>
+<nmaprun><host><status state="up"/><address addr="10.0.0.5" addrtype="ipv4"/><ports>
+<port protocol="tcp" portid="22"><state state="open"/><service name="ssh"/></port>
+<port protocol="tcp" portid="80"><state state="open"/><service name="http"/></port>
+<port protocol="tcp" portid="8443"><state state="open"/><service name="https-alt"/></port>
+<port protocol="tcp" portid="8080"><state state="closed"/><service name="http-proxy"/></port>
+</ports></host></nmaprun>"""
+
+NIKTO_XML = """<?xml version="1.0"?>
+<niktoscan><scandetails targetip="10.0.0.5">
+<item id="1"><description>Possible injection point</description><uri>/item.php?id=1</uri></item>
+</scandetails></niktoscan>"""
+
+
+def _fake_runner(delay=0.05):
+    lock = threading.Lock()
+    calls = []
+
+    def run(command):
+        with lock:
+            calls.append(command)
+        time.sleep(delay)
+        tool = command[0]
+        stdout = {"nmap": NMAP_XML, "nikto": NIKTO_XML}.get(tool, "")
+        return {"ok": True, "tool": tool, "returncode": 0, "stdout": stdout, "stderr": ""}
+
+    return run, calls
+
+
+def test_discover_web_services_only_open_http_ports():
+    from ai.analyzer.structured_parser import parse_nmap_xml
+    urls = discover_web_services(parse_nmap_xml(NMAP_XML[NMAP_XML.find("<?xml"):]))
+    assert urls == ["http://10.0.0.5/", "https://10.0.0.5:8443/"]
+
+
+def test_discover_web_services_skips_ports_without_a_number():
+    structured = {"hosts": [{"addresses": [{"addr": "10.0.0.5", "addrtype": "ipv4"}], "ports": [
+        {"port": None, "state": "open", "service": {"name": "http"}},
+        {"port": "abc", "state": "open", "service": {"name": "http"}},
+        {"port": "8080", "state": "open", "service": {"name": "http-proxy"}},
+    ]}]}
+    assert discover_web_services(structured) == ["http://10.0.0.5:8080/"]
+
+
+def test_pipeline_rejects_zero_stage_concurrency():
+    with pytest.raises(ValueError, match="nikto"):
+        DeepScanPipeline("10.0.0.5", stage_limits={"nikto": 0})
+
+
+def test_pipeline_fans_out_follow_up_scans():
+    """
+    nmap discovers two web services; gobuster and nikto run on each, and sqlmap runs on
+    the parameterized URL nikto found, with dependencies recorded.
+    """
+    runner, calls = _fake_runner()
+    result = DeepScanPipeline("10.0.0.5", analyze=False, runner=runner).run()
+
+    tools = sorted((stage["tool"], stage["target"]) for stage in result["stages"])
+    assert tools == [
+        ("gobuster", "http://10.0.0.5/"),
+        ("gobuster", "https://10.0.0.5:8443/"),
+        ("nikto", "http://10.0.0.5/"),
+        ("nikto", "https://10.0.0.5:8443/"),
+        ("nmap", "10.0.0.5"),
+        ("sqlmap", "http://10.0.0.5/item.php?id=1"),
+        ("sqlmap", "https://10.0.0.5:8443/item.php?id=1"),
+    ]
+    by_id = {stage["id"]: stage for stage in result["stages"]}
+    for stage in result["stages"]:
+        if stage["tool"] in ("gobuster", "nikto"):
+            assert by_id[stage["depends_on"]]["tool"] == "nmap"
+        if stage["tool"] == "sqlmap":
+            assert by_id[stage["depends_on"]]["tool"] == "nikto"
+    assert [by_id[i]["tool"] for i in result["critical_path"]] == ["nmap", "nikto", "sqlmap"]
+
+    # Independent stages overlap: wall time is well below the sum of stage durations
+    assert result["elapsed"] < result["total_stage_time"]
+
+
+def test_pipeline_respects_stage_concurrency():
+    runner, _ = _fake_runner()
+    active = {"nikto": 0, "max": 0}
+    lock = threading.Lock()
+
+    def counting_runner(command):
+        if command[0] == "nikto":
+            with lock:
+                active["nikto"] += 1
+                active["max"] = max(active["max"], active["nikto"])
+        try:
+            return runner(command)
+        finally:
+            if command[0] == "nikto":
+                with lock:
+                    active["nikto"] -= 1
+
+    DeepScanPipeline("10.0.0.5", analyze=False, runner=counting_runner, stage_limits={"nikto": 1}).run()
+    assert active["max"] == 1
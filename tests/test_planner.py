@@ -18,3 +18,94 @@ def test_plan_scan_rule_based_nikto():
     assert plan["tool"] == "nikto"
     assert isinstance(plan["command"], list)
     assert plan["command"] == ["nikto", "-h", "http://example.com", "-Format", "xml"]
+
+def test_plan_scan_skips_llm_for_confident_rule_plan():
+    """
+    A plain hostname is planned without calling the LLM even when use_ai=True.
+    """
+    from unittest.mock import patch
+    from src.ai.planner import plan_scan
+    with patch("src.ai.planner.call_groq") as mock_groq:
+        plan = plan_scan("example.com", use_ai=True)
+    mock_groq.assert_not_called()
+    assert plan["command"] == ["nmap", "-sV", "-T4", "-oX", "-", "example.com"]
+    assert plan["confidence"] >= 0.75
+
+def test_plan_scan_consults_llm_when_prior_run_failed():
+    """
+    Confidence drops below the threshold when the same tool already failed on this target.
+    """
+    from unittest.mock import patch
+    from src.ai.planner import plan_scan
+    prior = [{"target": "example.com", "tool": "nmap", "status": "failed", "risk_level": None}]
+    ai_response = '{"tool": "nmap", "command": "nmap -Pn -sV -T2 -oX - example.com", "rationale": "Host may block ping"}'
+    with patch("src.ai.planner.call_groq", return_value=ai_response) as mock_groq:
+        plan = plan_scan("example.com", use_ai=True, prior_scans=prior)
+    mock_groq.assert_called_once()
+    assert plan["command"][:2] == ["nmap", "-Pn"]
+
+@pytest.mark.parametrize("target, tool", [
+    ("10.0.0.5", "nmap"),
+    ("example.com", "nmap"),
+    ("http://example.com", "nikto"),
+    ("http://example.com/item.php?id=1", "nikto"),
+])
+def test_rule_based_default_tool_per_target_kind(target, tool):
+    """
+    Default tool per target kind is confident enough to skip the LLM; sqlmap is never a default.
+    """
+    from src.ai.planner import CONFIDENCE_THRESHOLD
+    plan = plan_scan_rule_based(target)
+    assert plan["tool"] == tool
+    assert plan["confidence"] >= CONFIDENCE_THRESHOLD
+
+def test_plan_scan_rule_based_sqlmap_when_forced():
+    plan = plan_scan_rule_based("http://example.com/item.php?id=1", forced_tool="sqlmap")
+    assert plan["tool"] == "sqlmap"
+    assert plan["command"][:3] == ["sqlmap", "-u", "http://example.com/item.php?id=1"]
+
+def test_plan_cache_reuses_ai_plan_for_same_target_class():
+    """
+    A cached AI plan is re-rendered for another target of the same class without calling the LLM.
+    """
+    from unittest.mock import patch
+    from src.ai.planner import plan_scan_ai, plan_cache
+    plan_cache.clear()
+    ai_response = '{"tool": "nikto", "command": "nikto -h http://a.example/ -Tuning 123", "rationale": "Web app at http://a.example/"}'
+    with patch("src.ai.planner.call_groq", return_value=ai_response) as mock_groq:
+        first = plan_scan_ai("http://a.example/", history="- Tool: nmap, Status: completed, Risk: low")
+        second = plan_scan_ai("http://b.example/", history="- Tool: nmap, Status: completed, Risk: low")
+    assert mock_groq.call_count == 1
+    assert first["command"] == ["nikto", "-h", "http://a.example/", "-Tuning", "123"]
+    assert second["command"] == ["nikto", "-h", "http://b.example/", "-Tuning", "123"]
+    assert second["cached"] is True
+    assert "http://b.example/" in second["rationale"]
+
+def test_plan_cache_invalidated_when_history_changes():
+    from unittest.mock import patch
+    from src.ai.planner import plan_scan_ai, plan_cache
+    plan_cache.clear()
+    ai_response = '{"tool": "nmap", "command": "nmap -sV -oX - 10.0.0.1", "rationale": "recon"}'
+    with patch("src.ai.planner.call_groq", return_value=ai_response) as mock_groq:
+        plan_scan_ai("10.0.0.1")
+        plan_scan_ai("10.0.0.1", history="- Tool: nmap, Status: failed, Risk: None")
+        # Session lain tanpa history masih memakai entry pertama
+        plan_scan_ai("10.0.0.3")
+    assert mock_groq.call_count == 2
+    assert len(plan_cache._entries) == 2
+
+def test_plan_cache_templatizes_whole_tokens_only():
+    from src.ai.planner import PlanCache
+    cache = PlanCache()
+    plan = {"tool": "nmap", "command": ["nmap", "-sV", "--exclude", "10.0.0.10", "10.0.0.1"],
+            "rationale": "Scan 10.0.0.1, skip 10.0.0.10."}
+    assert cache.put("10.0.0.1", plan)
+    rendered = cache.get("10.0.0.2")
+    assert rendered["command"] == ["nmap", "-sV", "--exclude", "10.0.0.10", "10.0.0.2"]
+    assert rendered["rationale"] == "(cached plan) Scan 10.0.0.2, skip 10.0.0.10."
+
+    web = {"tool": "gobuster", "command": ["gobuster", "dir", "-u", "http://a.example/", "--exclude-host", "www.a.example"],
+           "rationale": "Content on a.example"}
+    assert cache.put("http://a.example/", web)
+    assert cache.get("http://b.example/")["command"] == [
+        "gobuster", "dir", "-u", "http://b.example/", "--exclude-host", "www.a.example"]
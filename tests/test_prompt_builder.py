@@ -0,0 +1,64 @@
+import json
+from itertools import product
+from ai.analyzer.prompt_builder import build_findings_block, fit_raw_text, compact_nikto, compact_nmap
+from ai.llm.tokens import count_tokens
+
+
+def _nmap_structured(states):
+    ports = [
+        {"port": str(80 + i), "protocol": "tcp", "state": state,
+         "service": {"name": "http", "product": "Apache httpd", "version": "2.4.49", "extrainfo": ""}}
+        for i, state in enumerate(states)
+    ]
+    return {
+        "hosts": [{"status": "up", "addresses": [{"addr": "10.0.0.1", "addrtype": "ipv4"}], "ports": ports}],
+        "parsed": True,
+    }
+
+
+def test_compact_nmap_groups_by_service_and_drops_closed():
+    """
+    Open ports with the same service collapse into one entry; closed/filtered are dropped.
+    """
+    header, entries = compact_nmap(_nmap_structured(["open", "open", "closed", "filtered"]))
+    assert header["closed_or_filtered_dropped"] == 2
+    assert len(entries) == 1
+    _, entry = entries[0]
+    assert entry["endpoints"] == ["10.0.0.1:80/tcp", "10.0.0.1:81/tcp"]
+
+
+def test_compact_nikto_collapses_repeated_items():
+    """
+    Nikto items that differ only by path/number are merged with a count.
+    """
+    items = [{"description": f"/backup{i}/: Directory indexing found.", "uri": f"/backup{i}/"} for i in range(10)]
+    items.append({"description": "Server may leak inodes via ETags", "uri": "/"})
+    header, entries = compact_nikto({"items": items, "parsed": True})
+    assert header["unique_findings"] == 2
+    merged = next(e for _, e in entries if e.get("count"))
+    assert merged["count"] == 10
+    assert len(merged["uris"]) == 5
+
+
+def test_build_findings_block_respects_budget_and_keeps_high_severity():
+    """
+    When the budget is exceeded, low-signal entries are omitted before high-signal ones.
+    """
+    names = ["".join(letters) for letters in product("abcdefgh", repeat=3)][:200]
+    items = [{"description": f"Uncommon header 'x-{name}' found", "uri": "/"} for name in names]
+    items.append({"description": "CVE-2021-41773: Apache path traversal allows remote code execution", "uri": "/cgi-bin/"})
+    block = build_findings_block("nikto", {"items": items, "parsed": True}, budget=300)
+    assert count_tokens(block) <= 300
+    assert "CVE-2021-41773" in block
+    assert "omitted" in block
+    json.loads(block.splitlines()[0])
+
+
+def test_fit_raw_text_keeps_important_lines():
+    """
+    Raw fallback keeps severity-bearing lines even when they are at the end.
+    """
+    text = "\n".join(f"noise line {i}" for i in range(2000)) + "\n+ /admin.php: Admin login page found (CVE-2020-1234)"
+    fitted = fit_raw_text(text, budget=200)
+    assert count_tokens(fitted) <= 200
+    assert "CVE-2020-1234" in fitted
@@ -0,0 +1,78 @@
+import math
+import pytest
+from models import db, ScanHistory, Finding
+from ai import risk
+from ai.risk import risk_level, rescore_history, score_findings, score_groups, score_targets
+from ai.vulndb import VulnIndex
+
+
+NO_INDEX = VulnIndex("/nonexistent/vulndb.sqlite")
+
+
+def finding(**kwargs):
+    row = {"host": "10.0.0.1", "port": None, "proto": "tcp", "service": None, "product": None,
+           "version": None, "path": None, "status": None, "cve": None, "severity": "info"}
+    row.update(kwargs)
+    return row
+
+
+def test_score_findings_is_deterministic_per_signal():
+    assert score_findings([], index=NO_INDEX) == (0.0, "info")
+    assert score_findings([finding(service="ssh", product="OpenSSH", version="8.9", severity="low")], index=NO_INDEX)[1] == "low"
+    assert score_findings([finding(service="telnet", severity="medium")], index=NO_INDEX)[1] == "high"
+    assert score_findings([finding(service="http", path="/cgi-bin/", cve="CVE-2021-41773", severity="critical")], index=NO_INDEX)[1] == "critical"
+
+    exposed = score_findings([finding(service="http", path="/.git", status=200, severity="medium")], index=NO_INDEX)
+    forbidden = score_findings([finding(service="http", path="/.git", status=403, severity="medium")], index=NO_INDEX)
+    assert exposed[0] > forbidden[0]
+
+
+def test_breadth_and_weights():
+    one = score_findings([finding(service="telnet", severity="medium")], index=NO_INDEX)[0]
+    many = score_findings([finding(service="telnet", severity="medium")] * 5, index=NO_INDEX)[0]
+    assert many > one
+    assert score_groups([[4.0, 0.0, 0.0, 0.0]], [0], 1, weights={"severity": 2.0}) == pytest.approx([8.0 + risk.BREADTH_WEIGHT * math.log(2)])
+    assert risk_level(6.5) == "high"
+
+
+def test_score_groups_matches_per_row_reference():
+    features = [[9.0, 9.8, 1.0, 0.0], [2.0, 0.0, 2.0, 3.0], [4.0, 0.0, 6.0, 0.0], [0.0, 0.0, 0.0, 0.0]]
+    groups = [0, 0, 1, 2]
+    w = [risk.RISK_WEIGHTS[name] for name in risk.FEATURES]
+    expected = []
+    for group in range(3):
+        scores = [sum(x * wi for x, wi in zip(row, w)) for row, g in zip(features, groups) if g == group]
+        significant = sum(score >= risk.SIGNIFICANT_SCORE for score in scores)
+        expected.append(max(scores + [0.0]) + risk.BREADTH_WEIGHT * math.log1p(significant))
+    assert score_groups(features, groups, 3) == pytest.approx(expected)
+    assert score_groups([], [], 2) == [0.0, 0.0]
+
+
+def test_score_targets_uses_latest_scan_per_tool():
+    scans = [
+        {"target": "a", "tool": "nmap", "created_at": 1, "score": 9.5},
+        {"target": "a", "tool": "nmap", "created_at": 2, "score": 2.0},
+        {"target": "a", "tool": "gobuster", "created_at": 1, "score": 4.5},
+    ]
+    assert score_targets(scans) == {"a": (4.5, "medium")}
+
+
+def test_rescore_history_updates_risk_level(app, monkeypatch):
+    monkeypatch.setattr(risk, "vuln_index", NO_INDEX)
+    telnet = ScanHistory(target="10.0.0.1", tool="nmap", command="[]", status="completed", risk_level="critical")
+    ssh = ScanHistory(target="10.0.0.2", tool="nmap", command="[]", status="completed", risk_level="critical")
+    db.session.add_all([telnet, ssh])
+    db.session.flush()
+    db.session.add_all([
+        Finding(scan_id=telnet.id, host="10.0.0.1", port=23, service="telnet", severity="medium"),
+        Finding(scan_id=ssh.id, host="10.0.0.2", port=22, service="ssh", severity="low"),
+    ])
+    db.session.commit()
+
+    assert rescore_history() == 2
+    assert db.session.get(ScanHistory, telnet.id).risk_level == "high"
+    assert db.session.get(ScanHistory, ssh.id).risk_level == "low"
+
+    # Bobot berubah -> seluruh history di-rescore dalam satu pass
+    rescore_history(weights={"service": 0.0, "severity": 0.5})
+    assert db.session.get(ScanHistory, telnet.id).risk_level == "low"
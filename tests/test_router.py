@@ -0,0 +1,30 @@
+from ai.llm.router import ModelRouter, SMALL_MODEL, LARGE_MODEL, LARGE_PROMPT_TOKENS, HIGH_SEVERITY_SCORE
+
+
+def test_small_clean_prompt_goes_to_small_model():
+    model, _ = ModelRouter().choose("analyzer:nmap", 400, severity=2)
+    assert model == SMALL_MODEL
+
+
+def test_large_or_high_severity_prompt_goes_to_large_model():
+    router = ModelRouter()
+    assert router.choose("analyzer:nmap", LARGE_PROMPT_TOKENS, severity=0)[0] == LARGE_MODEL
+    assert router.choose("analyzer:nikto", 400, severity=HIGH_SEVERITY_SCORE)[0] == LARGE_MODEL
+
+
+def test_downgrade_when_large_model_p95_exceeds_slo():
+    """
+    Once the observed p95 of the large model passes the SLO, the route falls back to the small model.
+    """
+    router = ModelRouter()
+    for _ in range(10):
+        router.record("analyzer:nikto", LARGE_MODEL, 60.0, 1000, 200)
+    model, reason = router.choose("analyzer:nikto", 400, severity=HIGH_SEVERITY_SCORE)
+    assert model == SMALL_MODEL
+    assert "downgraded" in reason
+    # Other routes keep their own latency history
+    assert router.choose("analyzer:nmap", 400, severity=HIGH_SEVERITY_SCORE)[0] == LARGE_MODEL
+
+    stats = router.stats()["analyzer:nikto"]
+    assert stats["calls"] == 10
+    assert stats["cost_usd"] > 0
@@ -0,0 +1,122 @@
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import patch
+from models import db, User, ScanHistory, Finding, Asset
+from ai.analyzer.structured_parser import extract_structured_data_from_files
+
+
+def nmap_xml(host_count, closed=False):
+    hosts = "".join(
+        f'<host><status state="up"/><address addr="10.0.0.{i}" addrtype="ipv4"/><ports>'
+        f'<port protocol="tcp" portid="22"><state state="open"/><service name="ssh"/></port></ports></host>'
+        for i in range(1, host_count + 1)
+    )
+    return f'<?xml version="1.0"?><nmaprun>{hosts}' + ("</nmaprun>" if closed else "")
+
+
+def _spooled_scan(tmp_path, tool, target, stdout, start_time=None):
+    """Scan 'running' yang prosesnya sudah selesai (tanpa pid) dengan output di file spool."""
+    stdout_path, stderr_path = tmp_path / f"{tool}.out", tmp_path / f"{tool}.err"
+    stdout_path.write_text(stdout)
+    stderr_path.write_text("")
+    scan = ScanHistory(user_id=User.query.first().id, target=target, tool=tool, command="[]", status="running",
+                       stdout_path=str(stdout_path), stderr_path=str(stderr_path),
+                       start_time=start_time or datetime.now(timezone.utc))
+    db.session.add(scan)
+    db.session.commit()
+    return scan.id
+
+
+def test_status_parses_spooled_output_from_file(client, tmp_path):
+    banner = "Starting Nmap 7.94\n" * 50
+    scan_id = _spooled_scan(tmp_path, "nmap", "10.0.0.0/24", banner + nmap_xml(3, closed=True))
+
+    with patch('routes.scan.analyze_output', return_value={"summary": "ok"}) as mock_analyze, \
+         patch('routes.scan.RAW_OUTPUT_TAIL_BYTES', 120):
+        data = client.get(f"/api/v1/scans/{scan_id}/status").get_json()
+
+    assert data["status"] == "completed"
+    structured = mock_analyze.call_args.kwargs["structured"]
+    assert structured["summary"]["hosts_total"] == 3
+    # Hanya ekor stdout yang dimuat untuk raw-text fallback
+    assert len(data["execution"]["stdout"]) <= 120
+    assert data["execution"]["stdout"].endswith("</nmaprun>")
+    assert Finding.query.filter_by(scan_id=scan_id).count() == 3
+    assert not (tmp_path / "nmap.out").exists()
+
+
+def test_large_nmap_sweep_streams_hosts_and_keeps_a_prompt_sample(client, tmp_path):
+    scan_id = _spooled_scan(tmp_path, "nmap", "10.0.0.0/24", nmap_xml(6, closed=True))
+
+    with patch('routes.scan.analyze_output', return_value={"summary": "ok"}) as mock_analyze, \
+         patch('ai.analyzer.structured_parser.NMAP_SAMPLE_HOSTS', 2):
+        data = client.get(f"/api/v1/scans/{scan_id}/status").get_json()
+
+    assert data["status"] == "completed"
+    structured = mock_analyze.call_args.kwargs["structured"]
+    assert len(structured["hosts"]) == 2 and structured["sampled"] is True
+    assert structured["summary"]["hosts_total"] == 6
+    # Findings, delta dan asset memakai semua host, bukan sampel
+    assert len(mock_analyze.call_args.kwargs["current_findings"]) == 6
+    assert Finding.query.filter_by(scan_id=scan_id).count() == 6
+    assert Asset.query.count() == 6
+
+
+@pytest.mark.parametrize("tool, target, stdout, expected", [
+    ("gobuster", "http://example.com", "=====\nFound: /admin (Status: 200)\nFound: /.git (Status: 403)\n",
+     {"/admin", "/.git"}),
+    ("nikto", "http://example.com",
+     "- Nikto v2.5.0\n<?xml version=\"1.0\"?><niktoscan><scandetails targetip=\"10.0.0.5\" targethostname=\"example.com\" "
+     "targetport=\"80\" targetbanner=\"nginx/1.18.0\"><item id=\"1\"><description>Admin login found</description>"
+     "<uri>/login</uri></item></scandetails></niktoscan>",
+     {"/login"}),
+    ("sqlmap", "http://example.com/item.php?id=1",
+     "[INFO] GET parameter 'id' is vulnerable\n    Payload: id=1 AND 1=1\n", {"/item.php"}),
+])
+def test_status_uses_file_parsers_for_each_tool(client, tmp_path, tool, target, stdout, expected):
+    scan_id = _spooled_scan(tmp_path, tool, target, stdout)
+
+    with patch('routes.scan.analyze_output', return_value={"summary": "ok"}) as mock_analyze, \
+         patch('routes.scan.extract_structured_data_from_files', wraps=extract_structured_data_from_files) as mock_parse:
+        data = client.get(f"/api/v1/scans/{scan_id}/status").get_json()
+
+    assert data["status"] == "completed"
+    mock_parse.assert_called_once_with(tool, str(tmp_path / f"{tool}.out"), str(tmp_path / f"{tool}.err"))
+    assert mock_analyze.call_args.kwargs["structured"]["parsed"] is True
+    assert {f.path for f in Finding.query.filter_by(scan_id=scan_id)} == expected
+
+
+def test_timed_out_scan_keeps_hosts_from_truncated_xml(client, tmp_path):
+    # nmap di-kill di tengah host ke-3: dua host lengkap, sisanya terpotong
+    truncated = nmap_xml(2) + '<host><status state="up"/><address addr="10.0.0.3"'
+    started = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    scan_id = _spooled_scan(tmp_path, "nmap", "10.0.0.0/24", truncated, start_time=started)
+
+    with patch('routes.scan.analyze_output', return_value={"summary": "ok"}) as mock_analyze, \
+         patch('routes.scan._terminate_process') as mock_terminate:
+        data = client.get(f"/api/v1/scans/{scan_id}/status").get_json()
+
+    mock_terminate.assert_called_once()
+    assert data["status"] == "partial"
+    assert data["execution"]["timed_out"] is True
+    assert "timed out" in data["analysis"]["partial"]["reason"]
+    structured = mock_analyze.call_args.kwargs["structured"]
+    assert structured["partial"] is True
+    assert [h["addresses"][0]["addr"] for h in structured["hosts"]] == ["10.0.0.1", "10.0.0.2"]
+    assert mock_analyze.call_args.kwargs["previous"] is None
+    assert Finding.query.filter_by(scan_id=scan_id).count() == 2
+    # Temp file dibersihkan setelah di-parse
+    assert not (tmp_path / "nmap.out").exists()
+
+
+def test_timed_out_scan_without_parsable_output_fails(client, tmp_path):
+    scan_id = _spooled_scan(tmp_path, "nmap", "10.0.0.1", "Starting Nmap 7.94\n",
+                            start_time=datetime(2020, 1, 1, tzinfo=timezone.utc))
+
+    with patch('routes.scan.analyze_output') as mock_analyze, patch('routes.scan._terminate_process'):
+        data = client.get(f"/api/v1/scans/{scan_id}/status").get_json()
+
+    assert data["status"] == "failed"
+    assert "timed out" in data["analysis"]["error"]
+    mock_analyze.assert_not_called()
+    assert not (tmp_path / "nmap.out").exists()
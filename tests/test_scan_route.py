@@ -1,6 +1,6 @@
 import pytest
 import json
-from unittest.mock import patch, mock_open
+from unittest.mock import patch
 from app import create_app
 from models import db, User # Import User model
 from unittest.mock import MagicMock
@@ -42,7 +42,7 @@ def client():
         # Teardown is handled by the with statements
 
 
-def test_scan_endpoint_success(client):
+def test_scan_endpoint_success(client, tmp_path):
     """
     Tests the /api/v1/scans endpoint for a successful asynchronous workflow.
     It mocks the entire `Plan -> Execute -> Analyze` pipeline.
@@ -62,19 +62,18 @@ def test_scan_endpoint_success(client):
         "findings": [{"port": "80", "service": "http", "note": "Open port"}]
     }
 
-    # Prepare mock for temporary files
-    mock_stdout_file_path = '/tmp/test_stdout.log'
-    mock_stderr_file_path = '/tmp/test_stderr.log'
+    # Spooled output files, as written by run_command_async
+    mock_stdout_file_path = str(tmp_path / 'test_stdout.log')
+    mock_stderr_file_path = str(tmp_path / 'test_stderr.log')
+    (tmp_path / 'test_stdout.log').write_text(mock_stdout_content)
+    (tmp_path / 'test_stderr.log').write_text(mock_stderr_content)
 
     # 2. Use `patch` to intercept function calls and replace them with mocks
     with patch('routes.scan.plan_scan', return_value=mock_plan) as mock_plan_scan, \
          patch('routes.scan.run_command_async') as mock_run_command_async, \
          patch('routes.scan.analyze_output', return_value=mock_analysis_result) as mock_analyze, \
-         patch('builtins.open', new_callable=mock_open) as mock_file_open, \
-         patch('os.remove') as mock_os_remove, \
          patch('psutil.pid_exists', side_effect=[True, True, False]), \
-         patch('psutil.Process') as mock_process, \
-         patch('os.path.exists', return_value=True) as mock_path_exists: # Add this patch
+         patch('psutil.Process') as mock_process:
 
         
         # Configure mock_run_command_async
@@ -86,12 +85,6 @@ def test_scan_endpoint_success(client):
             "tool": mock_plan["tool"],
         }
 
-        # Configure mock_file_open to simulate reading from temp files
-        mock_file_open.side_effect = [
-            mock_open(read_data=mock_stdout_content).return_value, # For stdout
-            mock_open(read_data=mock_stderr_content).return_value  # For stderr
-        ]
-
         # Configure mock_process instance
         mock_proc_instance = mock_process.return_value
         mock_proc_instance.is_running.side_effect = [True, False] # Simulate running then stopped
@@ -108,7 +101,7 @@ def test_scan_endpoint_success(client):
         assert scan_id is not None
 
         # Verify plan_scan and run_command_async were called
-        mock_plan_scan.assert_called_once_with('example.com', use_ai=True, tool=None, history='', deep_scan=False)
+        mock_plan_scan.assert_called_once_with('example.com', use_ai=True, tool=None, history='', deep_scan=False, prior_scans=[])
         mock_run_command_async.assert_called_once_with(mock_plan["command"])
 
         # 4. Poll the status endpoint until completed
@@ -125,12 +118,13 @@ def test_scan_endpoint_success(client):
         assert status_response['status'] == 'completed'
         assert status_response['analysis'] == mock_analysis_result
 
-        # Verify analyze_output was called
+        # Verify analyze_output was called with the spooled output
         mock_analyze.assert_called_once()
+        assert mock_analyze.call_args.args[1]["stdout"] == mock_stdout_content
         
         # Verify temporary files were removed
-        mock_os_remove.assert_any_call(mock_stdout_file_path)
-        mock_os_remove.assert_any_call(mock_stderr_file_path)
+        assert not (tmp_path / 'test_stdout.log').exists()
+        assert not (tmp_path / 'test_stderr.log').exists()
 
         # Ensure process was queried
         mock_process.assert_called_with(12345)
@@ -187,4 +181,194 @@ def test_scan_endpoint_missing_target(client):
 
     assert response.status_code == 400
     json_data = response.get_json()
-    assert json_data['error'] == 'missing target'
\ No newline at end of file
+    assert json_data['error'] == 'missing target'
+
+def _seed_failed_nmap(target, command="[]"):
+    from models import ChatSession, ScanHistory
+    chat_session = ChatSession(user_id=1, title="recon")
+    db.session.add(chat_session)
+    db.session.commit()
+    db.session.add(ScanHistory(target=target, tool="nmap", command=command, status="failed", session_id=chat_session.id, user_id=1))
+    db.session.commit()
+    return chat_session.id
+
+
+def _fake_run(started):
+    def run(command):
+        started.append(command)
+        return {"ok": True, "pid": 1000 + len(started), "stdout_path": "/tmp/o", "stderr_path": "/tmp/e", "tool": command[0]}
+    return run
+
+
+def _start_speculative(client, session_id, ai_plan, started):
+    """POST scan; AI planner (di-mock) menjawab lewat Future yang sudah selesai."""
+    from concurrent.futures import Future
+    future = Future()
+    future.set_result(ai_plan)
+    with patch('routes.scan.check_reachability', return_value=(True, "ok")), \
+         patch('routes.scan.run_command_async', side_effect=_fake_run(started)), \
+         patch('routes.scan.submit_ai_plan', return_value=future):
+        response = client.post('/api/v1/scans',
+                               data=json.dumps({'target': 'example.com', 'session_id': session_id}),
+                               content_type='application/json')
+    assert response.status_code == 202
+    return response.get_json()
+
+
+def _poll(client, scan_id, started):
+    running = MagicMock()
+    running.is_running.return_value = True
+    with patch('routes.scan.run_command_async', side_effect=_fake_run(started)), \
+         patch('routes.scan.psutil.Process', return_value=running), \
+         patch('routes.scan._terminate_process') as mock_terminate:
+        return client.get(f'/api/v1/scans/{scan_id}/status').get_json(), mock_terminate
+
+
+def test_speculative_scan_kept_as_recon_when_ai_picks_other_tool(client):
+    """
+    A low-confidence nmap plan is started immediately; when the AI picks another tool,
+    the nmap run is kept as extra recon and the AI's command is started on the next poll.
+    """
+    from models import ScanHistory
+    session_id = _seed_failed_nmap("example.com")
+    ai_plan = {"tool": "nikto", "command": ["nikto", "-h", "example.com"], "rationale": "Web server likely"}
+    started = []
+
+    json_data = _start_speculative(client, session_id, ai_plan, started)
+    assert json_data["speculative"] == "pending"
+    assert [command[0] for command in started] == ["nmap"]
+
+    status, _ = _poll(client, json_data["scan_id"], started)
+    assert status["status"] == "running"
+    assert status["speculative"] == "extended"
+    assert [command[0] for command in started] == ["nmap", "nikto"]
+
+    spec_scan = ScanHistory.query.get(json_data["scan_id"])
+    ai_scan = ScanHistory.query.get(status["followup_scan_id"])
+    assert spec_scan.status == "running"
+    assert "extra recon" in spec_scan.rationale
+    assert ai_scan.tool == "nikto"
+    assert "kept as extra recon" in ai_scan.rationale
+
+    # Rekonsiliasi hanya sekali; hasilnya tetap dilaporkan di poll berikutnya
+    again, _ = _poll(client, json_data["scan_id"], started)
+    assert again["followup_scan_id"] == status["followup_scan_id"] and len(started) == 2
+
+
+def test_speculative_scan_kept_when_ai_agrees(client):
+    from models import ScanHistory
+    session_id = _seed_failed_nmap("example.com")
+    ai_plan = {"tool": "nmap", "command": ["nmap", "-sV", "-T4", "-oX", "-", "example.com"], "rationale": "Standard recon"}
+    started = []
+
+    json_data = _start_speculative(client, session_id, ai_plan, started)
+    status, _ = _poll(client, json_data["scan_id"], started)
+
+    assert status["speculative"] == "kept"
+    assert "followup_scan_id" not in status
+    assert len(started) == 1
+    scan = ScanHistory.query.get(json_data["scan_id"])
+    assert "AI planner agreed" in scan.rationale
+
+
+def test_speculative_scan_cancelled_when_ai_reorders_flags(client):
+    from models import ScanHistory
+    session_id = _seed_failed_nmap("example.com")
+    # Argumen sama, urutan berbeda: bukan plan yang sama
+    ai_plan = {"tool": "nmap", "command": ["nmap", "-T4", "-sV", "-oX", "-", "example.com"], "rationale": "Reordered"}
+    started = []
+
+    json_data = _start_speculative(client, session_id, ai_plan, started)
+    status, mock_terminate = _poll(client, json_data["scan_id"], started)
+
+    mock_terminate.assert_called_once()
+    assert status["status"] == "cancelled"
+    assert status["speculative"] == "cancelled"
+    assert started[1] == ai_plan["command"]
+    assert ScanHistory.query.get(status["followup_scan_id"]).status == "running"
+
+
+def test_speculative_post_does_not_wait_for_ai(client):
+    from concurrent.futures import Future
+    session_id = _seed_failed_nmap("example.com")
+    future = Future()
+    started = []
+    with patch('routes.scan.check_reachability', return_value=(True, "ok")), \
+         patch('routes.scan.run_command_async', side_effect=_fake_run(started)), \
+         patch('routes.scan.submit_ai_plan', return_value=future):
+        response = client.post('/api/v1/scans',
+                               data=json.dumps({'target': 'example.com', 'session_id': session_id}),
+                               content_type='application/json')
+    scan_id = response.get_json()["scan_id"]
+    assert response.status_code == 202
+    assert response.get_json()["speculative"] == "pending"
+
+    status, _ = _poll(client, scan_id, started)
+    assert status["speculative"] == "pending"
+
+    # Planner thread menyimpan jawaban ke row
+    future.set_result({"tool": "nmap", "command": ["nmap", "-sV", "-T4", "-oX", "-", "example.com"]})
+    status, _ = _poll(client, scan_id, started)
+    assert status["speculative"] == "kept"
+
+
+def test_speculative_plan_reconciled_from_row_on_any_worker(client):
+    """
+    The pending plan lives on the ScanHistory row, so a worker that never saw the
+    future (no in-process state) reconciles it from what the planner thread stored.
+    """
+    from models import ScanHistory
+    session_id = _seed_failed_nmap("example.com")
+    started = []
+    json_data = _start_speculative(client, session_id, None, started)
+    scan = db.session.get(ScanHistory, json_data["scan_id"])
+    state = json.loads(scan.speculation)
+    state.update(state="ready", ai_plan={"tool": "nikto", "command": ["nikto", "-h", "example.com"]})
+    scan.speculation = json.dumps(state)
+    db.session.commit()
+
+    status, _ = _poll(client, scan.id, started)
+    assert status["speculative"] == "extended"
+    assert started[-1] == ["nikto", "-h", "example.com"]
+
+
+def test_speculative_plan_kept_when_ai_times_out(client):
+    from concurrent.futures import Future
+    from models import ScanHistory
+    session_id = _seed_failed_nmap("example.com")
+    future = Future()
+    started = []
+    with patch('routes.scan.check_reachability', return_value=(True, "ok")), \
+         patch('routes.scan.run_command_async', side_effect=_fake_run(started)), \
+         patch('routes.scan.submit_ai_plan', return_value=future):
+        scan_id = client.post('/api/v1/scans', data=json.dumps({'target': 'example.com', 'session_id': session_id}),
+                              content_type='application/json').get_json()["scan_id"]
+
+    with patch('routes.scan.SPECULATIVE_AI_TIMEOUT', 0):
+        status, _ = _poll(client, scan_id, started)
+    assert status["speculative"] == "kept"
+    assert "AI planner unavailable (timed out)" in db.session.get(ScanHistory, scan_id).rationale
+
+    # Jawaban yang terlambat tidak menimpa keputusan
+    future.set_result({"tool": "nikto", "command": ["nikto", "-h", "example.com"]})
+    status, _ = _poll(client, scan_id, started)
+    assert status["speculative"] == "kept" and len(started) == 1
+
+
+def test_same_failed_plan_is_not_speculated(client):
+    failed_command = json.dumps(["nmap", "-sV", "-T4", "-oX", "-", "example.com"])
+    session_id = _seed_failed_nmap("example.com", command=failed_command)
+    ai_plan = {"tool": "nikto", "command": ["nikto", "-h", "example.com"], "rationale": "nmap failed before"}
+    started = []
+
+    with patch('routes.scan.check_reachability', return_value=(True, "ok")), \
+         patch('routes.scan.run_command_async', side_effect=_fake_run(started)), \
+         patch('ai.planner.plan_scan_ai', return_value=ai_plan) as mock_ai:
+        response = client.post('/api/v1/scans',
+                               data=json.dumps({'target': 'example.com', 'session_id': session_id}),
+                               content_type='application/json')
+
+    assert response.status_code == 202
+    assert "speculative" not in response.get_json()
+    mock_ai.assert_called_once()
+    assert started == [ai_plan["command"]]
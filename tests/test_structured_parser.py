@@ -0,0 +1,104 @@
+from ai.analyzer import structured_parser
+from ai.analyzer.structured_parser import (
+    extract_structured_data,
+    extract_structured_data_from_files,
+    iter_nmap_hosts,
+    parse_nikto_xml,
+    parse_nmap_file,
+    parse_nmap_xml,
+)
+
+
+def nmap_xml(host_count):
+    hosts = "".join(
+        f'<host><status state="up"/><address addr="10.0.{i // 256}.{i % 256}" addrtype="ipv4"/>'
+        f'<ports><port protocol="tcp" portid="22"><state state="open"/><service name="ssh" product="OpenSSH" version="8.9"/></port>'
+        f'<port protocol="tcp" portid="25"><state state="closed"/></port></ports></host>'
+        for i in range(host_count)
+    )
+    return f'<?xml version="1.0"?><nmaprun scanner="nmap">{hosts}<runstats><finished exit="success"/></runstats></nmaprun>'
+
+
+def test_parse_nmap_xml_builds_hosts_and_summary():
+    result = parse_nmap_xml(nmap_xml(3))
+
+    assert result["parsed"] is True
+    assert len(result["hosts"]) == 3
+    assert result["hosts"][0]["addresses"] == [{"addr": "10.0.0.0", "addrtype": "ipv4"}]
+    assert result["hosts"][0]["ports"][0]["service"]["name"] == "ssh"
+    assert result["summary"] == {"hosts_total": 3, "hosts_up": 3, "ports_total": 6, "open_ports": 3, "services": {"ssh": 3}}
+
+
+def test_parse_nmap_file_skips_leading_text_and_streams(tmp_path):
+    path = tmp_path / "nmap-stdout.log"
+    path.write_text("Starting Nmap 7.94\nWARNING: something\n" + nmap_xml(2000))
+
+    hosts = iter_nmap_hosts(str(path))
+    first = next(hosts)
+    assert first["status"] == "up"
+    assert sum(1 for _ in hosts) == 1999
+
+    result = parse_nmap_file(str(path))
+    assert result["summary"]["hosts_total"] == 2000
+    assert result == parse_nmap_xml(nmap_xml(2000))
+
+
+def test_parse_nmap_xml_reports_broken_document():
+    result = parse_nmap_xml("<?xml version='1.0'?><nmaprun><host><status state='up'/>")
+    assert result["parsed"] is False
+
+
+def test_truncated_nmap_keeps_complete_hosts():
+    xml = nmap_xml(5)
+    cut = xml.find("<host>", xml.find("10.0.0.3"))  # potong di tengah host ke-5
+    result = parse_nmap_xml(xml[:cut + 40])
+
+    assert result["parsed"] is True
+    assert result["partial"] is True
+    assert len(result["hosts"]) == 4
+    assert result["summary"]["open_ports"] == 4
+
+
+def test_truncated_nikto_keeps_complete_items():
+    items = "".join(
+        f'<item id="{i}" osvdbid="0"><description>Finding {i}</description><uri>/path{i}</uri></item>'
+        for i in range(3)
+    )
+    xml = (
+        '<?xml version="1.0"?><niktoscan><scandetails targetip="10.0.0.1" targethostname="example.com" '
+        f'targetport="80" targetbanner="nginx">{items}<item id="99"><descrip'
+    )
+    result = parse_nikto_xml(xml)
+
+    assert result["parsed"] is True
+    assert result["partial"] is True
+    assert [item["uri"] for item in result["items"]] == ["/path0", "/path1", "/path2"]
+    assert result["target"]["targethostname"] == "example.com"
+
+
+def test_extract_from_files_matches_string_parsers(tmp_path, monkeypatch):
+    # Deklarasi XML jatuh di batas chunk saat sniffing
+    monkeypatch.setattr(structured_parser, "XML_SNIFF_BYTES", 16)
+    nmap_out = tmp_path / "nmap-stdout.log"
+    nmap_out.write_text("x" * 14 + "\n" + nmap_xml(3))
+    gobuster_out = tmp_path / "gobuster-stdout.log"
+    gobuster_out.write_text("===\nFound: /admin (Status: 200)\nnoise\nFound: /.git (Status: 403)\n")
+    sqlmap_out = tmp_path / "sqlmap-stdout.log"
+    sqlmap_out.write_text("".join(f"    Payload: id=1 AND {i}={i}\n" for i in range(8)) + "[INFO] parameter 'id' Is Vulnerable\n")
+
+    for tool, path in (("nmap", nmap_out), ("gobuster", gobuster_out), ("sqlmap", sqlmap_out)):
+        from_file = extract_structured_data_from_files(tool, str(path))
+        assert from_file == extract_structured_data(tool, path.read_text())
+        assert from_file["parsed"] is True
+
+    sqlmap = extract_structured_data_from_files("sqlmap", str(sqlmap_out))
+    assert sqlmap["vulnerable"] is True
+    assert sqlmap["payloads"][0] == "id=1 AND 0=0"
+    assert len(sqlmap["payloads"]) == 5
+
+
+def test_extract_from_files_without_xml(tmp_path):
+    out = tmp_path / "nikto-stdout.log"
+    out.write_text("- Nikto v2.5.0\n+ ERROR: host unreachable\n")
+
+    assert extract_structured_data_from_files("nikto", str(out), str(tmp_path / "missing.log"))["parsed"] is False
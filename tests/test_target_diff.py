@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta, timezone
+from models import db, User, ScanHistory, Finding
+from ai.findings import diff_findings
+
+
+def _scan(user_id, target, tool, minutes_ago, findings):
+    scan = ScanHistory(user_id=user_id, target=target, tool=tool, command="[]", status="completed",
+                       created_at=datetime.now(timezone.utc) - timedelta(minutes=minutes_ago))
+    db.session.add(scan)
+    db.session.flush()
+    for row in findings:
+        db.session.add(Finding(scan_id=scan.id, host="10.0.0.1", proto="tcp", severity="info", **row))
+    db.session.commit()
+    return scan
+
+
+def test_diff_findings_set_operations():
+    old = [
+        {"host": "h", "port": 22, "proto": "tcp", "service": "ssh", "product": "OpenSSH", "version": "7.4"},
+        {"host": "h", "port": 21, "proto": "tcp", "service": "ftp"},
+        {"host": "h", "port": 80, "proto": "tcp", "path": "/admin", "status": 403},
+    ]
+    new = [
+        {"host": "h", "port": 22, "proto": "tcp", "service": "ssh", "product": "OpenSSH", "version": "9.6"},
+        {"host": "h", "port": 3306, "proto": "tcp", "service": "mysql"},
+        {"host": "h", "port": 80, "proto": "tcp", "path": "/admin", "status": 200},
+        {"host": "h", "port": 80, "proto": "tcp", "path": "/.git", "status": 200, "cve": None},
+        {"host": "h", "port": 80, "proto": "tcp", "path": "/cgi-bin/", "cve": "CVE-2021-41773", "severity": "critical"},
+    ]
+    diff = diff_findings(old, new)
+
+    assert [p["port"] for p in diff["ports"]["opened"]] == [3306]
+    assert [p["port"] for p in diff["ports"]["closed"]] == [21]
+    assert diff["ports"]["changed"][0]["to"]["version"] == "9.6"
+    assert {p["path"] for p in diff["paths"]["added"]} == {"/.git", "/cgi-bin/"}
+    assert diff["paths"]["changed"] == [{"host": "h", "port": 80, "proto": "tcp", "path": "/admin", "from_status": 403, "to_status": 200}]
+    assert diff["vulnerabilities"]["new"][0]["cve"] == "CVE-2021-41773"
+    assert diff["summary"]["ports_opened"] == 1 and diff["changed"] is True
+    assert diff_findings(old, old)["changed"] is False
+
+
+def test_target_diff_endpoint_defaults_to_last_two_scans(client):
+    user_id = User.query.first().id
+    first = _scan(user_id, "10.0.0.1", "nmap", 60, [{"port": 22, "service": "ssh", "product": "OpenSSH", "version": "7.4"}])
+    _scan(user_id, "10.0.0.1", "gobuster", 30, [{"port": 80, "path": "/admin", "status": 200}])
+    latest = _scan(user_id, "10.0.0.1", "nmap", 5, [
+        {"port": 22, "service": "ssh", "product": "OpenSSH", "version": "7.4"},
+        {"port": 23, "service": "telnet"},
+    ])
+
+    response = client.get("/api/v1/targets/10.0.0.1/diff")
+    assert response.status_code == 200
+    data = response.get_json()
+    assert (data["from"]["id"], data["to"]["id"]) == (first.id, latest.id)
+    assert [p["port"] for p in data["ports"]["opened"]] == [23]
+    assert data["ports"]["changed"] == []
+
+    explicit = client.get(f"/api/v1/targets/10.0.0.1/diff?from={latest.id}&to={first.id}").get_json()
+    assert [p["port"] for p in explicit["ports"]["closed"]] == [23]
+
+
+def test_target_diff_endpoint_errors(client):
+    user_id = User.query.first().id
+    only = _scan(user_id, "http://example.com/app", "nikto", 5, [])
+
+    assert client.get("/api/v1/targets/unknown.example/diff").status_code == 404
+    assert client.get("/api/v1/targets/http://example.com/app/diff").status_code == 404
+    assert client.get(f"/api/v1/targets/http://example.com/app/diff?from={only.id}&to={only.id}").status_code == 400
+
+    other = _scan(user_id, "http://example.com/app", "gobuster", 1, [])
+    response = client.get(f"/api/v1/targets/http://example.com/app/diff?from={only.id}&to={other.id}")
+    assert response.status_code == 400
+    assert "same tool" in response.get_json()["error"]
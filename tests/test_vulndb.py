@@ -0,0 +1,102 @@
+import json
+import pytest
+from unittest.mock import patch
+from ai.vulndb import VulnIndex, import_nvd_feeds, service_vulnerabilities, version_key
+from ai.findings import diff_findings, normalize_findings
+from ai.analyzer.nmap import NmapAnalyzer
+
+
+FEED_V11 = {"CVE_Items": [
+    {
+        "cve": {"CVE_data_meta": {"ID": "CVE-2018-15473"}},
+        "impact": {"baseMetricV3": {"cvssV3": {"baseScore": 5.3, "baseSeverity": "MEDIUM"}}},
+        "configurations": {"nodes": [{"operator": "OR", "children": [], "cpe_match": [
+            {"vulnerable": True, "cpe23Uri": "cpe:2.3:a:openbsd:openssh:*:*:*:*:*:*:*:*", "versionEndIncluding": "7.7"},
+        ]}]},
+    },
+    {
+        "cve": {"CVE_data_meta": {"ID": "CVE-2021-41773"}},
+        "impact": {"baseMetricV3": {"cvssV3": {"baseScore": 7.5, "baseSeverity": "HIGH"}}},
+        "configurations": {"nodes": [{"operator": "OR", "cpe_match": [
+            {"vulnerable": True, "cpe23Uri": "cpe:2.3:a:apache:http_server:2.4.49:*:*:*:*:*:*:*"},
+        ]}]},
+    },
+]}
+
+FEED_V20 = {"vulnerabilities": [{"cve": {
+    "id": "CVE-2023-38408",
+    "metrics": {"cvssMetricV31": [{"cvssData": {"baseScore": 9.8, "baseSeverity": "CRITICAL"}}]},
+    "configurations": [{"nodes": [{"cpeMatch": [
+        {"vulnerable": True, "criteria": "cpe:2.3:a:openbsd:openssh:*:*:*:*:*:*:*:*", "versionStartIncluding": "5.5", "versionEndExcluding": "9.3"},
+    ]}]}],
+}}]}
+
+
+@pytest.fixture
+def index(tmp_path):
+    feeds = []
+    for name, feed in (("v11.json", FEED_V11), ("v20.json", FEED_V20)):
+        path = tmp_path / name
+        path.write_text(json.dumps(feed))
+        feeds.append(str(path))
+    db_path = str(tmp_path / "vulndb.sqlite")
+    assert import_nvd_feeds(feeds, db_path=db_path) == 3
+    return VulnIndex(db_path)
+
+
+def test_version_key_orders_versions():
+    assert version_key("2.4.49") < version_key("2.4.50") < version_key("2.10")
+    assert version_key("7.4") < version_key("7.4p1") < version_key("7.5")
+
+
+def test_lookup_matches_version_ranges(index):
+    assert [v["cve"] for v in index.lookup("OpenSSH", "7.4")] == ["CVE-2023-38408", "CVE-2018-15473"]
+    assert [v["cve"] for v in index.lookup("OpenSSH", "8.9p1 Ubuntu")] == ["CVE-2023-38408"]
+    assert index.lookup("OpenSSH", "9.3") == []
+    assert [v["cve"] for v in index.lookup("Apache httpd", "2.4.49")] == ["CVE-2021-41773"]
+    assert index.lookup("Apache httpd", "2.4.50") == []
+    assert VulnIndex("/nonexistent/vulndb.sqlite").lookup("OpenSSH", "7.4") == []
+    assert index.lookup("OpenSSH", "   ") == []
+
+
+def test_lookup_results_cache_is_bounded(index):
+    index.cache_size = 2
+    for version in ("7.4", "7.5", "7.6"):
+        index.lookup("OpenSSH", version)
+    assert list(index._results) == [("openssh", "7.5"), ("openssh", "7.6")]
+    # Hit memindahkan entry ke akhir (paling baru dipakai)
+    index.lookup("OpenSSH", "7.5")
+    index.lookup("OpenSSH", "8.0")
+    assert list(index._results) == [("openssh", "7.5"), ("openssh", "8.0")]
+
+
+def test_nmap_analysis_attaches_known_vulnerabilities(index):
+    structured = {"parsed": True, "hosts": [{"status": "up", "addresses": [{"addr": "10.0.0.1", "addrtype": "ipv4"}], "ports": [
+        {"port": "22", "protocol": "tcp", "state": "open", "service": {"name": "ssh", "product": "OpenSSH", "version": "7.4"}},
+        {"port": "80", "protocol": "tcp", "state": "open", "service": {"name": "http", "product": "nginx", "version": "1.25.3"}},
+    ]}]}
+    data = {"tool": "nmap", "execution": {"ok": True, "stdout": ""}, "target": "10.0.0.1", "structured": structured}
+
+    with patch("ai.analyzer.nmap.service_vulnerabilities", side_effect=lambda s: service_vulnerabilities(s, index)), \
+         patch("ai.analyzer.base.call_groq", return_value='{"summary": "ok"}') as mock_llm:
+        result = NmapAnalyzer().analyze(data)
+
+    assert "CVE-2023-38408" in mock_llm.call_args[0][0]
+    assert result["known_vulnerabilities"][0]["endpoints"] == ["10.0.0.1:22"]
+    assert len(result["known_vulnerabilities"]) == 1
+
+
+def test_service_findings_carry_the_top_indexed_cve(index):
+    def structured(version):
+        return {"parsed": True, "hosts": [{"status": "up", "addresses": [{"addr": "10.0.0.1", "addrtype": "ipv4"}], "ports": [
+            {"port": "22", "protocol": "tcp", "state": "open", "service": {"name": "ssh", "product": "OpenSSH", "version": version}},
+        ]}]}
+
+    with patch("ai.findings.vuln_index", index):
+        old = normalize_findings("nmap", "10.0.0.1", structured("7.4"))
+        new = normalize_findings("nmap", "10.0.0.1", structured("9.3"))
+
+    # Dua CVE cocok untuk 7.4; yang disimpan CVSS tertinggi
+    assert [row["cve"] for row in old] == ["CVE-2023-38408"]
+    assert [row["cve"] for row in new] == [None]
+    assert [v["cve"] for v in diff_findings(old, new)["vulnerabilities"]["resolved"]] == ["CVE-2023-38408"]